@@ -0,0 +1,525 @@
+"""
+大量アカウントの一括取得（中断しても再開できるエクスポート）
+
+CSV（1列目 sns、2列目 account_id。先頭行の1列目が "sns" の場合はヘッダーとして読み飛ばす）を
+先頭から順に読み、HTTP API・キャッシュを経由せずにプラットフォームクライアントで直接取得して、
+結果を逐次書き出す。
+
+- 入力はストリーミングで読み、取得中・書き出し待ちの件数は --window 件までに制限する
+  （入力の大きさに関係なくメモリ使用量は一定）
+- プラットフォームごとの同時実行数は BATCH_CONCURRENCY（--concurrency で上書き可）。
+  外向きスケジューラ・サーキットブレーカーはAPIサーバーと同じ設定で使う
+- 結果は入力の順に書き出し、一定件数・一定時間ごとに入力の読み込み位置と出力の位置を
+  チェックポイントファイルに保存する。中断後に同じコマンドを再実行すると、その位置から再開する
+- 出力形式は拡張子で判定: .csv / .ndjson (.jsonl) / .parquet
+  （Parquetは pyarrow がある場合のみ。チェックポイントごとのパートファイルをディレクトリに書き出す）
+
+使い方:
+    python -m api.bulk accounts.csv results.csv
+    python -m api.bulk accounts.csv results.ndjson --concurrency youtube=16,instagram=2
+    python -m api.bulk accounts.csv results.parquet --snapshots
+    python -m api.bulk accounts.csv results.csv --restart   # チェックポイントを無視して最初から
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from api.config import settings
+from api.models import SNSPlatform
+from api.services import metrics
+from api.services.cache import make_cache_key
+from api.services.errors import CircuitOpenError, find_error, http_status_for
+from api.services.executor import ParserExecutor
+from api.services.http_pool import HTTPClientPool
+from api.services.proxy_pool import ProxyPool
+from api.services.registry import ClientRegistry
+from api.services.resilience import Resilience
+from api.services.scheduler import OutboundScheduler
+from api.services.snapshot_store import SnapshotStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# 出力する列
+FIELDS = (
+    "line", "sns", "account_id", "resolved_account_id", "outcome", "status_code", "error",
+    "account_name", "followers_count", "following_count", "post_count",
+)
+
+# 再試行する取得結果（上流が一時的に不安定なもの）
+_RETRY_OUTCOMES = ("timeout", "upstream_error", "blocked", "circuit_open")
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+
+# 入力1行分: (行番号, 行末のバイト位置, プラットフォーム, アカウントID, 入力エラー)
+InputRow = Tuple[int, int, Optional[SNSPlatform], str, Optional[str]]
+
+
+def read_input(path: Path, offset: int = 0, line: int = 0) -> Iterator[InputRow]:
+    """
+    入力CSVを offset バイト目（line 行目の直後）から1行ずつ読む
+
+    再開位置をバイト単位で記録できるよう、バイナリで読んで1行ずつデコードする
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            raw = f.readline()
+            if not raw:
+                return
+            line += 1
+            end = f.tell()
+            text = raw.decode("utf-8-sig" if line == 1 else "utf-8", errors="replace").strip()
+            if not text or text.startswith("#"):
+                continue
+            fields = [field.strip() for field in next(csv.reader([text]))]
+            if line == 1 and fields[0].lower() == "sns":
+                continue
+            if len(fields) < 2 or not fields[1]:
+                yield line, end, None, fields[0] if len(fields) == 1 else "", "expected 'sns,account_id'"
+                continue
+            try:
+                yield line, end, SNSPlatform(fields[0].lower()), fields[1], None
+            except ValueError:
+                yield line, end, None, fields[1], f"Unsupported SNS platform: {fields[0]}"
+
+
+class LineWriter:
+    """
+    CSV / NDJSON の出力
+
+    チェックポイント時にflushとfsyncを行って出力のサイズを返し、再開時はそのサイズまで切り詰める
+    （チェックポイント後に書かれた分は再取得して書き直す）
+    """
+
+    def __init__(self, path: Path, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._file: Optional[io.BufferedWriter] = None
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer)
+
+    def open(self, state: Optional[Dict[str, Any]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if state is None:
+            self._file = open(self.path, "wb")
+            if self.fmt == "csv":
+                self._csv.writerow(FIELDS)
+                self._flush_row()
+        else:
+            self._file = open(self.path, "r+b")
+            self._file.truncate(state["size"])
+            self._file.seek(state["size"])
+
+    def _flush_row(self) -> None:
+        self._file.write(self._buffer.getvalue().encode("utf-8"))
+        self._buffer.seek(0)
+        self._buffer.truncate()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self.fmt == "csv":
+            self._csv.writerow([record[name] for name in FIELDS])
+            self._flush_row()
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def commit(self) -> Dict[str, Any]:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"size": self._file.tell()}
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ParquetWriter:
+    """
+    Parquet の出力
+
+    Parquetは追記・切り詰めができないため、チェックポイントごとに溜めた行を
+    1つのパートファイル（path/part-00000.parquet, ...）として書き出す。
+    再開時はチェックポイント後に書かれたパートファイルを削除する
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.parts = 0
+        self._rows: List[Dict[str, Any]] = []
+        self._schema = pa.schema([
+            ("line", pa.int64()),
+            ("sns", pa.string()),
+            ("account_id", pa.string()),
+            ("resolved_account_id", pa.string()),
+            ("outcome", pa.string()),
+            ("status_code", pa.int32()),
+            ("error", pa.string()),
+            ("account_name", pa.string()),
+            ("followers_count", pa.int64()),
+            ("following_count", pa.int64()),
+            ("post_count", pa.int64()),
+        ])
+
+    def _part(self, index: int) -> Path:
+        return self.path / f"part-{index:05d}.parquet"
+
+    def open(self, state: Optional[Dict[str, Any]]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.parts = 0 if state is None else state["parts"]
+        for part in self.path.glob("part-*.parquet*"):
+            index = part.name[len("part-"):].split(".", 1)[0]
+            if not index.isdigit() or int(index) >= self.parts or part.suffix != ".parquet":
+                part.unlink()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._rows.append(record)
+
+    def commit(self) -> Dict[str, Any]:
+        if self._rows:
+            target = self._part(self.parts)
+            tmp = target.with_name(target.name + ".tmp")
+            pq.write_table(pa.Table.from_pylist(self._rows, schema=self._schema), tmp)
+            os.replace(tmp, target)
+            self.parts += 1
+            self._rows.clear()
+        return {"parts": self.parts}
+
+    def close(self) -> None:
+        self._rows.clear()
+
+
+class Checkpoint:
+    """チェックポイントファイル（一時ファイルに書いてから置き換える）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not self.path.exists():
+            return None
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def save(self, state: Dict[str, Any]) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+class Progress:
+    """スループットと残り時間を1行で表示（入力の読み込み位置から残り時間を推定する）"""
+
+    def __init__(self, total_bytes: int, start_offset: int, interval: float = 1.0, stream=sys.stderr):
+        self.total_bytes = total_bytes
+        self.start_offset = start_offset
+        self.interval = interval
+        self.stream = stream
+        self.started = time.monotonic()
+        self._last = 0.0
+        self.done = 0  # 今回の実行で書き出した件数
+
+    def update(self, offset: int, counts: Dict[str, int], force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = max(now - self.started, 1e-6)
+        rate = self.done / elapsed
+        read = offset - self.start_offset
+        remaining = self.total_bytes - offset
+        eta = "--:--:--"
+        if read > 0:
+            seconds = int(remaining * elapsed / read)
+            eta = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+        percent = 100.0 * offset / self.total_bytes if self.total_bytes else 100.0
+        errors = sum(count for outcome, count in counts.items() if outcome != "ok")
+        self.stream.write(
+            f"\r{percent:5.1f}%  {sum(counts.values()):,} done  ok {counts.get('ok', 0):,}  "
+            f"errors {errors:,}  {rate:,.1f}/s  ETA {eta} "
+        )
+        self.stream.flush()
+
+    def finish(self) -> None:
+        self.stream.write("\n")
+        self.stream.flush()
+
+
+def _output_format(path: Path) -> str:
+    fmt = FORMATS.get(path.suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Unknown output format: {path.suffix} (expected {', '.join(FORMATS)})")
+    if fmt == "parquet" and not PARQUET_AVAILABLE:
+        raise ValueError("Parquet output requires pyarrow (pip install pyarrow)")
+    return fmt
+
+
+def _parse_concurrency(value: str) -> Dict[SNSPlatform, int]:
+    """"youtube=16,instagram=2" の形式"""
+    concurrency: Dict[SNSPlatform, int] = {}
+    for part in value.split(","):
+        name, _, count = part.partition("=")
+        concurrency[SNSPlatform(name.strip().lower())] = int(count)
+    return concurrency
+
+
+def _record(line: int, sns: Optional[SNSPlatform], account_id: str) -> Dict[str, Any]:
+    record: Dict[str, Any] = dict.fromkeys(FIELDS)
+    record["line"] = line
+    record["sns"] = sns.value if sns is not None else None
+    record["account_id"] = account_id
+    return record
+
+
+class BulkExport:
+    """
+    入力を読み、プラットフォームごとのワーカーで取得して、入力の順に書き出す
+
+    各ワーカーは完了した結果を順序待ちのバッファに置き、先頭から連続した分だけを書き出す。
+    読み込みは書き出しが終わるまで --window 件先までしか進めないため、バッファも有界になる
+    """
+
+    def __init__(
+        self,
+        clients: Dict[SNSPlatform, Any],
+        writer: Any,
+        checkpoint: Checkpoint,
+        concurrency: Dict[SNSPlatform, int],
+        window: int = 2000,
+        retries: int = 2,
+        checkpoint_every: int = 1000,
+        checkpoint_interval: float = 10.0,
+        snapshots: Optional[SnapshotStore] = None,
+    ):
+        self.clients = clients
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.window = window
+        self.retries = retries
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self.snapshots = snapshots
+
+        self.state: Dict[str, Any] = {}
+        self.counts: Dict[str, int] = {}
+        self._slots = asyncio.Semaphore(window)
+        self._queues: Dict[SNSPlatform, asyncio.Queue] = {sns: asyncio.Queue() for sns in clients}
+        self._done: Dict[int, Tuple[Dict[str, Any], int, int]] = {}  # 連番 -> (結果, 行末位置, 行番号)
+        self._next_seq = 0
+        self._since_checkpoint = 0
+        self._checkpointed_at = time.monotonic()
+        self.progress: Optional[Progress] = None
+
+    async def _fetch(self, sns: SNSPlatform, account_id: str, record: Dict[str, Any]) -> None:
+        client = self.clients[sns]
+        for attempt in range(self.retries + 1):
+            try:
+                info = await client.get_account_info(account_id)
+            except Exception as e:
+                outcome = metrics.classify_error(e)
+                if outcome in _RETRY_OUTCOMES and attempt < self.retries:
+                    circuit = find_error(e, CircuitOpenError)
+                    await asyncio.sleep(circuit.retry_after if circuit is not None else 2.0 ** attempt)
+                    continue
+                record["outcome"] = outcome
+                record["status_code"] = http_status_for(e) if isinstance(e, ValueError) else 500
+                record["error"] = str(e)
+                return
+            record["outcome"] = "ok"
+            record["status_code"] = 200
+            # 入力の account_id は行を突き合わせられるようそのまま残し、ページが返したIDは別の列に書く
+            record["resolved_account_id"] = info.account_id
+            record["account_name"] = info.account_name
+            record["followers_count"] = info.followers_count
+            record["following_count"] = info.following_count
+            record["post_count"] = info.post_count
+            if self.snapshots is not None:
+                self.snapshots.record(make_cache_key(sns, account_id), info)
+            return
+
+    async def _worker(self, sns: SNSPlatform) -> None:
+        queue = self._queues[sns]
+        while True:
+            seq, line, end, account_id = await queue.get()
+            record = _record(line, sns, account_id)
+            await self._fetch(sns, account_id, record)
+            self._complete(seq, record, end, line)
+
+    def _complete(self, seq: int, record: Dict[str, Any], end: int, line: int) -> None:
+        """結果を順序待ちのバッファに置き、先頭から連続した分を書き出す"""
+        self._done[seq] = (record, end, line)
+        while self._next_seq in self._done:
+            record, end, line = self._done.pop(self._next_seq)
+            self._next_seq += 1
+            self.writer.write(record)
+            self.counts[record["outcome"]] = self.counts.get(record["outcome"], 0) + 1
+            self.state["offset"] = end
+            self.state["line"] = line
+            self._since_checkpoint += 1
+            self._slots.release()
+            if self.progress is not None:
+                self.progress.done += 1
+        if (
+            self._since_checkpoint >= self.checkpoint_every
+            or (self._since_checkpoint and time.monotonic() - self._checkpointed_at >= self.checkpoint_interval)
+        ):
+            self._save_checkpoint()
+        if self.progress is not None:
+            self.progress.update(self.state["offset"], self.counts)
+
+    def _save_checkpoint(self, complete: bool = False) -> None:
+        self.state["writer"] = self.writer.commit()
+        self.state["counts"] = self.counts
+        self.state["complete"] = complete
+        self.checkpoint.save(self.state)
+        self._since_checkpoint = 0
+        self._checkpointed_at = time.monotonic()
+
+    async def run(self, input_path: Path, state: Dict[str, Any]) -> None:
+        self.state = state
+        self.counts = dict(state.get("counts", {}))
+        self.writer.open(state.get("writer"))
+        self.progress = Progress(input_path.stat().st_size, state["offset"])
+        workers = [
+            asyncio.create_task(self._worker(sns))
+            for sns in self._queues
+            for _ in range(max(1, self.concurrency.get(sns, 1)))
+        ]
+        reader = asyncio.create_task(self._read(input_path))
+        try:
+            # ワーカーは書き出しに失敗した場合のみ終了する（その場合は例外をそのまま送出）
+            done, _ = await asyncio.wait([reader, *workers], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+            self.state["offset"] = input_path.stat().st_size
+            self._save_checkpoint(complete=True)
+            self.progress.update(self.state["offset"], self.counts, force=True)
+        finally:
+            for task in [reader, *workers]:
+                task.cancel()
+            await asyncio.gather(reader, *workers, return_exceptions=True)
+            self.progress.finish()
+            self.writer.close()
+
+    async def _read(self, input_path: Path) -> None:
+        seq = self._next_seq
+        for line, end, sns, account_id, error in read_input(input_path, self.state["offset"], self.state["line"]):
+            await self._slots.acquire()
+            if error is None and sns not in self.clients:
+                error = f"Unsupported SNS platform: {sns.value}"
+            if error is not None:
+                record = _record(line, sns, account_id)
+                record["outcome"] = "invalid"
+                record["status_code"] = 400
+                record["error"] = error
+                self._complete(seq, record, end, line)
+            else:
+                self._queues[sns].put_nowait((seq, line, end, account_id))
+            seq += 1
+        # 取得中の分が書き出されるまで待つ
+        for _ in range(self.window):
+            await self._slots.acquire()
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    fmt = _output_format(args.output)
+    checkpoint = Checkpoint(args.checkpoint or args.output.with_name(args.output.name + ".checkpoint.json"))
+    input_path = args.input.resolve()
+
+    state = None if args.restart else checkpoint.load()
+    if state is not None:
+        if state.get("input") != str(input_path) or state.get("format") != fmt:
+            print(f"checkpoint {checkpoint.path} is for a different input or format; use --restart", file=sys.stderr)
+            return 2
+        if state.get("complete"):
+            print(f"already complete ({state['line']:,} lines); use --restart to run again", file=sys.stderr)
+            return 0
+        if state["offset"] > input_path.stat().st_size:
+            print("input is shorter than the checkpoint; use --restart", file=sys.stderr)
+            return 2
+        print(f"resuming after line {state['line']:,}", file=sys.stderr)
+    else:
+        state = {"input": str(input_path), "format": fmt, "offset": 0, "line": 0, "writer": None}
+
+    writer = ParquetWriter(args.output) if fmt == "parquet" else LineWriter(args.output, fmt)
+    concurrency = {**settings.batch_concurrency, **(args.concurrency or {})}
+
+    pool = HTTPClientPool()
+    scheduler = OutboundScheduler() if settings.scheduler_enabled else None
+    executor = ParserExecutor.from_settings()
+    resilience = Resilience() if settings.breaker_enabled or settings.hedge_enabled else None
+    proxies = ProxyPool.from_settings()
+    clients = ClientRegistry.from_settings(pool, scheduler, executor, resilience, proxies)
+    snapshots = None
+    if args.snapshots:
+        snapshots = SnapshotStore(
+            settings.snapshot_db_path,
+            flush_interval=settings.snapshot_flush_interval,
+            batch_size=settings.snapshot_batch_size,
+            queue_size=settings.snapshot_queue_size,
+        )
+        await snapshots.start()
+
+    export = BulkExport(
+        clients,
+        writer,
+        checkpoint,
+        concurrency,
+        window=args.window,
+        retries=args.retries,
+        checkpoint_every=args.checkpoint_every,
+        checkpoint_interval=args.checkpoint_interval,
+        snapshots=snapshots,
+    )
+    try:
+        await export.run(input_path, state)
+    finally:
+        if snapshots is not None:
+            await snapshots.aclose()
+        executor.shutdown()
+        await pool.aclose()
+        if proxies is not None:
+            await proxies.aclose()
+
+    summary = ", ".join(f"{outcome} {count:,}" for outcome, count in sorted(export.counts.items()))
+    print(f"wrote {args.output} ({summary})", file=sys.stderr)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="大量アカウントの一括取得（再開可能）")
+    parser.add_argument("input", type=Path, help="入力CSV（sns,account_id）")
+    parser.add_argument("output", type=Path, help="出力先（.csv / .ndjson / .parquet）")
+    parser.add_argument("--checkpoint", type=Path, help="チェックポイントファイル（既定: <output>.checkpoint.json）")
+    parser.add_argument("--restart", action="store_true", help="チェックポイントを無視して最初から実行する")
+    parser.add_argument("--concurrency", type=_parse_concurrency,
+                        help="プラットフォームごとの同時実行数（例: youtube=16,instagram=2）")
+    parser.add_argument("--window", type=int, default=2000, help="取得中・書き出し待ちの最大件数")
+    parser.add_argument("--retries", type=int, default=2, help="タイムアウト・ブロックなど一時的な失敗の再試行回数")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="チェックポイントを保存する件数の間隔")
+    parser.add_argument("--checkpoint-interval", type=float, default=10.0, help="チェックポイントを保存する時間の間隔（秒）")
+    parser.add_argument("--snapshots", action="store_true", help="取得結果をスナップショットストアにも記録する")
+    args = parser.parse_args()
+    try:
+        _output_format(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,145 @@
-from fastapi import FastAPI, HTTPException, Query
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import time
+from contextlib import asynccontextmanager
+from email.utils import format_datetime
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from api.config import settings
+from api.models import HealthCheck, AccountInfo, SNSPlatform, AccountHistory, SnapshotPoint, WatchlistRequest
+from api.services.http_pool import HTTPClientPool
+from api.services.scheduler import OutboundScheduler
+from api.services.resilience import Resilience
+from api.services.executor import ParserExecutor
+from api.services.proxy_pool import ProxyPool
+from api.services.registry import ClientRegistry
+from api.services.cache import AccountCache, NegativeCache
+from api.services.account_service import AccountResult, AccountService
+from api.services.errors import CircuitOpenError, NegativeCacheHit, find_error, http_status_for
+from api.services.batch import BatchInputError, read_items, run_batch
+from api.services.cluster import SECRET_HEADER, Cluster, encode_error
+from api.services.shared_cache import SharedCache, backend_from_url
+from api.services.snapshot_store import SnapshotStore
+from api.services.watchlist import Watchlist
+from api.services.subscriptions import SubscriptionHub, parse_keys
+from api.services import metrics, tracing
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    アプリケーションのライフサイクル管理
+
+    プラットフォームごとに接続プール付きのHTTPクライアントを1つ作成し、
+    全リクエストで共有する（DNS/TCP/TLSハンドシェイクの再利用）。
+    プラットフォームクライアントはそのプラットフォームが最初に使われたときに読み込んで生成する
+    """
+    pool = HTTPClientPool()
+    scheduler = OutboundScheduler() if settings.scheduler_enabled else None
+    app.state.scheduler = scheduler
+    executor = ParserExecutor.from_settings()
+    resilience = Resilience() if settings.breaker_enabled or settings.hedge_enabled else None
+    app.state.resilience = resilience
+    proxies = ProxyPool.from_settings()
+    app.state.proxies = proxies
+    clients = ClientRegistry.from_settings(pool, scheduler, executor, resilience, proxies)
+    cache = None
+    if settings.cache_enabled:
+        cache = AccountCache(
+            ttl=settings.cache_ttl,
+            stale_ttl=settings.cache_stale_ttl,
+            max_entries=settings.cache_max_entries,
+            max_bytes=settings.cache_max_bytes,
+        )
+    negative = None
+    if settings.negative_cache_enabled:
+        negative = NegativeCache(
+            ttl=settings.negative_cache_ttl,
+            suspend=settings.negative_cache_suspend,
+            max_entries=settings.negative_cache_max_entries,
+        )
+    shared = None
+    if settings.shared_cache_url:
+        shared = SharedCache(
+            backend_from_url(settings.shared_cache_url, timeout=settings.shared_cache_timeout),
+            ttl=settings.cache_ttl,
+            stale_ttl=settings.cache_stale_ttl,
+            prefix=settings.shared_cache_prefix,
+            lock_ttl=settings.shared_cache_lock_ttl,
+            lock_wait=settings.shared_cache_lock_wait,
+        )
+    snapshots = None
+    if settings.snapshot_enabled:
+        snapshots = SnapshotStore(
+            settings.snapshot_db_path,
+            flush_interval=settings.snapshot_flush_interval,
+            batch_size=settings.snapshot_batch_size,
+            queue_size=settings.snapshot_queue_size,
+        )
+        await snapshots.start()
+    service = AccountService(clients, cache, snapshots, shared, negative)
+    if settings.watchlist_enabled:
+        service.watchlist = Watchlist(
+            service,
+            interval=settings.watchlist_interval,
+            budget=settings.watchlist_budget,
+            min_interval=settings.watchlist_min_interval,
+            max_inflight=settings.watchlist_max_inflight,
+            read_half_life=settings.watchlist_read_half_life,
+            volatility_ref=settings.watchlist_volatility_ref,
+            max_entries=settings.watchlist_max_entries,
+        )
+        if settings.watchlist_file:
+            service.watchlist.load_file(settings.watchlist_file)
+        service.watchlist.start()
+    cluster = Cluster.from_settings()
+    if cluster is not None:
+        service.cluster = cluster
+        cluster.start()
+    app.state.account_service = service
+    subscriptions = None
+    if settings.subscriptions_enabled:
+        subscriptions = SubscriptionHub(
+            service,
+            interval=settings.subscription_interval,
+            max_keys=settings.subscription_max_keys,
+            max_topics=settings.subscription_max_topics,
+            max_subscribers=settings.subscription_max_subscribers,
+        )
+    app.state.subscriptions = subscriptions
+    loop_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    try:
+        yield
+    finally:
+        loop_monitor.cancel()
+        if subscriptions is not None:
+            await subscriptions.aclose()
+        await app.state.account_service.aclose()
+        if cluster is not None:
+            await cluster.aclose()
+        if snapshots is not None:
+            await snapshots.aclose()
+        if shared is not None:
+            await shared.aclose()
+        await pool.aclose()
+        if proxies is not None:
+            await proxies.aclose()
+        executor.shutdown()
 
-from api.models import HealthCheck, AccountInfo, SNSPlatform
-from api.services.youtube_client import YouTubeClient
-from api.services.tiktok_client import TikTokClient
-from api.services.instagram_client import InstagramClient
-from api.services.facebook_client import FacebookClient
 
 app = FastAPI(
     title="SNS Fetcher API",
     description="SNSデータ取得・管理API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS設定
@@ -22,6 +150,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.get("/", tags=["Root"])
@@ -43,10 +172,116 @@ async def health_check():
     )
 
 
+@app.get("/stats", tags=["Health"])
+async def stats(request: Request):
+    """キャッシュ・リクエスト集約・外向きスケジューラの統計情報"""
+    service: AccountService = request.app.state.account_service
+    stats = service.stats()
+    stats["platforms"] = service.clients.stats()
+    if request.app.state.scheduler is not None:
+        stats["scheduler"] = request.app.state.scheduler.stats()
+    if request.app.state.resilience is not None:
+        stats["resilience"] = request.app.state.resilience.stats()
+    if request.app.state.proxies is not None:
+        stats["proxies"] = request.app.state.proxies.stats()
+    if request.app.state.subscriptions is not None:
+        stats["subscriptions"] = request.app.state.subscriptions.stats()
+    return stats
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def get_metrics():
+    """Prometheus形式のメトリクス（上流の応答時間・ダウンロード量・解析時間・取得結果の分類など）"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/account/history", response_model=AccountHistory, tags=["Account"])
+async def get_account_history(
+    request: Request,
+    sns: SNSPlatform = Query(..., description="SNSプラットフォーム (youtube, tiktok, instagram, facebook)"),
+    account_id: str = Query(..., description="アカウントID"),
+    start: Optional[datetime] = Query(None, description="期間の開始（省略時は終了の30日前）"),
+    end: Optional[datetime] = Query(None, description="期間の終了（省略時は現在）"),
+    step: Optional[int] = Query(None, ge=1, description="間引きの間隔（秒）。省略時は max_points に収まるよう自動計算"),
+    max_points: int = Query(500, ge=1, le=settings.history_max_points, description="返す点数の上限"),
+):
+    """
+    保存済みのフォロワー数の履歴を取得（上流へのアクセスなし）
+
+    期間を step 秒ごとの区間に分け、各区間の最新のスナップショットを返す
+
+    Returns:
+        AccountHistory: 履歴
+    """
+    service: AccountService = request.app.state.account_service
+    if service.snapshots is None:
+        raise HTTPException(status_code=503, detail="Snapshot store is disabled")
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    start_ts, end_ts = start.timestamp(), end.timestamp()
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    if step is None:
+        step = max(1, math.ceil((end_ts - start_ts) / max_points))
+
+    rows = await service.snapshots.history(sns, account_id, start_ts, end_ts, step)
+    return AccountHistory(
+        sns=sns,
+        account_id=account_id,
+        start=start,
+        end=end,
+        step=step,
+        points=[
+            SnapshotPoint(
+                timestamp=datetime.fromtimestamp(row["ts"], tz=timezone.utc),
+                followers_count=row["followers_count"],
+                following_count=row["following_count"],
+                post_count=row["post_count"],
+            )
+            for row in rows[-max_points:]
+        ],
+    )
+
+
+def _validator_headers(result: AccountResult, body: bytes) -> dict:
+    """
+    下流のキャッシュ（CDN・ブラウザ）向けの検証子と鮮度のヘッダー
+
+    max-age はこのサーバーのキャッシュの残りの有効期間（STALEの値は0）
+    """
+    now = time.time()
+    cache_control = f"public, max-age={max(0, int(result.expires_at - now))}"
+    if settings.cache_enabled and settings.cache_stale_ttl > 0:
+        cache_control += f", stale-while-revalidate={int(settings.cache_stale_ttl)}"
+    return {
+        "ETag": f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+        "Last-Modified": format_datetime(datetime.fromtimestamp(result.fetched_at, tz=timezone.utc), usegmt=True),
+        "Age": str(int(result.age)),
+        "Cache-Control": cache_control,
+    }
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match の弱い比較（W/ の有無を区別しない）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
 @app.get("/account/", response_model=AccountInfo, tags=["Account"])
 async def get_account(
+    request: Request,
     sns: SNSPlatform = Query(..., description="SNSプラットフォーム (youtube, tiktok, instagram, facebook)"),
-    account_id: str = Query(..., description="アカウントID")
+    account_id: str = Query(..., description="アカウントID"),
+    max_age: Optional[float] = Query(None, ge=0, description="許容する値の古さ（秒）。これより古いキャッシュは使わず取得する"),
+    deadline_ms: Optional[int] = Query(None, ge=1, description="上流からの取得を待つ上限（ミリ秒）。過ぎたら手元の最新の値を返す"),
+    trace: bool = Query(False, description="区間ごとの所要時間の内訳をレスポンスに含める"),
 ):
     """
     SNSアカウント情報を取得
@@ -60,34 +295,325 @@ async def get_account(
 
     Returns:
         AccountInfo: アカウント情報 (ID, 名前, フォロワー数, フォロー数)
+
+    レスポンスヘッダー `X-Cache` にキャッシュ状態 (HIT, MISS, STALE) を、
+    `Server-Timing` に区間ごとの所要時間（cache, queue, upstream, download, parse, validate など）を返す
+
+    `max_age` を指定すると、TTLに関係なくその秒数より新しいキャッシュの値を返し、古ければ上流から取得する。
+    `deadline_ms` を指定すると、取得がその時間内に終わらない場合は手元にある最も新しい値を
+    STALEとして返す（値がなければ504）。
+
+    レスポンスには `ETag`, `Last-Modified`, `Age`, `Cache-Control` を付け、
+    `If-None-Match` が一致する場合は本文なしの304を返す
+
+    `trace=1` の場合は {"data": AccountInfo, "trace": 内訳} を返す。内訳には接続・TLS・TTFB、
+    解析の内訳（scan, bs4, locate, json）、ダウンロードしたバイト数、リダイレクトが含まれる
     """
+    request_trace = tracing.Trace(detailed=trace)
+    token = tracing.activate(request_trace)
+    start = time.perf_counter()
     try:
-        if sns == SNSPlatform.YOUTUBE:
-            client = YouTubeClient()
-            return await client.get_account_info(account_id)
-
-        elif sns == SNSPlatform.TIKTOK:
-            client = TikTokClient()
-            return await client.get_account_info(account_id)
-
-        elif sns == SNSPlatform.INSTAGRAM:
-            client = InstagramClient()
-            return await client.get_account_info(account_id)
-
-        elif sns == SNSPlatform.FACEBOOK:
-            client = FacebookClient()
-            return await client.get_account_info(account_id)
-
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported SNS platform: {sns}"
+        service: AccountService = request.app.state.account_service
+        deadline = deadline_ms / 1000 if deadline_ms is not None else None
+        result = await service.get_account(sns, account_id, max_age=max_age, deadline=deadline)
+        request_trace.add("total", time.perf_counter() - start)
+        headers = {
+            "X-Cache": result.status.value,
+            "Server-Timing": request_trace.server_timing(),
+        }
+        if trace:
+            headers["Cache-Control"] = "no-store"
+            return JSONResponse(
+                {"data": result.value.model_dump(mode="json"), "trace": request_trace.to_dict()},
+                headers=headers,
             )
+        body = result.value.model_dump_json().encode("utf-8")
+        headers.update(_validator_headers(result, body))
+        if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
 
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        # 存在しないアカウントは404、サーキットブレーカーで送信しなかった場合は503、
+        # 期限までに取得できず返せる値もなかった場合は504
+        headers = {}
+        if isinstance(e, NegativeCacheHit):
+            headers["X-Cache"] = "NEGATIVE"
+        circuit = find_error(e, CircuitOpenError)
+        if circuit is not None:
+            headers["Retry-After"] = str(max(1, math.ceil(circuit.retry_after)))
+        raise HTTPException(status_code=http_status_for(e), detail=str(e), headers=headers or None)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+    finally:
+        tracing.deactivate(token)
+
+
+@app.get("/internal/account", include_in_schema=False)
+async def get_account_internal(
+    request: Request,
+    sns: SNSPlatform = Query(...),
+    account_id: str = Query(...),
+    max_age: Optional[float] = Query(None, ge=0),
+    deadline_ms: Optional[int] = Query(None, ge=1),
+):
+    """
+    クラスタ内の他ノードから転送された取得（所有ノード側）
+
+    他のノードには再転送せず、自ノードのキャッシュ・上流から取得する
+    （メンバーの認識がノード間でずれていても転送がループしない）。
+    取得の失敗は /account/ と同じステータスコードで、種類を本文に含めて返す。
+
+    クラスタモードでのみ有効。CLUSTER_SECRET を設定した場合は X-Cluster-Secret ヘッダーが
+    一致しないリクエストを拒否する（未設定時は認証しないため、ネットワークで制限すること）
+    """
+    service: AccountService = request.app.state.account_service
+    if service.cluster is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.cluster_secret and not hmac.compare_digest(
+        request.headers.get(SECRET_HEADER, "").encode("utf-8"), settings.cluster_secret.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="Invalid cluster secret")
+    deadline = deadline_ms / 1000 if deadline_ms is not None else None
+    try:
+        result = await service.get_account(sns, account_id, max_age=max_age, deadline=deadline, local=True)
+    except ValueError as e:
+        status_code, body = encode_error(e)
+        return JSONResponse(body, status_code=status_code)
+    return {
+        "value": result.value.model_dump(mode="json"),
+        "status": result.status.value,
+        "fetched_at": result.fetched_at,
+        "expires_at": result.expires_at,
+    }
+
+
+class _BatchResponse(StreamingResponse):
+    """
+    リクエスト本文を読みながら結果を返すストリーミング応答
+
+    StreamingResponse は送信と並行して receive() で切断を監視するが、本文を読み終える前に
+    それを行うと本文のメッセージを横取りしてしまうため、読み終えてから監視を始める
+    （読み込み中の切断は本文の読み込み側で検出される）
+    """
+
+    def __init__(self, content, body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self._body_read = body_read
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self._body_read.wait()
+        await super().listen_for_disconnect(receive)
+
+
+@app.post("/accounts/batch", tags=["Account"])
+async def get_accounts_batch(request: Request):
+    """
+    複数のSNSアカウント情報をまとめて取得
+
+    リクエスト本文: {"items": [{"sns", "account_id"}, ...]}、または
+    Content-Type: application/x-ndjson で1行1件の {"sns", "account_id"}
+
+    本文は全体を読み込まずに少しずつ読み、届いた項目から順にプラットフォームごとの
+    ワーカーに渡す（同時実行数はプラットフォームごとに制限）。
+    完了した順に1行1件のNDJSON (application/x-ndjson) でストリーミングする。
+
+    各行の形式:
+      - 成功: {"index", "sns", "account_id", "status": "ok", "cache", "data": AccountInfo}
+      - 失敗: {"index", "sns", "account_id", "status": "error", "status_code", "error"}
+      - 本文の途中が不正・上限超過: {"status": "error", "status_code", "error"}
+        （それまでに届いた項目の結果は返す。最初の項目までの不正は 400/413 で応答する）
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > settings.batch_max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Request body too large (max {settings.batch_max_bytes} bytes)"
+        )
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    body_read = asyncio.Event()
+
+    async def chunks():
+        async for chunk in request.stream():
+            yield chunk
+        body_read.set()
+
+    items = read_items(chunks(), ndjson, settings.batch_max_items, settings.batch_max_bytes)
+    # 最初の項目までは応答を始める前に読み、本文の形式の誤りをステータスコードで返す
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except BatchInputError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    async def all_items():
+        if first is None:
+            return
+        yield first
+        async for item in items:
+            yield item
+
+    service: AccountService = request.app.state.account_service
+
+    async def stream():
+        async for result in run_batch(service, all_items(), settings.batch_concurrency):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return _BatchResponse(stream(), body_read, media_type="application/x-ndjson")
+
+
+def _get_watchlist(request: Request) -> Watchlist:
+    service: AccountService = request.app.state.account_service
+    if service.watchlist is None:
+        raise HTTPException(status_code=503, detail="Watchlist is disabled")
+    return service.watchlist
+
+
+@app.get("/watchlist", tags=["Watchlist"])
+async def list_watchlist(request: Request):
+    """ウォッチリストの登録アカウントと更新状態の一覧"""
+    return {"items": _get_watchlist(request).entries()}
+
+
+@app.post("/watchlist", tags=["Watchlist"])
+async def add_watchlist(request: Request, body: WatchlistRequest):
+    """
+    アカウントをウォッチリストに登録
+
+    登録アカウントはバックグラウンドで定期的に再取得され、
+    `/account/` での参照はキャッシュから返される
+    """
+    watchlist = _get_watchlist(request)
+    try:
+        added = sum(watchlist.add(item.sns, item.account_id) for item in body.items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"added": added, "total": len(watchlist)}
+
+
+@app.delete("/watchlist", tags=["Watchlist"])
+async def remove_watchlist(
+    request: Request,
+    sns: SNSPlatform = Query(..., description="SNSプラットフォーム"),
+    account_id: str = Query(..., description="アカウントID"),
+):
+    """アカウントをウォッチリストから削除"""
+    watchlist = _get_watchlist(request)
+    if not watchlist.remove(sns, account_id):
+        raise HTTPException(status_code=404, detail="Account is not in the watchlist")
+    return {"removed": 1, "total": len(watchlist)}
+
+
+def _get_subscriptions(app: FastAPI) -> SubscriptionHub:
+    if app.state.subscriptions is None:
+        raise HTTPException(status_code=503, detail="Subscriptions are disabled")
+    return app.state.subscriptions
+
+
+@app.get("/subscribe", tags=["Subscribe"])
+async def subscribe(
+    request: Request,
+    keys: str = Query(..., description="購読する 'sns:account_id' のカンマ区切り（例: youtube:@foo,tiktok:bar）"),
+):
+    """
+    アカウントの変化をServer-Sent Eventsで購読
+
+    各アカウントは購読者の数に関係なく共有のポーラーが一定間隔（`SUBSCRIPTION_INTERVAL`）で1回だけ取得し、
+    値が変わったフィールドだけを全購読者に配信する。
+
+    イベント:
+      - snapshot: 取得済みの全フィールド {"sns", "account_id", "fetched_at", "account_name",
+        "followers_count", "following_count", "post_count"}（購読開始時・最初の取得時）
+      - delta: 変化したフィールドのみ {"sns", "account_id", "fetched_at", ...}
+      - error: 取得の失敗 {"sns", "account_id", "status_code", "error"}（内容が変わったときのみ）
+
+    送信が追いつかない購読者には同じアカウントの未送信のイベントをまとめて送る。
+    イベントがない間は `SUBSCRIPTION_HEARTBEAT` 秒ごとにコメント行を送る
+    """
+    hub = _get_subscriptions(request.app)
+    try:
+        subscription = hub.open(parse_keys(keys))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await subscription.next(settings.subscription_heartbeat)
+                except StopAsyncIteration:
+                    break
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                name, data = event
+                yield f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            subscription.close()
+
+    # 本文の送信が始まる前に切断された場合は stream() の finally が実行されないため、応答の終了時にも閉じる
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(subscription.close),
+    )
+
+
+@app.websocket("/subscribe/ws")
+async def subscribe_ws(websocket: WebSocket, keys: str = ""):
+    """
+    アカウントの変化をWebSocketで購読（イベントの内容は /subscribe と同じ）
+
+    - 受信: {"subscribe": ["sns:account_id", ...]} / {"unsubscribe": ["sns:account_id", ...]}
+    - 送信: {"event": "snapshot" | "delta" | "error", "data": {...}}、
+      受信したメッセージが不正な場合は {"event": "invalid", "data": {"error": ...}}
+    """
+    hub = websocket.app.state.subscriptions
+    await websocket.accept()
+    if hub is None:
+        await websocket.close(code=1013, reason="Subscriptions are disabled")
+        return
+    try:
+        subscription = hub.open(parse_keys(keys))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e)[:120])
+        return
+
+    async def send_events():
+        while True:
+            try:
+                event = await subscription.next(settings.subscription_heartbeat)
+            except StopAsyncIteration:
+                return
+            if event is None:
+                await websocket.send_json({"event": "ping"})
+                continue
+            name, data = event
+            await websocket.send_json({"event": name, "data": data})
+
+    sender = asyncio.create_task(send_events())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if not isinstance(message, dict):
+                    raise ValueError("Message must be a JSON object")
+                if message.get("subscribe"):
+                    subscription.add(parse_keys(",".join(message["subscribe"])))
+                if message.get("unsubscribe"):
+                    subscription.remove(parse_keys(",".join(message["unsubscribe"])))
+            except (TypeError, ValueError) as e:
+                await websocket.send_json({"event": "invalid", "data": {"error": str(e)}})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -38,3 +38,47 @@ class HealthCheck(BaseModel):
     """ヘルスチェック応答モデル"""
     status: str
     timestamp: datetime
+
+
+class BatchItem(BaseModel):
+    """バッチ取得の対象1件"""
+    sns: SNSPlatform = Field(..., description="SNSプラットフォーム")
+    account_id: str = Field(..., description="アカウントID")
+
+
+class BatchRequest(BaseModel):
+    """バッチ取得リクエストモデル"""
+    items: List[BatchItem] = Field(..., description="取得対象の (sns, account_id) のリスト")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"sns": "youtube", "account_id": "@tenuguisyatyou"},
+                    {"sns": "tiktok", "account_id": "ay_an21"}
+                ]
+            }
+        }
+
+
+class SnapshotPoint(BaseModel):
+    """フォロワー数のスナップショット1件"""
+    timestamp: datetime = Field(..., description="取得日時")
+    followers_count: int = Field(..., description="フォロワー数")
+    following_count: int = Field(..., description="フォロー数")
+    post_count: Optional[int] = Field(None, description="投稿数")
+
+
+class AccountHistory(BaseModel):
+    """フォロワー数の履歴応答モデル"""
+    sns: SNSPlatform = Field(..., description="SNSプラットフォーム")
+    account_id: str = Field(..., description="アカウントID")
+    start: datetime = Field(..., description="期間の開始")
+    end: datetime = Field(..., description="期間の終了")
+    step: int = Field(..., description="間引きの間隔（秒）")
+    points: List[SnapshotPoint] = Field(..., description="各区間の最新のスナップショット")
+
+
+class WatchlistRequest(BaseModel):
+    """ウォッチリスト登録リクエストモデル"""
+    items: List[BatchItem] = Field(..., description="定期更新する (sns, account_id) のリスト")
@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from api.models import AccountInfo, SNSPlatform
+from api.services import metrics, tracing
+from api.services.errors import ClusterUnavailableError, DeadlineExceededError, NegativeCacheHit
+from api.services.cache import AccountCache, CacheKey, CacheStatus, NegativeCache, make_cache_key
+from api.services.shared_cache import SharedCache, SharedEntry
+from api.services.singleflight import SingleFlight
+from api.services.snapshot_store import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# 上流が不安定なことを示す取得結果（この間はネガティブキャッシュに記録しない）
+_TRANSIENT_OUTCOMES = ("timeout", "upstream_error", "blocked", "circuit_open")
+
+
+@dataclass
+class AccountResult:
+    """get_account の結果"""
+    value: AccountInfo
+    status: CacheStatus
+    fetched_at: float  # 上流から取得した時刻（UNIX時刻）
+    expires_at: float  # キャッシュの有効期限（UNIX時刻。過ぎていればSTALE）
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class AccountService:
+    """
+    プラットフォームクライアントの前段に立つアカウント情報取得サービス
+
+    キャッシュを参照し、ミス時のみクライアントでスクレイピングする。
+    期限切れ（stale）の値はそのまま返し、バックグラウンドで更新する。
+    同じキーへの同時取得はsingle-flightで1回の上流取得にまとめる。
+    取得に成功した結果はスナップショットストアに記録する。
+    ウォッチリストが設定されている場合は参照を記録し、登録アカウントは
+    次の定期更新まで期限切れにならないTTLでキャッシュする。
+
+    共有キャッシュ（2層目）が設定されている場合は、プロセス内キャッシュのミス時に参照し、
+    上流からの取得はキーごとのワーカー間ロックを取った1つのワーカーだけが行う。
+
+    存在しないアカウントなど恒久的な失敗はネガティブキャッシュに記録し、
+    期限まで上流に問い合わせずに同じエラーを返す。
+
+    クラスタモードでは、他のノードが所有するキーは所有ノードに転送し、
+    到達できない場合だけ自ノードで取得する。
+    """
+
+    def __init__(
+        self,
+        clients: Dict[SNSPlatform, Any],
+        cache: Optional[AccountCache] = None,
+        snapshots: Optional[SnapshotStore] = None,
+        shared: Optional[SharedCache] = None,
+        negative: Optional[NegativeCache] = None,
+    ):
+        self.clients = clients
+        self.cache = cache
+        self.snapshots = snapshots
+        self.shared = shared
+        self.negative = negative
+        self.watchlist: Optional[Any] = None  # Watchlist（サービス生成後に設定）
+        self.cluster: Optional[Any] = None  # Cluster（サービス生成後に設定）
+        self.singleflight = SingleFlight()
+        self._refresh_tasks: Dict[CacheKey, asyncio.Task] = {}
+        # プラットフォームごとのメトリクス系列（記録時にラベルを引かない）
+        self._fetch_total = {
+            sns: {outcome: metrics.FETCH_TOTAL.labels(sns.value, outcome) for outcome in metrics.OUTCOMES}
+            for sns in SNSPlatform
+        }
+        self._fetch_seconds = {sns: metrics.FETCH_SECONDS.labels(sns.value) for sns in SNSPlatform}
+        self._fetch_inflight = {sns: metrics.FETCH_INFLIGHT.labels(sns.value) for sns in SNSPlatform}
+        self._cache_lookups = {
+            sns: {result: metrics.CACHE_LOOKUPS.labels(sns.value, result) for result in metrics.CACHE_RESULTS}
+            for sns in SNSPlatform
+        }
+        self._shared_lookups = {
+            sns: {status: metrics.SHARED_CACHE_LOOKUPS.labels(sns.value, status.value) for status in CacheStatus}
+            for sns in SNSPlatform
+        }
+
+    def get_client(self, sns: SNSPlatform) -> Any:
+        client = self.clients.get(sns)
+        if client is None:
+            raise ValueError(f"Unsupported SNS platform: {getattr(sns, 'value', sns)}")
+        return client
+
+    async def fetch(self, sns: SNSPlatform, account_id: str, max_age: Optional[float] = None) -> AccountInfo:
+        """
+        キャッシュを経由せずにクライアントから取得し、結果をキャッシュに保存
+
+        max_age を指定した場合、共有キャッシュにその秒数以内に他のワーカーが保存した値があれば
+        上流から取得せずにそれを使う（定期更新・バックグラウンド更新の重複を避ける）
+        """
+        return (await self._fetch_result(sns, account_id, max_age)).value
+
+    async def _fetch_result(
+        self, sns: SNSPlatform, account_id: str, max_age: Optional[float], deadline_at: Optional[float] = None
+    ) -> AccountResult:
+        """
+        single-flightで取得
+
+        deadline_at（monotonic時刻）はスケジューラでの送信待ちの順番に使う。
+        同じキーの取得に後から合流したリクエストの期限は反映されない
+        """
+        key = make_cache_key(sns, account_id)
+        client = self.get_client(sns)
+        with tracing.phase("fetch"):
+            return await self.singleflight.do(
+                key, lambda: self._fetch_shared(client, key, account_id, max_age, deadline_at)
+            )
+
+    async def _fetch_shared(
+        self,
+        client: Any,
+        key: CacheKey,
+        account_id: str,
+        max_age: Optional[float],
+        deadline_at: Optional[float] = None,
+    ) -> AccountResult:
+        """ワーカー間ロックを取って取得（共有キャッシュがなければそのまま取得）"""
+        if self.shared is None:
+            return await self._fetch_and_store(client, key, account_id, deadline_at)
+
+        since = time.time()
+        if max_age is not None:
+            with tracing.phase("l2"):
+                entry = await self.shared.get(key)
+            if entry is not None and entry.stored_at >= since - max_age:
+                self._store_local(key, entry)
+                return AccountResult(entry.value, CacheStatus.MISS, entry.stored_at, entry.expires_at)
+
+        with tracing.phase("lock"):
+            acquired, token = await self.shared.lock(key)
+        if not acquired:
+            # 他のワーカーが取得中なので、共有キャッシュに結果が書かれるのを待つ
+            with tracing.phase("lock_wait"):
+                entry = await self.shared.wait_for_value(key, since)
+            if entry is not None:
+                self._store_local(key, entry)
+                return AccountResult(entry.value, CacheStatus.MISS, entry.stored_at, entry.expires_at)
+        try:
+            return await self._fetch_and_store(client, key, account_id, deadline_at)
+        finally:
+            await self.shared.unlock(key, token)
+
+    async def _fetch_and_store(
+        self, client: Any, key: CacheKey, account_id: str, deadline_at: Optional[float] = None
+    ) -> AccountResult:
+        sns = key[0]
+        inflight = self._fetch_inflight[sns]
+        start = time.perf_counter()
+        inflight.inc()
+        try:
+            info = await client.get_account_info(account_id, deadline=deadline_at)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            outcome = metrics.classify_error(e)
+            self._fetch_total[sns][outcome].inc()
+            if self.negative is not None:
+                if outcome in _TRANSIENT_OUTCOMES:
+                    self.negative.suspend(sns)
+                    self.negative.delete(key)
+                else:
+                    self.negative.record(key, e)
+            raise
+        else:
+            self._fetch_total[sns]["ok"].inc()
+            if self.negative is not None:
+                self.negative.delete(key)
+        finally:
+            inflight.dec()
+            self._fetch_seconds[sns].observe(time.perf_counter() - start)
+
+        fetched_at = time.time()
+        ttl = self.watchlist.cache_ttl(key) if self.watchlist is not None else None
+        if self.cache is not None:
+            self.cache.set(key, info, ttl, fetched_at)
+        if self.shared is not None:
+            await self.shared.set(key, info, ttl)
+        if self.snapshots is not None:
+            self.snapshots.record(key, info)
+        return AccountResult(info, CacheStatus.MISS, fetched_at, fetched_at + (ttl or self._ttl_for(key[0])))
+
+    def _ttl_for(self, sns: SNSPlatform) -> float:
+        if self.cache is not None:
+            return self.cache.ttl_for(sns)
+        if self.shared is not None:
+            return self.shared.ttl_for(sns)
+        return 0.0
+
+    def _store_local(self, key: CacheKey, entry: SharedEntry) -> None:
+        """共有キャッシュの値を残りの有効期間でプロセス内キャッシュに保存"""
+        if self.cache is not None:
+            self.cache.set(key, entry.value, entry.expires_at - time.time(), entry.stored_at)
+
+    async def get_account(
+        self,
+        sns: SNSPlatform,
+        account_id: str,
+        max_age: Optional[float] = None,
+        deadline: Optional[float] = None,
+        local: bool = False,
+    ) -> AccountResult:
+        """
+        アカウント情報を取得
+
+        Args:
+            max_age: 許容する値の古さ（秒）。指定時はTTLに関係なく、これより新しいキャッシュの値を返し、
+                古ければ上流から取得する（未指定時はTTL内ならHIT、stale期間内ならSTALEとして返す）
+            deadline: 上流からの取得を待つ上限（秒）。過ぎた場合は手元にある最も新しい値を
+                STALEとして返し（取得はバックグラウンドで続ける）、値がなければ DeadlineExceededError
+            local: クラスタモードでも所有ノードに転送せず自ノードで取得する（転送されてきたリクエスト用）
+
+        Returns:
+            値とキャッシュ状態・取得時刻・有効期限
+        """
+        started = time.monotonic()
+        key = make_cache_key(sns, account_id)
+        if self.cluster is not None and not local:
+            owner = self.cluster.route(key)
+            if owner is not None:
+                try:
+                    with tracing.phase("forward"):
+                        return await self.cluster.forward(owner, sns, key[1], max_age, deadline)
+                except ClusterUnavailableError as e:
+                    # deadline は started からの経過で判定するため、転送に使った時間も含まれる
+                    logger.warning("%s; fetching %s/%s locally", e, sns.value, key[1])
+
+        if self.watchlist is not None:
+            self.watchlist.note_read(key)
+
+        if self.negative is not None:
+            try:
+                self.negative.check(key)
+            except NegativeCacheHit:
+                self._cache_lookups[sns]["NEGATIVE"].inc()
+                raise
+
+        # max_age より古いなどで使わなかった値（期限までに取得できなかった場合に返す）
+        fallback: Optional[AccountResult] = None
+
+        if self.cache is not None:
+            with tracing.phase("cache"):
+                entry, status = self.cache.lookup(key)
+            self._cache_lookups[sns][status.value].inc()
+            if entry is not None:
+                # プロセス内キャッシュの期限はmonotonic時刻なのでUNIX時刻に換算する
+                expires_at = time.time() + entry.expires_at - time.monotonic()
+                result = AccountResult(entry.value, status, entry.fetched_at, expires_at)
+                if self._acceptable(result, max_age):
+                    if status == CacheStatus.STALE:
+                        self._schedule_refresh(key, sns, account_id)
+                    return result
+                fallback = result
+
+        if self.shared is not None:
+            with tracing.phase("l2"):
+                shared_entry = await self.shared.get(key)
+            status = CacheStatus.MISS
+            if shared_entry is not None:
+                status = CacheStatus.HIT if time.time() < shared_entry.expires_at else CacheStatus.STALE
+            self._shared_lookups[sns][status].inc()
+            if shared_entry is not None:
+                result = AccountResult(shared_entry.value, status, shared_entry.stored_at, shared_entry.expires_at)
+                if self._acceptable(result, max_age):
+                    if status == CacheStatus.HIT:
+                        self._store_local(key, shared_entry)
+                    else:
+                        self._schedule_refresh(key, sns, account_id)
+                    return result
+                if fallback is None or result.fetched_at > fallback.fetched_at:
+                    fallback = result
+
+        fetch = self._fetch_result(sns, account_id, max_age, started + deadline if deadline is not None else None)
+        if deadline is None:
+            return await fetch
+        try:
+            # 待つのをやめても取得自体はsingle-flightのタスクとして続き、結果はキャッシュに入る
+            return await asyncio.wait_for(fetch, max(0.0, deadline - (time.monotonic() - started)))
+        except asyncio.TimeoutError:
+            if fallback is None:
+                raise DeadlineExceededError(f"Deadline exceeded after {deadline * 1000:.0f} ms") from None
+            fallback.status = CacheStatus.STALE
+            return fallback
+
+    @staticmethod
+    def _acceptable(result: AccountResult, max_age: Optional[float]) -> bool:
+        """キャッシュの値をそのまま返してよいか"""
+        if max_age is None:
+            return True  # HIT、またはstale期間内（バックグラウンドで更新する）
+        return result.age <= max_age
+
+    def _schedule_refresh(self, key: CacheKey, sns: SNSPlatform, account_id: str) -> None:
+        """バックグラウンド更新を登録（同一キーの更新は1つだけ）"""
+        if key in self._refresh_tasks:
+            return
+        task = asyncio.create_task(self._refresh(sns, account_id))
+        self._refresh_tasks[key] = task
+        task.add_done_callback(lambda _: self._refresh_tasks.pop(key, None))
+
+    async def _refresh(self, sns: SNSPlatform, account_id: str) -> None:
+        # 起動元リクエストのトレースに記録しない（タスクはコンテキストのコピーを持つ）
+        tracing.activate(None)
+        try:
+            # 他のワーカーが直前に更新していればその値を使う
+            ttl = self.cache.ttl_for(sns) if self.cache is not None else None
+            await self.fetch(sns, account_id, max_age=ttl)
+        except Exception as e:
+            # 失敗しても古い値はstale期間中そのまま返し続ける
+            logger.warning("Background refresh failed for %s/%s: %s", sns.value, account_id, e)
+
+    def stats(self) -> Dict[str, Any]:
+        """キャッシュとsingle-flightの統計情報"""
+        stats: Dict[str, Any] = {"singleflight": self.singleflight.stats()}
+        if self.cache is not None:
+            stats["cache"] = {
+                "entries": len(self.cache),
+                "bytes": self.cache.size_bytes,
+            }
+        if self.snapshots is not None:
+            stats["snapshots"] = self.snapshots.stats()
+        if self.negative is not None:
+            stats["negative_cache"] = {"entries": len(self.negative)}
+        if self.shared is not None:
+            stats["shared_cache"] = self.shared.stats()
+        if self.watchlist is not None:
+            stats["watchlist"] = self.watchlist.stats()
+        if self.cluster is not None:
+            stats["cluster"] = self.cluster.stats()
+        return stats
+
+    async def aclose(self) -> None:
+        """ウォッチリストと実行中のバックグラウンド更新を停止"""
+        if self.watchlist is not None:
+            await self.watchlist.aclose()
+        tasks = list(self._refresh_tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._refresh_tasks.clear()
@@ -0,0 +1,267 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from functools import partial
+
+import httpx
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+from api.config import settings
+from api.models import SNSPlatform
+from api.services.errors import PageBlockedError
+from api.services.executor import ParserExecutor
+from api.services.proxy_pool import ProxyEndpoint, ProxyPool
+from api.services.resilience import PlatformGuard, Resilience
+from api.services import metrics, tracing
+from api.services.scheduler import OutboundScheduler
+from api.services.streaming import MarkerScanner
+
+T = TypeVar("T")
+
+# 直前の _fetch で応答を返したプロキシ（同じタスク内の解析結果・ソフトブロックをそのプロキシに反映する）
+_current_proxy: ContextVar[Optional[ProxyEndpoint]] = ContextVar("current_proxy", default=None)
+
+
+class BaseScraperClient:
+    """Webスクレイピングクライアントの共通基底クラス"""
+
+    platform: SNSPlatform
+    default_base_url: str
+
+    def __init__(
+        self,
+        http_client: httpx.AsyncClient,
+        scheduler: Optional[OutboundScheduler] = None,
+        executor: Optional[ParserExecutor] = None,
+        resilience: Optional[Resilience] = None,
+        proxies: Optional[ProxyPool] = None,
+    ):
+        self.http_client = http_client
+        self.scheduler = scheduler
+        self.executor = executor
+        self.resilience = resilience
+        # 設定されている場合は http_client の代わりにプール内のプロキシ経由で送る
+        self.proxies = proxies
+        # 負荷試験などでは設定でローカルのスタブサーバーに向け先を変更できる
+        self.base_url = settings.upstream_base_urls.get(self.platform, self.default_base_url).rstrip('/')
+        # 記録のたびにラベルを引かないよう、プラットフォームの系列を保持しておく
+        label = self.platform.value
+        self._upstream_seconds = metrics.UPSTREAM_SECONDS.labels(label)
+        self._upstream_bytes = metrics.UPSTREAM_BYTES.labels(label)
+        self._upstream_inflight = metrics.UPSTREAM_INFLIGHT.labels(label)
+        self._parse_seconds = metrics.PARSE_SECONDS.labels(label)
+
+    def _scanner(self) -> Optional[MarkerScanner]:
+        """
+        必要なデータが揃ったことを判定するスキャナ
+
+        Noneの場合はバイト上限までボディ全体を読み込む
+        """
+        return None
+
+    async def _fetch(
+        self, url: str, headers: dict, deadline: Optional[float] = None
+    ) -> Tuple[httpx.Response, bytes]:
+        """
+        共有スケジューラ経由でGETリクエストを送信し、ボディをストリーミングで読み込む
+
+        スキャナが必要なデータを検出した時点、またはプラットフォームごとの
+        バイト上限に達した時点で読み込みを打ち切り、接続を閉じる。
+        サーキットブレーカーが開いている場合は送信せずに CircuitOpenError を送出し、
+        応答が観測済みのp95より遅い場合はヘッジリクエストを送る。
+        プロキシのプールがある場合は試行ごとにプロキシを選ぶ（ヘッジは別のプロキシから送る）。
+        deadline（monotonic時刻）はスケジューラに渡し、期限の早いリクエストから送信枠を得る。
+
+        Returns:
+            (レスポンス, 読み込んだボディ) のタプル。レスポンスは既に閉じられている
+        """
+        max_bytes = settings.stream_max_bytes.get(self.platform, settings.stream_default_max_bytes)
+        trace = tracing.current()
+        guard = self.resilience.guard(self.platform) if self.resilience is not None else None
+        hedged = False
+        if guard is not None:
+            guard.check()
+
+        used: List[ProxyEndpoint] = []
+        start = time.perf_counter()
+        self._upstream_inflight.inc()
+        try:
+            if guard is None:
+                response, body, proxy = await self._attempt(url, headers, max_bytes, trace, None, used, deadline)
+            else:
+                (response, body, proxy), hedged = await guard.hedged(
+                    lambda started: self._attempt(url, headers, max_bytes, trace, guard, used, deadline, started)
+                )
+        except Exception:
+            if guard is not None:
+                guard.record_failure()
+            raise
+        finally:
+            self._upstream_inflight.dec()
+            self._upstream_seconds.observe(time.perf_counter() - start)
+
+        if guard is not None:
+            guard.record_status(response.status_code)
+        _current_proxy.set(proxy)
+        if trace is not None and trace.detailed:
+            trace.attrs["upstream"] = {
+                "url": url,
+                "status": response.status_code,
+                "http_version": response.http_version,
+                "bytes": len(body),
+                "truncated": len(body) >= max_bytes,
+                "hedged": hedged,
+                "proxy": proxy.name if proxy is not None else None,
+                "redirects": [{"url": str(r.url), "status": r.status_code} for r in response.history],
+            }
+        return response, body
+
+    async def _attempt(
+        self,
+        url: str,
+        headers: dict,
+        max_bytes: int,
+        trace: Optional[tracing.Trace],
+        guard: Optional[PlatformGuard],
+        used: List[ProxyEndpoint],
+        deadline: Optional[float] = None,
+        started: Optional[asyncio.Event] = None,
+    ) -> Tuple[httpx.Response, bytes, Optional[ProxyEndpoint]]:
+        """
+        1回分の送信（ヘッジ時は並行して2回呼ばれるため、ボディのバッファは試行ごとに持つ）
+
+        プロキシ経由の場合、used に含まれるプロキシはできるだけ避け、選んだものを追加する。
+        started は送信枠を得た時点でセットする（ヘッジの待ち時間の起点）
+        """
+        body = bytearray()
+        http_client = self.http_client
+        host = httpx.URL(url).host
+        proxy = None
+        health = None
+        if self.proxies is not None:
+            # アカウント（URL）ごとに同じプロキシに寄せる
+            proxy = self.proxies.pick(self.platform, url, exclude=used)
+            used.append(proxy)
+            http_client = proxy.client
+            health = proxy.health(self.platform)
+            # 上流のレート制限は送信元IPごとなので、送信枠もプロキシごとに分ける
+            host = _limiter_host(host, proxy)
+        # 送信待ち（queue）の起点。再送時は前回の試行の終了時刻から数える
+        mark = time.perf_counter()
+
+        async def request() -> httpx.Response:
+            nonlocal mark
+            body.clear()
+            scanner = self._scanner()
+            sent = time.perf_counter()
+            if started is not None:
+                started.set()
+            extensions = None
+            if trace is not None:
+                trace.add("queue", sent - mark)
+                if trace.detailed:
+                    extensions = {"trace": tracing.httpcore_hook(trace)}
+            if health is not None:
+                health.inflight += 1
+            try:
+                response = await http_client.send(
+                    http_client.build_request("GET", url, headers=headers, extensions=extensions),
+                    stream=True,
+                )
+            except Exception:
+                if health is not None:
+                    health.record("error")
+                raise
+            finally:
+                if health is not None:
+                    health.inflight -= 1
+            received = time.perf_counter()
+            try:
+                if response.status_code == 200:
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                        if len(body) >= max_bytes:
+                            del body[max_bytes:]
+                            break
+                        if scanner is not None and scanner.feed(body):
+                            break
+            finally:
+                await response.aclose()
+                mark = time.perf_counter()
+                self._upstream_bytes.inc(len(body))
+                if trace is not None:
+                    trace.add("upstream", received - sent)
+                    trace.add("download", mark - received)
+            if guard is not None and response.status_code == 200:
+                # 送信枠を得てからの所要時間（キュー待ちを含めない）をヘッジの基準にする
+                guard.latency.observe(mark - sent)
+            if health is not None:
+                health.observe_latency(mark - sent)
+                health.record_status(response.status_code)
+            return response
+
+        if self.scheduler is None:
+            response = await request()
+        else:
+            response = await self.scheduler.send(self.platform, host, request, deadline)
+        return response, bytes(body), proxy
+
+    async def _parse(self, fn: Callable[..., T], body: bytes, *args: Any) -> T:
+        """解析関数 fn(body, *args) をエグゼキュータで実行（未設定ならインライン）"""
+        trace = tracing.current()
+        start = time.perf_counter()
+        try:
+            if trace is not None and trace.detailed:
+                # 解析の内訳はエグゼキュータ内で記録して持ち帰る
+                result, phases = await self._run_parser(partial(tracing.traced_call, fn), body, *args)
+                trace.merge(phases)
+            else:
+                result = await self._run_parser(fn, body, *args)
+        except PageBlockedError:
+            # ステータス200でもログインページ等ならブロックされている
+            self._record_parsed(ok=False)
+            raise
+        except Exception:
+            self._record_parsed(ok=True)
+            raise
+        else:
+            self._record_parsed(ok=True)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            self._parse_seconds.observe(elapsed)
+            if trace is not None:
+                trace.add("parse", elapsed)
+
+    def _record_parsed(self, ok: bool) -> None:
+        """ステータス200の応答の成否を解析結果でサーキットブレーカー（とプロキシの状態）に反映"""
+        proxy = _current_proxy.get()
+        if proxy is not None:
+            # ソフトブロックは送信元IPに対するものとして扱う
+            proxy.health(self.platform).record("ok" if ok else "throttled")
+        if self.resilience is None:
+            return
+        guard = self.resilience.guard(self.platform)
+        if ok:
+            guard.record_success()
+        else:
+            guard.record_failure()
+
+    async def _run_parser(self, fn: Callable[..., T], body: bytes, *args: Any) -> T:
+        if self.executor is None:
+            return fn(body, *args)
+        return await self.executor.run(fn, body, *args)
+
+    def _report_blocked(self, url: str) -> None:
+        """ログインページなどのソフトブロックをスケジューラに通知"""
+        if self.scheduler is not None:
+            host = httpx.URL(url).host
+            proxy = _current_proxy.get()
+            if proxy is not None:
+                host = _limiter_host(host, proxy)
+            self.scheduler.report_blocked(self.platform, host)
+
+
+def _limiter_host(host: str, proxy: ProxyEndpoint) -> str:
+    """プロキシ経由の送信に使うスケジューラのキー"""
+    return f"{host} via {proxy.name}"
@@ -0,0 +1,277 @@
+import asyncio
+import codecs
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from api.models import BatchItem, SNSPlatform
+from api.services.account_service import AccountService
+from api.services.errors import http_status_for
+
+_DONE = object()
+
+# プラットフォームごとの入力キューの長さ（ワーカー1つあたり）
+_QUEUE_PER_WORKER = 4
+# 1件の項目の最大の文字数（これだけ読んでも項目が完成しなければ不正な本文とする）
+_MAX_ITEM_CHARS = 64 * 1024
+
+_WS = ' \t\n\r'
+# {"items": [ ... ]} の配列の前の部分
+_HEAD_TOKENS = ('{', '"items"', ':', '[')
+# 配列の要素の区切りと終わりの状態
+_ITEM_OR_END = len(_HEAD_TOKENS)
+_ITEM = _ITEM_OR_END + 1
+_NEXT = _ITEM + 1
+_CLOSE = _NEXT + 1
+_END = _CLOSE + 1
+
+
+class BatchInputError(ValueError):
+    """バッチのリクエスト本文が不正、または上限を超えた"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _skip_ws(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in _WS:
+        pos += 1
+    return pos
+
+
+class _ItemsReader:
+    """
+    {"items": [...]} の本文を少しずつ受け取り、届いた配列の要素から順にデコードする
+
+    本文全体は保持せず、未完成の要素の分だけをバッファに残す
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._state = 0
+        self._decoder = json.JSONDecoder()
+
+    def _expect(self, pos: int, token: str, final: bool) -> Optional[int]:
+        """token の直後の位置を返す（まだ届いていなければ None）"""
+        buffer = self._buffer
+        pos = _skip_ws(buffer, pos)
+        if buffer.startswith(token, pos):
+            return pos + len(token)
+        if not final and token.startswith(buffer[pos:]):
+            return None
+        raise BatchInputError('Request body must be {"items": [...]}')
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        self._buffer += text
+        buffer = self._buffer
+        pos = 0
+        values = []
+        while True:
+            state = self._state
+            if state < _ITEM_OR_END:
+                end = self._expect(pos, _HEAD_TOKENS[state], final)
+                if end is None:
+                    break
+                pos, self._state = end, state + 1
+            elif state == _ITEM_OR_END or state == _NEXT:
+                pos = _skip_ws(buffer, pos)
+                if pos >= len(buffer):
+                    if final:
+                        raise BatchInputError("Unexpected end of request body")
+                    break
+                if buffer[pos] == ']':
+                    pos, self._state = pos + 1, _CLOSE
+                elif state == _ITEM_OR_END:
+                    self._state = _ITEM
+                elif buffer[pos] == ',':
+                    pos, self._state = pos + 1, _ITEM
+                else:
+                    raise BatchInputError(f"Expected ',' or ']' in items at offset {pos}")
+            elif state == _ITEM:
+                pos = _skip_ws(buffer, pos)
+                try:
+                    value, pos = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # 要素が途中までしか届いていない（不正な要素は上限まで待ってから報告する）
+                    if final or len(buffer) - pos > _MAX_ITEM_CHARS:
+                        raise BatchInputError("Invalid JSON in items") from None
+                    break
+                values.append(value)
+                self._state = _NEXT
+            elif state == _CLOSE:
+                end = self._expect(pos, '}', final)
+                if end is None:
+                    break
+                pos, self._state = end, _END
+            else:
+                pos = _skip_ws(buffer, pos)
+                if pos < len(buffer):
+                    raise BatchInputError("Unexpected data after items")
+                break
+        if final and self._state != _END:
+            raise BatchInputError("Unexpected end of request body")
+        self._buffer = buffer[pos:]
+        return values
+
+
+class _LinesReader:
+    """NDJSON（1行1項目）の本文を少しずつ受け取り、完成した行から順にデコードする"""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        lines = (self._buffer + text).split("\n")
+        self._buffer = "" if final else lines.pop()
+        if len(self._buffer) > _MAX_ITEM_CHARS:
+            raise BatchInputError("Line too long in request body")
+        values = []
+        for line in lines:
+            if line.strip(_WS):
+                try:
+                    values.append(json.loads(line))
+                except json.JSONDecodeError:
+                    raise BatchInputError("Invalid JSON line in request body") from None
+        return values
+
+
+async def read_items(
+    chunks: AsyncIterator[bytes],
+    ndjson: bool,
+    max_items: int,
+    max_bytes: int,
+) -> AsyncIterator[BatchItem]:
+    """
+    リクエスト本文を読みながら、項目を届いた順に1件ずつ返す
+
+    本文は {"items": [...]}（ndjson=True の場合は1行1項目のNDJSON）。
+    項目数とバイト数の上限は読みながら確かめ、超えた時点で BatchInputError (413) を送出する
+    """
+    reader = _LinesReader() if ndjson else _ItemsReader()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    received = 0
+    count = 0
+
+    def validate(values: List[Any]) -> List[BatchItem]:
+        nonlocal count
+        items = []
+        for value in values:
+            if count >= max_items:
+                raise BatchInputError(f"Too many items (max {max_items})", 413)
+            try:
+                items.append(BatchItem.model_validate(value))
+            except ValidationError as e:
+                raise BatchInputError(f"Invalid item at index {count}: {e}") from None
+            count += 1
+        return items
+
+    try:
+        async for chunk in chunks:
+            received += len(chunk)
+            if received > max_bytes:
+                raise BatchInputError(f"Request body too large (max {max_bytes} bytes)", 413)
+            for item in validate(reader.feed(decoder.decode(chunk))):
+                yield item
+        tail = decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise BatchInputError("Request body is not valid UTF-8") from None
+    for item in validate(reader.feed(tail, final=True)):
+        yield item
+
+
+async def _process(service: AccountService, index: int, item: BatchItem) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "index": index,
+        "sns": item.sns.value,
+        "account_id": item.account_id,
+    }
+    try:
+        account = await service.get_account(item.sns, item.account_id)
+        result["status"] = "ok"
+        result["cache"] = account.status.value
+        result["data"] = account.value.model_dump(mode="json")
+    except ValueError as e:
+        result["status"] = "error"
+        result["status_code"] = http_status_for(e)
+        result["error"] = str(e)
+    except Exception as e:
+        result["status"] = "error"
+        result["status_code"] = 500
+        result["error"] = f"Internal server error: {str(e)}"
+    return result
+
+
+async def run_batch(
+    service: AccountService,
+    items: AsyncIterator[BatchItem],
+    concurrency: Dict[SNSPlatform, int],
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    バッチ取得を実行し、完了した順に結果を返す
+
+    items は（リクエスト本文を読みながら）届いた順に振り分け役のタスクが受け取り、
+    プラットフォームごとの入力キューに入れる。各プラットフォームのワーカーは、
+    その項目が最初に届いた時点で同時実行数の上限の数だけ起動する。
+    入力キューと出力キューはどちらも有界で、ワーカーが追いつかない場合は本文の読み込みが、
+    読み手が遅い場合はワーカーが待機する（背圧）。項目も結果も保持しないため、
+    使うメモリはバッチサイズに依存しない（その代わり、入力キューが詰まったプラットフォームの
+    項目の後ろにある項目は、空きができるまで読まれない）。
+
+    items が BatchInputError を送出した場合は、それまでに届いた項目を処理したうえで
+    index を持たないエラー行 {"status": "error", "status_code", "error"} を返す
+    """
+    output: asyncio.Queue = asyncio.Queue(maxsize=max(1, sum(max(1, n) for n in concurrency.values())))
+    queues: Dict[SNSPlatform, asyncio.Queue] = {}
+    workers_per_platform: Dict[SNSPlatform, int] = {}
+    tasks: List[asyncio.Task] = []
+    failure: List[BaseException] = []
+
+    async def worker(queue: asyncio.Queue) -> None:
+        while True:
+            entry = await queue.get()
+            if entry is _DONE:
+                return
+            index, item = entry
+            await output.put(await _process(service, index, item))
+
+    async def dispatch() -> None:
+        try:
+            try:
+                index = 0
+                async for item in items:
+                    queue = queues.get(item.sns)
+                    if queue is None:
+                        workers = workers_per_platform[item.sns] = max(1, concurrency.get(item.sns, 1))
+                        queue = queues[item.sns] = asyncio.Queue(maxsize=workers * _QUEUE_PER_WORKER)
+                        tasks.extend(asyncio.create_task(worker(queue)) for _ in range(workers))
+                    await queue.put((index, item))
+                    index += 1
+            except BatchInputError as e:
+                await output.put({"status": "error", "status_code": e.status_code, "error": str(e)})
+            # 入力の終わりを各ワーカーに伝え、処理中の項目の完了を待つ
+            for sns, queue in queues.items():
+                for _ in range(workers_per_platform[sns]):
+                    await queue.put(_DONE)
+            await asyncio.gather(*tasks)
+        except Exception as e:
+            # クライアント切断など。読み手側で送出する
+            failure.append(e)
+        await output.put(_DONE)
+
+    dispatcher = asyncio.create_task(dispatch())
+    try:
+        while True:
+            result = await output.get()
+            if result is _DONE:
+                break
+            yield result
+        if failure:
+            raise failure[0]
+    finally:
+        # クライアント切断時などは振り分けと残りのワーカーを止める
+        dispatcher.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(dispatcher, *tasks, return_exceptions=True)
@@ -0,0 +1,273 @@
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+from api.models import AccountInfo, SNSPlatform
+from api.services.errors import (
+    AccountNotFoundError,
+    NegativeCacheHit,
+    PageParseError,
+    PersonalAccountError,
+    find_error,
+)
+
+CacheKey = Tuple[SNSPlatform, str]
+
+# エントリ1件あたりの固定オーバーヘッド（モデル・辞書・タプル等の概算バイト数）
+_ENTRY_OVERHEAD = 512
+
+
+class CacheStatus(str, Enum):
+    """キャッシュの参照結果"""
+    HIT = "HIT"
+    MISS = "MISS"
+    STALE = "STALE"
+
+
+# ネガティブキャッシュの理由と、記録済みの失敗を返すときの例外の型
+# （PersonalAccountError は AccountNotFoundError より先に判定する）
+NEGATIVE_REASONS: Tuple[Tuple[str, type], ...] = (
+    ("personal_account", PersonalAccountError),
+    ("not_found", AccountNotFoundError),
+    ("no_data", PageParseError),
+)
+_NEGATIVE_ERRORS = dict(NEGATIVE_REASONS)
+
+
+def normalize_account_id(sns: SNSPlatform, account_id: str) -> str:
+    """
+    キャッシュキー用にアカウントIDを正規化
+    例: YouTube "Foo" / "@foo" -> "@foo", TikTok "@Foo" -> "foo"
+    """
+    account_id = account_id.strip()
+    if sns == SNSPlatform.YOUTUBE:
+        # チャンネルID (UC...) は大文字小文字を区別する
+        if account_id.startswith('UC'):
+            return account_id
+        return '@' + account_id.lstrip('@').lower()
+    return account_id.lstrip('@').lower()
+
+
+def make_cache_key(sns: SNSPlatform, account_id: str) -> CacheKey:
+    """(SNSPlatform, 正規化済みアカウントID) のキーを作成"""
+    return (sns, normalize_account_id(sns, account_id))
+
+
+@dataclass
+class CacheEntry:
+    """キャッシュエントリ"""
+    value: AccountInfo
+    stored_at: float
+    expires_at: float
+    stale_until: float
+    size: int
+    fetched_at: float  # 上流から取得した時刻（UNIX時刻。共有キャッシュ経由の値は元の取得時刻）
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def is_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+
+def _estimate_size(key: CacheKey, value: AccountInfo) -> int:
+    """エントリのメモリ使用量を概算"""
+    return (
+        _ENTRY_OVERHEAD
+        + sys.getsizeof(key[1])
+        + sys.getsizeof(value.account_id)
+        + sys.getsizeof(value.account_name)
+    )
+
+
+class AccountCache:
+    """
+    AccountInfo用のインプロセスTTL + LRUキャッシュ
+
+    - プラットフォームごとのTTL
+    - エントリ数とメモリ予算によるLRU追い出し
+    - TTL切れ後もstale_ttlの間は古い値を返せる（stale-while-revalidate）
+    """
+
+    def __init__(
+        self,
+        ttl: Dict[SNSPlatform, float],
+        stale_ttl: float,
+        max_entries: int,
+        max_bytes: int,
+        default_ttl: float = 300.0,
+    ):
+        self._ttl = ttl
+        self._default_ttl = default_ttl
+        self._stale_ttl = stale_ttl
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def ttl_for(self, sns: SNSPlatform) -> float:
+        return self._ttl.get(sns, self._default_ttl)
+
+    def get(self, key: CacheKey) -> Tuple[Optional[AccountInfo], CacheStatus]:
+        """
+        キャッシュを参照
+
+        Returns:
+            (値, 状態) のタプル。値がない場合は (None, MISS)
+        """
+        entry, status = self.lookup(key)
+        return (entry.value if entry is not None else None), status
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[CacheEntry], CacheStatus]:
+        """get と同じだが、取得時刻・期限を含むエントリを返す"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, CacheStatus.MISS
+
+        now = time.monotonic()
+        if not entry.is_usable(now):
+            self._remove(key)
+            return None, CacheStatus.MISS
+
+        self._entries.move_to_end(key)
+        if entry.is_fresh(now):
+            return entry, CacheStatus.HIT
+        return entry, CacheStatus.STALE
+
+    def set(
+        self,
+        key: CacheKey,
+        value: AccountInfo,
+        ttl: Optional[float] = None,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """
+        値を保存し、上限を超えた分をLRU順に追い出す
+
+        ttl省略時はプラットフォームのTTL、fetched_at（UNIX時刻）省略時は現在時刻
+        """
+        if ttl is None:
+            ttl = self.ttl_for(key[0])
+        if ttl <= 0:
+            return
+
+        now = time.monotonic()
+        if key in self._entries:
+            self._remove(key)
+
+        entry = CacheEntry(
+            value=value,
+            stored_at=now,
+            expires_at=now + ttl,
+            stale_until=now + ttl + self._stale_ttl,
+            size=_estimate_size(key, value),
+            fetched_at=time.time() if fetched_at is None else fetched_at,
+        )
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def delete(self, key: CacheKey) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self._max_entries or self._bytes > self._max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+
+
+@dataclass
+class NegativeEntry:
+    """ネガティブキャッシュのエントリ"""
+    reason: str
+    message: str
+    expires_at: float
+
+
+class NegativeCache:
+    """
+    毎回同じ理由で失敗するアカウント（存在しない・個人アカウント・データなし）のキャッシュ
+
+    - 理由ごとのTTL（AccountCacheより短くする）
+    - 上流が不安定な間（5xx・429・タイムアウト・ブロック）は、その失敗が本当に恒久的か
+      判断できないため、プラットフォーム単位で一定時間記録を止める
+    """
+
+    def __init__(self, ttl: Dict[str, float], suspend: float = 60.0, max_entries: int = 50000):
+        self._ttl = ttl
+        self._suspend = suspend
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, NegativeEntry]" = OrderedDict()
+        self._suspended_until: Dict[SNSPlatform, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def reason_for(exc: BaseException) -> Optional[str]:
+        """キャッシュしてよい失敗ならその理由を返す"""
+        for reason, error_type in NEGATIVE_REASONS:
+            if find_error(exc, error_type) is not None:
+                return reason
+        return None
+
+    def check(self, key: CacheKey) -> None:
+        """記録済みの失敗があれば NegativeCacheHit を送出"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return
+        raise NegativeCacheHit(entry.message) from _NEGATIVE_ERRORS[entry.reason](entry.message)
+
+    def record(self, key: CacheKey, exc: BaseException) -> Optional[str]:
+        """
+        失敗を記録
+
+        Returns:
+            記録した理由（キャッシュ対象外・停止中の場合は None）
+        """
+        reason = self.reason_for(exc)
+        if reason is None:
+            return None
+        now = time.monotonic()
+        ttl = self._ttl.get(reason, 0.0)
+        if ttl <= 0 or now < self._suspended_until.get(key[0], 0.0):
+            return None
+        self._entries.pop(key, None)
+        self._entries[key] = NegativeEntry(reason, str(exc), now + ttl)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return reason
+
+    def suspend(self, sns: SNSPlatform) -> None:
+        """一時的な失敗を観測したプラットフォームの記録を止める"""
+        self._suspended_until[sns] = time.monotonic() + self._suspend
+
+    def delete(self, key: CacheKey) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
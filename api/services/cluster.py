@@ -0,0 +1,330 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from api.config import Settings, settings
+from api.models import AccountInfo, SNSPlatform
+from api.services import metrics
+from api.services.account_service import AccountResult
+from api.services.cache import CacheKey, CacheStatus
+from api.services.errors import (
+    AccountNotFoundError,
+    CircuitOpenError,
+    ClusterUnavailableError,
+    DeadlineExceededError,
+    NegativeCacheHit,
+    PageBlockedError,
+    PageParseError,
+    PersonalAccountError,
+    find_error,
+    http_status_for,
+)
+
+logger = logging.getLogger(__name__)
+
+# 転送されたリクエストであることを示すヘッダー（値は転送元ノード）
+FORWARDED_HEADER = "X-Cluster-Forwarded"
+
+# ノード間の内部APIの共有シークレットのヘッダー
+SECRET_HEADER = "X-Cluster-Secret"
+
+# 所有ノードが取得失敗として返すステータスコード（http_status_for の値）
+_ERROR_STATUSES = (400, 404, 503, 504)
+
+# 所有ノードでの取得失敗の分類 -> 転送元で送出し直す例外の型
+_KIND_ERRORS = {
+    "not_found": PersonalAccountError,  # 404以外の not_found は個人アカウントなど
+    "blocked": PageBlockedError,
+    "parse_failure": PageParseError,
+}
+_STATUS_ERRORS = {404: AccountNotFoundError, 504: DeadlineExceededError}
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _normalize(url: str) -> str:
+    return url.strip().rstrip("/")
+
+
+def ring_key(key: CacheKey) -> str:
+    """キャッシュキーのリング上の表記"""
+    return f"{key[0].value}:{key[1]}"
+
+
+class HashRing:
+    """
+    仮想ノード付きのコンシステントハッシュリング
+
+    各ノードを vnodes 個の点としてリングに配置し、キーのハッシュから時計回りに最初の点の
+    ノードを所有ノードとする。ノードの追加・削除で所有ノードが変わるキーは約 1/ノード数 に限られる
+    """
+
+    def __init__(self, nodes: Sequence[str], vnodes: int = 128):
+        self.nodes = sorted(set(nodes))
+        self.vnodes = vnodes
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def owner(self, key: str) -> Optional[str]:
+        """キーの所有ノード（ノードがなければ None）"""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+def encode_error(exc: ValueError) -> Tuple[int, Dict[str, Any]]:
+    """所有ノードでの取得失敗を転送元に返す (ステータスコード, 本文)"""
+    circuit = find_error(exc, CircuitOpenError)
+    return http_status_for(exc), {
+        "detail": str(exc),
+        "kind": metrics.classify_error(exc),
+        "negative": isinstance(exc, NegativeCacheHit),
+        "retry_after": circuit.retry_after if circuit is not None else None,
+    }
+
+
+def error_body(response: httpx.Response) -> Optional[Dict[str, Any]]:
+    """
+    所有ノードの取得失敗の本文（encode_error の形式）
+
+    JSONで kind と detail を含むものだけを受け付け、それ以外（内部APIのない古いビルドの404、
+    プロキシのエラーページなど）は None
+    """
+    if response.status_code not in _ERROR_STATUSES:
+        return None
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return None
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if not isinstance(body, dict) or not isinstance(body.get("kind"), str) or not isinstance(body.get("detail"), str):
+        return None
+    return body
+
+
+def decode_error(status_code: int, body: Dict[str, Any]) -> ValueError:
+    """encode_error の結果から、所有ノードと同じ種類の例外を作る（HTTPステータスの判定が一致するように）"""
+    detail = body.get("detail", f"Owner returned {status_code}")
+    if status_code == 503:
+        cause: ValueError = CircuitOpenError(detail, body.get("retry_after") or 0.0)
+    else:
+        cause = (_STATUS_ERRORS.get(status_code) or _KIND_ERRORS.get(body.get("kind"), ValueError))(detail)
+    error = NegativeCacheHit(detail) if body.get("negative") else ValueError(detail)
+    error.__cause__ = cause
+    return error
+
+
+class Cluster:
+    """
+    クラスタモード: キーごとの所有ノードへの転送
+
+    各 (sns, account_id) はハッシュリング上の1つのノードが所有し、スクレイピングとキャッシュは
+    所有ノードだけが行う。他のノードは内部APIで所有ノードに問い合わせ、到達できない場合
+    （接続エラー・タイムアウト・取得失敗の形式でない応答）はそのノードを down_time 秒の間は転送先から外し、自ノードで取得する。
+
+    メンバーは設定の一覧とファイル（1行に1つのURL、# 以降はコメント）の和で、
+    ファイルは watch_interval 秒ごとに更新時刻を確認して変更を反映する
+    """
+
+    def __init__(
+        self,
+        self_url: str,
+        nodes: Sequence[str] = (),
+        members_file: Optional[str] = None,
+        vnodes: int = 128,
+        forward_timeout: float = 35.0,
+        connect_timeout: float = 0.5,
+        down_time: float = 10.0,
+        watch_interval: float = 2.0,
+        max_connections: int = 100,
+        secret: Optional[str] = None,
+    ):
+        self.self_url = _normalize(self_url)
+        self.static_nodes = [_normalize(node) for node in nodes if node.strip()]
+        self.members_file = members_file
+        self.vnodes = vnodes
+        self.forward_timeout = forward_timeout
+        self.connect_timeout = connect_timeout
+        self.down_time = down_time
+        self.watch_interval = watch_interval
+        self.secret = secret
+
+        self._mtime: Optional[float] = None
+        self.ring = HashRing(self._members(), vnodes)
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(forward_timeout, connect=connect_timeout),
+        )
+        self._down_until: Dict[str, float] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self._routes = {route: metrics.CLUSTER_REQUESTS.labels(route) for route in ("local", "forwarded", "fallback")}
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> Optional["Cluster"]:
+        """設定からクラスタを作成（自ノードのURLかメンバーが未設定なら None）"""
+        if not config.cluster_self or not (config.cluster_nodes or config.cluster_members_file):
+            return None
+        return cls(
+            config.cluster_self,
+            nodes=config.cluster_nodes,
+            members_file=config.cluster_members_file,
+            vnodes=config.cluster_vnodes,
+            forward_timeout=config.cluster_forward_timeout,
+            connect_timeout=config.cluster_connect_timeout,
+            down_time=config.cluster_down_time,
+            watch_interval=config.cluster_watch_interval,
+            max_connections=config.cluster_max_connections,
+            secret=config.cluster_secret,
+        )
+
+    def _members(self) -> List[str]:
+        members = list(self.static_nodes)
+        if self.members_file:
+            try:
+                self._mtime = os.stat(self.members_file).st_mtime
+                with open(self.members_file, encoding="utf-8") as f:
+                    for line in f:
+                        line = line.split("#", 1)[0].strip()
+                        if line:
+                            members.append(_normalize(line))
+            except OSError as e:
+                logger.warning("Could not read cluster members file %s: %s", self.members_file, e)
+        return members
+
+    def reload(self) -> bool:
+        """メンバーを読み直す（変わった場合は True）"""
+        ring = HashRing(self._members(), self.vnodes)
+        if ring.nodes == self.ring.nodes:
+            return False
+        logger.info("Cluster members changed: %s -> %s", self.ring.nodes, ring.nodes)
+        self.ring = ring
+        return True
+
+    def start(self) -> None:
+        """メンバーファイルの監視を開始"""
+        if self.members_file and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            try:
+                mtime = os.stat(self.members_file).st_mtime
+            except OSError:
+                continue  # 置き換え中などで読めない間は現在のメンバーのまま
+            if mtime != self._mtime:
+                self.reload()
+
+    def is_owner(self, key: CacheKey) -> bool:
+        """このノードがキーを所有しているか（メンバーがいなければ全キーを所有する）"""
+        owner = self.ring.owner(ring_key(key))
+        return owner is None or owner == self.self_url
+
+    def route(self, key: CacheKey) -> Optional[str]:
+        """
+        キーの転送先
+
+        Returns:
+            所有ノードのURL。自ノードが所有している場合、所有ノードが停止中とみなされている場合は None
+        """
+        owner = self.ring.owner(ring_key(key))
+        if owner is None or owner == self.self_url:
+            self._routes["local"].inc()
+            return None
+        if self._down_until.get(owner, 0.0) > time.monotonic():
+            self._routes["fallback"].inc()
+            return None
+        return owner
+
+    async def forward(
+        self,
+        owner: str,
+        sns: SNSPlatform,
+        account_id: str,
+        max_age: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> AccountResult:
+        """
+        所有ノードに取得を依頼
+
+        Raises:
+            ClusterUnavailableError: 所有ノードに到達できない（呼び出し側は自ノードで取得する）
+            ValueError: 所有ノードでの取得失敗（所有ノードと同じ種類の例外）
+        """
+        params: Dict[str, Any] = {"sns": sns.value, "account_id": account_id}
+        if max_age is not None:
+            params["max_age"] = max_age
+        timeout = self.forward_timeout
+        if deadline is not None:
+            params["deadline_ms"] = max(1, int(deadline * 1000))
+            timeout = min(timeout, deadline + 1.0)
+        headers = {FORWARDED_HEADER: self.self_url}
+        if self.secret:
+            headers[SECRET_HEADER] = self.secret
+        try:
+            response = await self.client.get(
+                f"{owner}/internal/account",
+                params=params,
+                headers=headers,
+                timeout=httpx.Timeout(timeout, connect=self.connect_timeout),
+            )
+        except httpx.HTTPError as e:
+            self._mark_down(owner)
+            raise ClusterUnavailableError(f"Cluster node {owner} is unreachable: {e!r}") from e
+
+        if response.status_code == 200:
+            try:
+                body = response.json()
+                result = AccountResult(
+                    AccountInfo(**body["value"]),
+                    CacheStatus(body["status"]),
+                    body["fetched_at"],
+                    body["expires_at"],
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                self._mark_down(owner)
+                raise ClusterUnavailableError(f"Cluster node {owner} returned an invalid response: {e!r}") from e
+            self._routes["forwarded"].inc()
+            return result
+
+        # 所有ノードの取得失敗と確認できない応答は到達できない場合と同じく自ノードで取得する
+        body = error_body(response)
+        if body is None:
+            self._mark_down(owner)
+            raise ClusterUnavailableError(f"Cluster node {owner} returned an unexpected {response.status_code}")
+        self._routes["forwarded"].inc()
+        raise decode_error(response.status_code, body)
+
+    def _mark_down(self, owner: str) -> None:
+        logger.warning("Cluster node %s is unavailable; serving its keys locally for %.0fs", owner, self.down_time)
+        self._down_until[owner] = time.monotonic() + self.down_time
+        self._routes["fallback"].inc()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "self": self.self_url,
+            "members": self.ring.nodes,
+            "down": [node for node, until in self._down_until.items() if until > now],
+        }
+
+    async def aclose(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        await self.client.aclose()
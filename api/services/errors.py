@@ -0,0 +1,85 @@
+from typing import Iterator, Optional, Tuple, Type, Union
+
+
+class AccountNotFoundError(ValueError):
+    """アカウント・チャンネル・ページが存在しない"""
+
+
+class PersonalAccountError(ValueError):
+    """個人アカウントなど、取得対象外のアカウント"""
+
+
+class PageBlockedError(ValueError):
+    """ログインページなどが返され、ページに必要なデータが含まれていない（ソフトブロック）"""
+
+
+class PageParseError(ValueError):
+    """ページの構造が想定と異なり、必要なデータを抽出できない"""
+
+
+class UpstreamStatusError(ValueError):
+    """上流が200以外のステータスコードを返した"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+    def __reduce__(self):
+        # プロセスプールから受け渡せるようにする
+        return (type(self), (str(self), self.status_code))
+
+
+class CircuitOpenError(ValueError):
+    """サーキットブレーカーが開いているため上流に送信しなかった"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(ValueError):
+    """指定された時間内に取得できず、返せる古い値もなかった"""
+
+
+class NegativeCacheHit(ValueError):
+    """ネガティブキャッシュに記録済みの失敗（__cause__ に元の種類の例外を持つ）"""
+
+
+class ClusterUnavailableError(Exception):
+    """クラスタ内の所有ノードに転送できなかった（取得の失敗ではないため ValueError ではない）"""
+
+
+def iter_causes(exc: BaseException) -> Iterator[BaseException]:
+    """
+    例外と、その __cause__ / __context__ を順にたどる
+
+    クライアントは例外を ValueError で包み直すため、元の例外の型はこれで調べる
+    """
+    seen = set()
+    current: Optional[BaseException] = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+def find_error(
+    exc: BaseException,
+    types: Union[Type[BaseException], Tuple[Type[BaseException], ...]],
+) -> Optional[BaseException]:
+    """例外の連鎖から指定した型の例外を探す"""
+    for cause in iter_causes(exc):
+        if isinstance(cause, types):
+            return cause
+    return None
+
+
+def http_status_for(exc: ValueError) -> int:
+    """取得失敗 (ValueError) に対応するHTTPステータスコード"""
+    if find_error(exc, AccountNotFoundError) is not None:
+        return 404
+    if find_error(exc, CircuitOpenError) is not None:
+        return 503
+    if find_error(exc, DeadlineExceededError) is not None:
+        return 504
+    return 400
@@ -0,0 +1,56 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from api.config import Settings, settings
+
+T = TypeVar("T")
+
+
+class ParserExecutor:
+    """
+    ページ解析（CPUバウンド）をイベントループ外で実行するエグゼキュータ
+
+    kind:
+      - "process": プロセスプール（GILの影響を受けず、重いページでもループが止まらない）
+      - "thread": スレッドプール
+      - "inline": イベントループ上でそのまま実行
+    ボディが inline_max_bytes 未満の場合は、受け渡しのコストの方が大きいため常にインラインで実行する
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, inline_max_bytes: int = 0):
+        self.kind = kind
+        self.inline_max_bytes = inline_max_bytes
+        self._executor: Optional[Executor] = None
+        if kind == "process":
+            # uvicornのイベントループやスレッドを複製しないようspawnで起動
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        elif kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parser")
+        elif kind != "inline":
+            raise ValueError(f"Unknown parser executor kind: {kind}")
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "ParserExecutor":
+        return cls(
+            kind=config.parser_executor,
+            workers=config.parser_workers,
+            inline_max_bytes=config.parser_inline_max_bytes,
+        )
+
+    async def run(self, fn: Callable[..., T], body: bytes, *args: Any) -> T:
+        """fn(body, *args) を実行"""
+        if self._executor is None or len(body) < self.inline_max_bytes:
+            return fn(body, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, body, *args))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,133 @@
+import html
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Union
+
+from bs4 import BeautifulSoup
+
+from api.services import tracing
+
+Markup = Union[bytes, str]
+
+# <meta ...> タグと属性のパターン（バイト列用にコンパイル済み）
+_META_TAG_RE = re.compile(rb'<meta\b([^>]*)>', re.IGNORECASE)
+_ATTR_RE = re.compile(
+    rb'([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'=<>`]+))'
+)
+_HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+
+
+def _to_bytes(markup: Markup) -> bytes:
+    return markup.encode("utf-8") if isinstance(markup, str) else markup
+
+
+def _to_str(markup: Markup, encoding: str) -> str:
+    return markup if isinstance(markup, str) else markup.decode(encoding, errors="replace")
+
+
+def head_slice(markup: Markup) -> bytes:
+    """</head> までの部分を返す（見つからなければ全体）"""
+    data = _to_bytes(markup)
+    match = _HEAD_END_RE.search(data)
+    return data[:match.start()] if match else data
+
+
+def _parse_attrs(raw: bytes) -> Dict[bytes, bytes]:
+    attrs = {}
+    for match in _ATTR_RE.finditer(raw):
+        name = match.group(1).lower()
+        value = match.group(2)
+        if value is None:
+            value = match.group(3) if match.group(3) is not None else match.group(4)
+        attrs.setdefault(name, value)
+    return attrs
+
+
+def scan_meta(markup: Markup, properties: Iterable[str], encoding: str = "utf-8") -> Dict[str, str]:
+    """
+    <head> 内の <meta property="..." content="..."> を1回の走査で抽出
+
+    BeautifulSoupでツリーを構築せず、コンパイル済みの正規表現で
+    metaタグだけを走査する。対象がすべて見つかった時点で打ち切る。
+    content属性のHTMLエンティティはデコードして返す。
+
+    Returns:
+        {property: content} の辞書（見つからなかったものは含まない）
+    """
+    wanted = {p.encode("ascii") for p in properties}
+    found: Dict[str, str] = {}
+    for match in _META_TAG_RE.finditer(head_slice(markup)):
+        attrs = _parse_attrs(match.group(1))
+        key = attrs.get(b"property") or attrs.get(b"name")
+        if key not in wanted or key.decode("ascii") in found:
+            continue
+        found[key.decode("ascii")] = html.unescape(attrs.get(b"content", b"").decode(encoding, errors="replace"))
+        if len(found) == len(wanted):
+            break
+    return found
+
+
+def _soup_meta(markup: Markup, properties: Iterable[str], encoding: str) -> Dict[str, str]:
+    soup = BeautifulSoup(_to_str(markup, encoding), "html.parser")
+    found = {}
+    for prop in properties:
+        tag = soup.find("meta", property=prop)
+        if tag is not None:
+            found[prop] = tag.get("content", "")
+    return found
+
+
+def extract_meta(
+    markup: Markup,
+    properties: Iterable[str],
+    required: Iterable[str] = (),
+    encoding: str = "utf-8",
+) -> Dict[str, str]:
+    """
+    metaタグを抽出（必須のものが見つからない場合はBeautifulSoupで再解析）
+
+    Args:
+        markup: HTML（バイト列または文字列）
+        properties: 取得する property 名 (例: og:title)
+        required: 高速スキャナで見つからなければフォールバックする property 名
+    """
+    properties = tuple(properties)
+    with tracing.phase("scan", detailed=True):
+        found = scan_meta(markup, properties, encoding)
+    if all(prop in found for prop in required):
+        return found
+    with tracing.phase("bs4", detailed=True):
+        return _soup_meta(markup, properties, encoding)
+
+
+@lru_cache(maxsize=32)
+def _script_open_re(script_id: str) -> "re.Pattern[bytes]":
+    quoted = re.escape(script_id.encode("ascii"))
+    return re.compile(
+        rb'<script\b(?=[^>]*\sid\s*=\s*["\']?' + quoted + rb'["\'\s/>])[^>]*>',
+        re.IGNORECASE,
+    )
+
+
+def extract_script(markup: Markup, script_id: str, encoding: str = "utf-8") -> Optional[str]:
+    """
+    指定したidの <script> タグの中身を抽出
+
+    開始タグをコンパイル済みの正規表現で探し、終了タグは bytes.find で探す。
+    見つからない場合はBeautifulSoup(lxml)で再解析する。
+    scriptの中身はHTMLエンティティの対象外なのでそのまま返す。
+    """
+    data = _to_bytes(markup)
+    with tracing.phase("scan", detailed=True):
+        match = _script_open_re(script_id).search(data)
+        if match is not None:
+            end = data.find(b"</script", match.end())
+            if end >= 0:
+                return data[match.end():end].decode(encoding, errors="replace")
+
+    with tracing.phase("bs4", detailed=True):
+        soup = BeautifulSoup(_to_str(markup, encoding), "lxml")
+        tag = soup.find("script", id=script_id)
+    if tag is None or tag.string is None:
+        return None
+    return tag.string
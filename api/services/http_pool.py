@@ -0,0 +1,56 @@
+import httpx
+from typing import Dict, Optional
+
+from api.config import Settings, settings
+from api.models import SNSPlatform
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_http_client(config: Settings = settings, proxy: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    接続プール付きのhttpx.AsyncClientを作成
+
+    keep-aliveで接続を再利用し、h2がインストールされていればHTTP/2を有効にする
+    （HTTP/2非対応のホストではALPNによりHTTP/1.1にフォールバック）。
+    proxy を指定した場合は全リクエストをそのプロキシ経由で送る
+    """
+    limits = httpx.Limits(
+        max_connections=config.http_max_connections,
+        max_keepalive_connections=config.http_max_keepalive_connections,
+        keepalive_expiry=config.http_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(config.http_timeout, connect=config.http_connect_timeout)
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        limits=limits,
+        timeout=timeout,
+        http2=config.http2_enabled and HTTP2_AVAILABLE,
+        proxy=proxy,
+    )
+
+
+class HTTPClientPool:
+    """プラットフォームごとの長寿命なhttpx.AsyncClientを管理するプール"""
+
+    def __init__(self, config: Settings = settings):
+        self._config = config
+        self._clients: Dict[SNSPlatform, httpx.AsyncClient] = {}
+
+    def get(self, platform: SNSPlatform) -> httpx.AsyncClient:
+        """プラットフォーム用のクライアントを取得（初回のみ作成）"""
+        client = self._clients.get(platform)
+        if client is None:
+            client = create_http_client(self._config)
+            self._clients[platform] = client
+        return client
+
+    async def aclose(self) -> None:
+        """全クライアントを閉じる"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
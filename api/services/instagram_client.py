@@ -1,50 +1,101 @@
 import httpx
 import re
-from bs4 import BeautifulSoup
+from typing import Any, Dict, Optional
 from api.models import AccountInfo, SNSPlatform
-
-
-class InstagramClient:
+from api.services import tracing
+from api.services.base_client import BaseScraperClient
+from api.services.errors import AccountNotFoundError, PageBlockedError, UpstreamStatusError
+from api.services.extract import extract_meta
+from api.services.rules import CountRules
+from api.services.streaming import MarkerScanner
+
+
+# og:description のカウント（英語: "XXX Followers, YYY Following, ZZZ Posts"、
+# 日本語: "フォロワーXXX人、フォロー中YYY人、投稿ZZZ件"）
+_COUNT_RULES = CountRules({
+    "followers": [r"{n}\s+Followers?", r"フォロワー{n}人"],
+    "following": [r"{n}\s+Following", r"フォロー中{n}人"],
+    "posts": [r"{n}\s+Posts?", r"投稿{n}件"],
+})
+
+# og:title の "名前 (@username)" の名前部分（スペースあり・なし両対応）
+_NAME_RE = re.compile(r'^(.+?)\s*\(@')
+
+
+def parse_instagram_page(body: bytes, encoding: str, username: str) -> Dict[str, Any]:
+    """
+    InstagramユーザーページからAccountInfoのフィールドを抽出（純粋関数）
+
+    プロセスプールで実行できるよう、引数と戻り値はpickle可能な値のみ
+
+    Args:
+        body: ページのボディ（<head>まで）
+        encoding: ボディの文字コード
+        username: @を除いたユーザー名
+
+    Returns:
+        AccountInfoのフィールドの辞書
+    """
+    # <head>内のog:*メタタグを抽出（見つからなければBeautifulSoupで再解析）
+    meta = extract_meta(
+        body,
+        ('og:description', 'og:title'),
+        required=('og:description',),
+        encoding=encoding,
+    )
+
+    # og:descriptionメタタグから情報を抽出
+    description = meta.get('og:description')
+    if description is None:
+        # ログインページが返された場合はブロックされている可能性が高い
+        raise PageBlockedError("Could not find account data in page")
+
+    # フォロワー数、フォロー数、投稿数を抽出
+    counts = _COUNT_RULES.extract(description)
+    followers_count = counts.get("followers", 0)
+    following_count = counts.get("following", 0)
+    post_count = counts.get("posts")
+
+    # アカウント名を抽出
+    # og:titleから取得
+    # 英語: "名前 (@username) • Instagram photos and videos"
+    # 日本語: "名前(@username) • Instagram写真と動画"
+    title = meta.get('og:title')
+    account_name = username
+
+    if title:
+        # "@" より前の部分を抽出（スペースあり・なし両対応）
+        name_match = _NAME_RE.search(title)
+        if name_match:
+            account_name = name_match.group(1).strip()
+
+    return dict(
+        account_id=username,
+        account_name=account_name,
+        followers_count=followers_count,
+        following_count=following_count,
+        post_count=post_count,
+        sns=SNSPlatform.INSTAGRAM
+    )
+
+
+class InstagramClient(BaseScraperClient):
     """Instagram Webスクレイピングクライアント"""
 
-    def __init__(self):
-        pass
-
-    def _parse_count(self, text: str) -> int:
-        """
-        フォロワー数などのテキストを数値に変換
-        例: "831K" -> 831000, "1.5M" -> 1500000, "1,234" -> 1234
-        """
-        text = text.strip().replace(',', '')
+    platform = SNSPlatform.INSTAGRAM
+    default_base_url = "https://www.instagram.com"
 
-        # K (千) の処理
-        if 'K' in text:
-            num_str = text.replace('K', '')
-            try:
-                return int(float(num_str) * 1000)
-            except ValueError:
-                return 0
+    def _scanner(self) -> MarkerScanner:
+        # og:* メタタグは<head>内にあるため</head>まで読めば十分
+        return MarkerScanner([b'</head>'])
 
-        # M (百万) の処理
-        if 'M' in text:
-            num_str = text.replace('M', '')
-            try:
-                return int(float(num_str) * 1000000)
-            except ValueError:
-                return 0
-
-        # 通常の数値
-        try:
-            return int(text)
-        except ValueError:
-            return 0
-
-    async def get_account_info(self, account_id: str) -> AccountInfo:
+    async def get_account_info(self, account_id: str, deadline: Optional[float] = None) -> AccountInfo:
         """
         Instagramユーザー情報を取得（Webスクレイピング）
 
         Args:
             account_id: ユーザー名 (例: harumi_gram)
+            deadline: 呼び出し元の期限（monotonic時刻。送信待ちの順番に使う）
 
         Returns:
             AccountInfo: アカウント情報
@@ -52,93 +103,37 @@ class InstagramClient:
         try:
             # @ を削除
             username = account_id.lstrip('@')
-            url = f"https://www.instagram.com/{username}/"
-
-            # httpxは自動的にgzip解凍するので、明示的なAccept-Encodingは不要
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                    "Accept-Language": "ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7",
-                    "Sec-Fetch-Dest": "document",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-Site": "none",
-                    "Sec-Fetch-User": "?1",
-                    "Upgrade-Insecure-Requests": "1",
-                    "sec-ch-ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                    "sec-ch-ua-mobile": "?0",
-                    "sec-ch-ua-platform": '"macOS"'
-                }
-
-                response = await client.get(url, headers=headers, timeout=30.0)
-
-                if response.status_code == 404:
-                    raise ValueError(f"User not found: {username}")
-                elif response.status_code != 200:
-                    raise ValueError(f"Instagram error: {response.status_code}")
-
-                html_content = response.text
-
-                # BeautifulSoupでHTMLを解析
-                soup = BeautifulSoup(html_content, 'html.parser')
-
-                # og:descriptionメタタグから情報を抽出
-                og_description = soup.find('meta', property='og:description')
-                if not og_description:
-                    raise ValueError("Could not find account data in page")
-
-                description = og_description.get('content', '')
-
-                # フォロワー数、フォロー数、投稿数を抽出
-                # 英語パターン: "XXX Followers, YYY Following, ZZZ Posts"
-                # 日本語パターン: "フォロワーXXX人、フォロー中YYY人、投稿ZZZ件"
-                followers_match = re.search(r'([\d,.KM]+)\s+Followers?', description)
-                following_match = re.search(r'([\d,.KM]+)\s+Following', description)
-                posts_match = re.search(r'([\d,.KM]+)\s+Posts?', description)
-
-                # 日本語パターンも試す
-                if not followers_match:
-                    followers_match = re.search(r'フォロワー([\d,.KM]+)人', description)
-                if not following_match:
-                    following_match = re.search(r'フォロー中([\d,.KM]+)人', description)
-                if not posts_match:
-                    posts_match = re.search(r'投稿([\d,.KM]+)件', description)
-
-                followers_count = 0
-                following_count = 0
-                post_count = None
-
-                if followers_match:
-                    followers_count = self._parse_count(followers_match.group(1))
-
-                if following_match:
-                    following_count = self._parse_count(following_match.group(1))
-
-                if posts_match:
-                    post_count = self._parse_count(posts_match.group(1))
-
-                # アカウント名を抽出
-                # og:titleから取得
-                # 英語: "名前 (@username) • Instagram photos and videos"
-                # 日本語: "名前(@username) • Instagram写真と動画"
-                og_title = soup.find('meta', property='og:title')
-                account_name = username
-
-                if og_title:
-                    title = og_title.get('content', '')
-                    # "@" より前の部分を抽出（スペースあり・なし両対応）
-                    name_match = re.search(r'^(.+?)\s*\(@', title)
-                    if name_match:
-                        account_name = name_match.group(1).strip()
-
-                return AccountInfo(
-                    account_id=username,
-                    account_name=account_name,
-                    followers_count=followers_count,
-                    following_count=following_count,
-                    post_count=post_count,
-                    sns=SNSPlatform.INSTAGRAM
-                )
+            url = f"{self.base_url}/{username}/"
+
+            headers = {
+                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+                "Accept-Language": "ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7",
+                "Sec-Fetch-Dest": "document",
+                "Sec-Fetch-Mode": "navigate",
+                "Sec-Fetch-Site": "none",
+                "Sec-Fetch-User": "?1",
+                "Upgrade-Insecure-Requests": "1",
+                "sec-ch-ua": '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+                "sec-ch-ua-mobile": "?0",
+                "sec-ch-ua-platform": '"macOS"'
+            }
+
+            response, body = await self._fetch(url, headers, deadline)
+
+            if response.status_code == 404:
+                raise AccountNotFoundError(f"User not found: {username}")
+            elif response.status_code != 200:
+                raise UpstreamStatusError(f"Instagram error: {response.status_code}", response.status_code)
+
+            # CPUバウンドな解析はイベントループ外で実行
+            try:
+                fields = await self._parse(parse_instagram_page, body, response.encoding or 'utf-8', username)
+            except PageBlockedError:
+                self._report_blocked(url)
+                raise
+            with tracing.phase("validate"):
+                return AccountInfo(**fields)
 
         except httpx.HTTPError as e:
             raise ValueError(f"HTTP error occurred: {e}")
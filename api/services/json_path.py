@@ -0,0 +1,281 @@
+import json
+import re
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
+
+from api.services import tracing
+
+PathElement = Union[str, int]
+Path = Sequence[PathElement]
+
+_WS_RE = re.compile(r'[ \t\n\r]*')
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+# 括弧以外の部分（文字列・数値・リテラル・区切り文字）を1回の照合で読み飛ばす
+# 文字列は丸ごと消費するため、文字列中の括弧や "};" はネストの判定に影響しない
+_PLAIN_RE = re.compile(r'(?:[^"{}\[\]]+|"(?:[^"\\]|\\.)*")*')
+_SCALAR_RE = re.compile(r'[^,}\]\s]+')
+
+_decoder = json.JSONDecoder()
+
+# 先頭のキーの検索で確かめる出現の数の上限（超えたら先頭から辿る）
+_MAX_KEY_CANDIDATES = 4
+
+
+class JSONPathError(ValueError):
+    """JSONテキストの構造が不正"""
+
+
+def _skip_ws(text: str, pos: int) -> int:
+    return _WS_RE.match(text, pos).end()
+
+
+def _read_string(text: str, pos: int) -> Tuple[str, int]:
+    match = _STRING_RE.match(text, pos)
+    if match is None:
+        raise JSONPathError(f"Expected string at {pos}")
+    raw = match.group()
+    # エスケープを含まないキーはデコード不要
+    value = raw[1:-1] if '\\' not in raw else json.loads(raw)
+    return value, match.end()
+
+
+def skip_value(text: str, pos: int) -> int:
+    """
+    pos から始まるJSON値を、Pythonオブジェクトを作らずに読み飛ばす
+
+    Returns:
+        値の直後の位置
+    """
+    pos = _skip_ws(text, pos)
+    if pos >= len(text):
+        raise JSONPathError("Unexpected end of JSON text")
+    char = text[pos]
+
+    if char == '"':
+        match = _STRING_RE.match(text, pos)
+        if match is None:
+            raise JSONPathError(f"Unterminated string at {pos}")
+        return match.end()
+
+    if char not in '{[':
+        match = _SCALAR_RE.match(text, pos)
+        if match is None:
+            raise JSONPathError(f"Unexpected character at {pos}")
+        return match.end()
+
+    depth = 0
+    plain_match = _PLAIN_RE.match
+    length = len(text)
+    while pos < length:
+        char = text[pos]
+        if char == '{' or char == '[':
+            depth += 1
+            pos += 1
+        elif char == '}' or char == ']':
+            depth -= 1
+            pos += 1
+            if depth == 0:
+                return pos
+        else:
+            end = plain_match(text, pos).end()
+            if end == pos:
+                raise JSONPathError(f"Unterminated string at {pos}")
+            pos = end
+    raise JSONPathError("Unexpected end of JSON text")
+
+
+def _find_in_object(text: str, pos: int, key: str, skip: Callable[[str, int], int] = skip_value) -> Optional[int]:
+    """オブジェクト (text[pos] == '{') 内でキーを探し、値の開始位置を返す"""
+    pos = _skip_ws(text, pos + 1)
+    if text.startswith('}', pos):
+        return None
+    while True:
+        name, pos = _read_string(text, _skip_ws(text, pos))
+        pos = _skip_ws(text, pos)
+        if not text.startswith(':', pos):
+            raise JSONPathError(f"Expected ':' at {pos}")
+        pos = _skip_ws(text, pos + 1)
+        if name == key:
+            return pos
+        pos = _skip_ws(text, skip(text, pos))
+        if text.startswith(',', pos):
+            pos += 1
+            continue
+        if text.startswith('}', pos):
+            return None
+        raise JSONPathError(f"Expected ',' or '}}' at {pos}")
+
+
+def _find_in_array(text: str, pos: int, index: int) -> Optional[int]:
+    """配列 (text[pos] == '[') の index 番目の値の開始位置を返す"""
+    pos = _skip_ws(text, pos + 1)
+    if text.startswith(']', pos):
+        return None
+    current = 0
+    while True:
+        if current == index:
+            return pos
+        pos = _skip_ws(text, skip_value(text, pos))
+        if text.startswith(',', pos):
+            pos = _skip_ws(text, pos + 1)
+            current += 1
+            continue
+        if text.startswith(']', pos):
+            return None
+        raise JSONPathError(f"Expected ',' or ']' at {pos}")
+
+
+def locate(text: str, path: Path, pos: int = 0, end: Optional[int] = None) -> Optional[int]:
+    """
+    パスが指す値の開始位置を返す（途中で見つからなければ None）
+
+    途中の不要な部分木は skip_value で読み飛ばし、オブジェクトを構築しない。
+    キーだけのパスは、まず _locate_by_key で先頭のキーを検索して直接移動する
+
+    Args:
+        end: pos から始まる値の終わりの位置（未指定ならテキストの終わり）
+    """
+    if path and all(isinstance(element, str) for element in path):
+        found = _locate_by_key(text, path, pos, end)
+        if found is not None:
+            return found
+    pos = _skip_ws(text, pos)
+    for element in path:
+        if pos >= len(text):
+            return None
+        char = text[pos]
+        if isinstance(element, int):
+            if char != '[':
+                return None
+            found = _find_in_array(text, pos, element)
+        else:
+            if char != '{':
+                return None
+            found = _find_in_object(text, pos, element)
+        if found is None:
+            return None
+        pos = found
+    return pos
+
+
+def _skip_decoded(text: str, pos: int) -> int:
+    """pos から始まるJSON値をCのデコーダで読み飛ばす（オブジェクトは作るが skip_value より速い）"""
+    return _decoder.raw_decode(text, _skip_ws(text, pos))[1]
+
+
+def _key_candidates(text: str, key: str, pos: int, end: int) -> Iterator[int]:
+    """[pos, end) 内の "key": の出現の値の開始位置を、後ろから順に返す"""
+    needle = '"' + key + '"'
+    while True:
+        found = text.rfind(needle, pos, end)
+        if found < 0:
+            return
+        end = found
+        # 文字列値の中の \"key\" は除外
+        if found > 0 and text[found - 1] == '\\':
+            continue
+        colon = _skip_ws(text, found + len(needle))
+        if text.startswith(':', colon):
+            yield _skip_ws(text, colon + 1)
+
+
+def _close_object(text: str, pos: int) -> int:
+    """オブジェクトのメンバーの値の直後の位置から、残りのメンバーを読み飛ばしてオブジェクトの終わりの直後の位置を返す"""
+    pos = _skip_ws(text, pos)
+    while text.startswith(',', pos):
+        _, pos = _read_string(text, _skip_ws(text, pos + 1))
+        pos = _skip_ws(text, pos)
+        if not text.startswith(':', pos):
+            raise JSONPathError(f"Expected ':' at {pos}")
+        pos = _skip_ws(text, _skip_decoded(text, pos + 1))
+    if not text.startswith('}', pos):
+        raise JSONPathError(f"Expected ',' or '}}' at {pos}")
+    return pos + 1
+
+
+def _locate_by_key(text: str, path: Sequence[str], pos: int, end: Optional[int]) -> Optional[int]:
+    """
+    先頭のキーを文字列検索で探して直接移動し、残りのパスを辿った値の開始位置を返す
+
+    先頭から辿ると手前の巨大な部分木（ytInitialData の contents など）を読み飛ばす必要があるため、
+    "key": の出現に移動して残りのパスを辿り、値の後ろを読んでパスの深さの数だけオブジェクトを
+    閉じた位置が end と一致する（= 出現が pos から始まるオブジェクトの直下のキーである）ことを確かめる。
+    他の部分木の中の同名のキーは、閉じた後にまだ外側が残るため end に届かない。
+    最上位のキーは後ろのメンバーほど終わりに近いため、出現は後ろから調べる。
+    確かめられない場合は None（呼び出し側は先頭から辿る）
+    """
+    if end is None:
+        end = len(text.rstrip(' \t\n\r'))
+    for attempt, candidate in enumerate(_key_candidates(text, path[0], pos, end)):
+        if attempt >= _MAX_KEY_CANDIDATES:
+            return None
+        found: Optional[int] = candidate
+        try:
+            for key in path[1:]:
+                if not text.startswith('{', found):
+                    found = None
+                    break
+                found = _find_in_object(text, found, key, _skip_decoded)
+                if found is None:
+                    break
+            if found is None:
+                continue
+            after = _skip_decoded(text, found)
+            for _ in path:
+                after = _close_object(text, after)
+        except ValueError:
+            # JSONPathError と、デコーダの JSONDecodeError
+            continue
+        if after == end:
+            return found
+    return None
+
+
+def extract_path(
+    text: str, path: Path, default: Any = None, pos: int = 0, end: Optional[int] = None
+) -> Any:
+    """
+    パスが指す部分木だけをデコードして返す
+
+    例: extract_path(text, ['header', 'pageHeaderRenderer']) は
+        json.loads(text)['header']['pageHeaderRenderer'] と同じ値を返すが、
+        他の部分木のPythonオブジェクトは作らない
+
+    Args:
+        end: pos から始まる値の終わりの位置（JSONの後ろに他の内容が続く場合に指定すると、
+            先頭のキーの検索による高速化が使える）
+    """
+    with tracing.phase("locate", detailed=True):
+        start = locate(text, path, pos, end)
+    if start is None:
+        return default
+    with tracing.phase("json", detailed=True):
+        value, _ = _decoder.raw_decode(text, start)
+    return value
+
+
+def extract_paths(text: str, paths: Dict[str, Path], pos: int = 0) -> Dict[str, Any]:
+    """複数のパスを抽出（見つからないパスは結果に含めない）"""
+    result = {}
+    for name, path in paths.items():
+        with tracing.phase("locate", detailed=True):
+            start = locate(text, path, pos)
+        if start is not None:
+            with tracing.phase("json", detailed=True):
+                result[name], _ = _decoder.raw_decode(text, start)
+    return result
+
+
+def find_assignment(text: str, prefix: str) -> Optional[int]:
+    """
+    `var ytInitialData = {...};` のような代入文のオブジェクトの開始位置を返す
+
+    終端は探さず、開始位置から構造的に読むため、非貪欲な正規表現 ({.*?});
+    と違って文字列中の "};" で途中終了しない
+    """
+    start = text.find(prefix)
+    if start < 0:
+        return None
+    start = _skip_ws(text, start + len(prefix))
+    if not text.startswith('{', start):
+        return None
+    return start
@@ -0,0 +1,366 @@
+import asyncio
+import bisect
+import json
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import httpx
+
+from api.models import SNSPlatform
+from api.services.errors import (
+    AccountNotFoundError,
+    CircuitOpenError,
+    PageBlockedError,
+    PageParseError,
+    PersonalAccountError,
+    UpstreamStatusError,
+    iter_causes,
+)
+
+# 取得結果の分類
+OUTCOMES = ("ok", "not_found", "blocked", "parse_failure", "timeout", "upstream_error", "circuit_open", "error")
+
+# 上流がブロック・レート制限を示すステータスコード
+_BLOCKED_STATUS_CODES = (401, 403, 429)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    # json.dumps で \ " 改行をエスケープ（Prometheusのラベル値の規則と同じ）
+    pairs = ",".join(f"{n}={json.dumps(str(v), ensure_ascii=False)}" for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class CounterChild:
+    """ラベル値を固定したカウンタ"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class GaugeChild:
+    """ラベル値を固定したゲージ"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramChild:
+    """ラベル値を固定したヒストグラム（バケットごとの件数は累積せずに保持）"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """
+    メトリクスの共通部分
+
+    記録はイベントループのスレッドからのみ行う前提でロックを持たない。
+    ラベルの組み合わせは事前に作成しておき、呼び出し側は labels() で得た
+    子オブジェクトを保持して使う（記録時に辞書の検索や確保を行わない）。
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 preallocate: Iterable[Sequence[str]] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        for values in preallocate:
+            self.labels(*values)
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._children[()].dec(amount)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 preallocate: Iterable[Sequence[str]] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, preallocate)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        names = self.labelnames + ("le",)
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                labels = _format_labels(names, values + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+_PLATFORMS = [(sns.value,) for sns in SNSPlatform]
+
+FETCH_TOTAL = Counter(
+    "sns_fetch_total", "Account fetches by platform and outcome", ["sns", "outcome"],
+    preallocate=[(sns.value, outcome) for sns in SNSPlatform for outcome in OUTCOMES],
+)
+FETCH_SECONDS = Histogram(
+    "sns_fetch_seconds", "End-to-end account fetch time (request, download and parse)", ["sns"],
+    preallocate=_PLATFORMS,
+)
+FETCH_INFLIGHT = Gauge("sns_fetch_inflight", "Account fetches in progress", ["sns"], preallocate=_PLATFORMS)
+UPSTREAM_SECONDS = Histogram(
+    "sns_upstream_request_seconds", "Upstream request time including queueing and body download", ["sns"],
+    preallocate=_PLATFORMS,
+)
+UPSTREAM_BYTES = Counter(
+    "sns_upstream_bytes_total", "Response body bytes downloaded from upstream", ["sns"], preallocate=_PLATFORMS,
+)
+UPSTREAM_INFLIGHT = Gauge(
+    "sns_upstream_inflight", "Upstream requests in progress", ["sns"], preallocate=_PLATFORMS,
+)
+PARSE_SECONDS = Histogram(
+    "sns_parse_seconds", "Page parse time", ["sns"], preallocate=_PLATFORMS, buckets=PARSE_BUCKETS,
+)
+CIRCUIT_STATE = Gauge(
+    "sns_circuit_state", "Circuit breaker state (0=closed, 1=half-open, 2=open)", ["sns"], preallocate=_PLATFORMS,
+)
+HEDGED_REQUESTS = Counter(
+    "sns_hedged_requests_total", "Hedged duplicate upstream requests sent", ["sns"], preallocate=_PLATFORMS,
+)
+HEDGE_WINS = Counter(
+    "sns_hedge_wins_total", "Hedged requests that answered before the original", ["sns"], preallocate=_PLATFORMS,
+)
+CLUSTER_REQUESTS = Counter(
+    "sns_cluster_requests_total",
+    "Cluster-mode lookups by route (local: owned here, forwarded: served by the owner, fallback: owner unreachable)",
+    ["route"], preallocate=[("local",), ("forwarded",), ("fallback",)],
+)
+PROXY_REQUESTS = Counter(
+    "sns_proxy_requests_total", "Upstream attempts by egress proxy and outcome (ok, throttled, error)",
+    ["proxy", "sns", "outcome"],
+)
+PROXY_STATE = Gauge(
+    "sns_proxy_state", "Egress proxy circuit state per platform (0=in rotation, 1=probing, 2=ejected)",
+    ["proxy", "sns"],
+)
+CACHE_RESULTS = ("HIT", "MISS", "STALE", "NEGATIVE")
+CACHE_LOOKUPS = Counter(
+    "sns_cache_lookups_total", "Account cache lookups by result (NEGATIVE: cached failure)", ["sns", "result"],
+    preallocate=[(sns.value, result) for sns in SNSPlatform for result in CACHE_RESULTS],
+)
+SHARED_CACHE_LOOKUPS = Counter(
+    "sns_shared_cache_lookups_total", "Shared (L2) cache lookups by result", ["sns", "result"],
+    preallocate=[(sns.value, result) for sns in SNSPlatform for result in ("HIT", "MISS", "STALE")],
+)
+SUBSCRIBERS = Gauge("sns_subscribers", "Open subscription feed connections")
+SUBSCRIPTION_KEYS = Gauge("sns_subscription_keys", "Distinct accounts polled for subscription feeds")
+SUBSCRIPTION_COALESCED = Counter(
+    "sns_subscription_coalesced_total", "Feed events merged into an unsent event for a slow subscriber",
+)
+# ラベルに使うHTTPメソッド（それ以外は "other" にまとめ、任意のメソッド名でラベルが増えないようにする）
+HTTP_METHODS = ("GET", "POST", "HEAD", "OPTIONS", "other")
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests handled", ["route", "method", "status"])
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request handling time", ["route", "method"],
+    preallocate=[("other", method) for method in HTTP_METHODS],
+)
+HTTP_INFLIGHT = Gauge("http_requests_inflight", "HTTP requests in progress")
+LOOP_LAG = Histogram("event_loop_lag_seconds", "Event loop scheduling delay", buckets=LAG_BUCKETS)
+LOOP_LAG_LAST = Gauge("event_loop_lag_last_seconds", "Most recent event loop scheduling delay")
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    取得時の例外を結果の分類に変換
+
+    クライアントは例外を ValueError で包み直すため、連鎖をたどって元の例外の型で判定する
+    """
+    for cause in iter_causes(exc):
+        if isinstance(cause, (AccountNotFoundError, PersonalAccountError)):
+            return "not_found"
+        if isinstance(cause, PageBlockedError):
+            return "blocked"
+        if isinstance(cause, (PageParseError, json.JSONDecodeError)):
+            return "parse_failure"
+        if isinstance(cause, UpstreamStatusError):
+            return "blocked" if cause.status_code in _BLOCKED_STATUS_CODES else "upstream_error"
+        if isinstance(cause, (TimeoutError, httpx.TimeoutException)):
+            return "timeout"
+        if isinstance(cause, CircuitOpenError):
+            return "circuit_open"
+    return "error"
+
+
+def render() -> str:
+    """Prometheusのテキスト形式 (text/plain; version=0.0.4) で出力"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """一定間隔でスリープし、予定時刻からの遅れをイベントループの遅延として記録"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
+
+class MetricsMiddleware:
+    """
+    HTTPリクエストの件数・処理時間・同時処理数を記録するASGIミドルウェア
+
+    ルートのラベルにはパスのテンプレート（例: /account/）を使い、
+    どのルートにも一致しないリクエストは "other" にまとめる。
+    メソッドは HTTP_METHODS のいずれかに正規化する。
+    子オブジェクトはルートごとに全メソッド分を最初のリクエストで作成して保持し、
+    記録時に labels() を呼ばない
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # ルート → メソッド → (処理時間, ステータスコード → 件数)
+        self._children: Dict[str, Dict[str, Tuple[HistogramChild, Dict[int, CounterChild]]]] = {}
+        self._route_children("other")
+
+    def _route_children(self, path: str) -> Dict[str, Tuple[HistogramChild, Dict[int, CounterChild]]]:
+        children = self._children.get(path)
+        if children is None:
+            children = self._children[path] = {
+                method: (HTTP_SECONDS.labels(path, method), {}) for method in HTTP_METHODS
+            }
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_INFLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_INFLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "other")
+            method = scope["method"]
+            if method not in HTTP_METHODS:
+                method = "other"
+            seconds, requests = self._route_children(path)[method]
+            seconds.observe(time.perf_counter() - start)
+            counter = requests.get(status)
+            if counter is None:
+                counter = requests[status] = HTTP_REQUESTS.labels(path, method, status)
+            counter.inc()
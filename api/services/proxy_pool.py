@@ -0,0 +1,204 @@
+import hashlib
+import math
+import random
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import httpx
+
+from api.config import Settings, settings
+from api.models import SNSPlatform
+from api.services import metrics
+from api.services.errors import CircuitOpenError
+from api.services.http_pool import create_http_client
+from api.services.resilience import FAILURE_STATUS_CODES, CircuitBreaker
+
+# プロキシを使わない直接接続を表す指定
+DIRECT = "direct"
+
+# 直近の状況のEWMA係数
+_ALPHA = 0.2
+
+# 応答時間が未観測のプロキシの想定値（秒）
+_DEFAULT_LATENCY = 0.5
+
+
+def _display_name(url: Optional[str]) -> str:
+    """ログ・メトリクス用の名前（認証情報を含めない）"""
+    if url is None:
+        return DIRECT
+    parsed = httpx.URL(url)
+    return f"{parsed.host}:{parsed.port}" if parsed.port else parsed.host
+
+
+def _hash_unit(key: str, name: str) -> float:
+    """(key, name) から決まる (0, 1) の値"""
+    digest = hashlib.blake2b(f"{key}\0{name}".encode("utf-8"), digest_size=8).digest()
+    return (int.from_bytes(digest, "big") + 0.5) / 2 ** 64
+
+
+class ProxyHealth:
+    """
+    1プロキシ×1プラットフォームの直近の応答状況
+
+    ブロック・レート制限は送信元IPごと・プラットフォームごとに起きるため、組み合わせ単位で持つ。
+    連続失敗でサーキットブレーカーが開いたプロキシは選ばない（期限後に1件だけ試行を通して復帰を確かめる）
+    """
+
+    def __init__(self, proxy: str, platform: SNSPlatform, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.throttle_rate = 0.0
+        self.inflight = 0
+        self.requests = 0
+
+        self._state_gauge = metrics.PROXY_STATE.labels(proxy, platform.value)
+        self._outcomes = {
+            outcome: metrics.PROXY_REQUESTS.labels(proxy, platform.value, outcome)
+            for outcome in ("ok", "throttled", "error")
+        }
+
+    def weight(self) -> float:
+        """選ばれやすさ（速く、失敗・レート制限が少なく、空いているほど大きい）"""
+        latency = self.latency if self.latency is not None else _DEFAULT_LATENCY
+        health = (1.0 - self.error_rate) * (1.0 - self.throttle_rate) ** 2
+        # 同時実行数の影響は弱めにする（混雑のたびにアカウントの振り先が入れ替わらないよう）
+        return max(health, 1e-3) / ((latency + 0.01) * (1 + self.inflight / 4))
+
+    def available(self) -> bool:
+        """送信してよいか（ブレーカーが開いていれば False）"""
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            return False
+        finally:
+            self._state_gauge.set(self.breaker.state)
+        return True
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latency = seconds if self.latency is None else self.latency + _ALPHA * (seconds - self.latency)
+
+    def record(self, outcome: str) -> None:
+        """試行の結果（"ok", "throttled", "error"）を反映"""
+        self.requests += 1
+        self._outcomes[outcome].inc()
+        self.error_rate += _ALPHA * ((outcome == "error") - self.error_rate)
+        self.throttle_rate += _ALPHA * ((outcome == "throttled") - self.throttle_rate)
+        if outcome == "ok":
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        self._state_gauge.set(self.breaker.state)
+
+    def record_status(self, status_code: int) -> None:
+        """
+        応答ステータスを反映
+
+        200は解析結果（ソフトブロックかどうか）で判定するため、ここでは記録しない
+        """
+        if status_code in FAILURE_STATUS_CODES:
+            self.record("throttled")
+        elif status_code >= 500:
+            self.record("error")
+        elif status_code != 200:
+            self.record("ok")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.stats(),
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "throttle_rate": round(self.throttle_rate, 3),
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "weight": round(self.weight(), 3),
+        }
+
+
+class ProxyEndpoint:
+    """外向きプロキシ1つ分（専用の接続プールを持つ）"""
+
+    def __init__(self, url: Optional[str], config: Settings = settings):
+        self.url = url
+        self.name = _display_name(url)
+        self.client = create_http_client(config, proxy=url)
+        self._config = config
+        self._health: Dict[SNSPlatform, ProxyHealth] = {}
+
+    def health(self, platform: SNSPlatform) -> ProxyHealth:
+        health = self._health.get(platform)
+        if health is None:
+            config = self._config
+            breaker = CircuitBreaker(
+                failure_threshold=config.proxy_eject_failures,
+                reset_timeout=config.proxy_eject_time,
+                max_reset_timeout=config.proxy_max_eject_time,
+            )
+            health = self._health[platform] = ProxyHealth(self.name, platform, breaker)
+        return health
+
+    def stats(self) -> Dict[str, Any]:
+        return {platform.value: health.stats() for platform, health in self._health.items()}
+
+
+class ProxyPool:
+    """
+    外向きプロキシのプールとロードバランサー
+
+    送信元IPごとのレート制限を超えて上流への送信量を増やすため、リクエストを複数のプロキシに振り分ける。
+
+    - 選択は重み付きランデブーハッシュ: キー（アカウントのURL）とプロキシから決まる乱数と
+      プロキシの重み（応答時間・エラー率・429率・同時実行数）で順位を付け、最上位を選ぶ。
+      同じアカウントは重みが大きく変わらない限り同じプロキシに送られる（Cookie・接続の再利用）
+    - 連続失敗したプロキシはプラットフォームごとに一定時間外し、期限後の1件で復帰を確かめる
+    - 全プロキシが外れている場合は CircuitOpenError
+    """
+
+    def __init__(self, urls: Sequence[str], config: Settings = settings):
+        if not urls:
+            raise ValueError("Proxy pool needs at least one proxy")
+        self.endpoints = [ProxyEndpoint(None if url == DIRECT else url, config) for url in urls]
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> Optional["ProxyPool"]:
+        """設定からプールを作成（プロキシが未設定なら None）"""
+        return cls(config.proxy_urls, config) if config.proxy_urls else None
+
+    def pick(
+        self,
+        platform: SNSPlatform,
+        key: Optional[str] = None,
+        exclude: Iterable[ProxyEndpoint] = (),
+    ) -> ProxyEndpoint:
+        """
+        送信に使うプロキシを選ぶ
+
+        Args:
+            key: 同じプロキシに寄せたい単位（未指定なら重みに比例してランダムに選ぶ）
+            exclude: 避けたいプロキシ（ヘッジで別の送信元から送る場合など）。
+                他に使えるものがなければ除外しない
+        """
+        excluded = set(exclude)
+        ranked = []
+        for endpoint in self.endpoints:
+            u = _hash_unit(key, endpoint.name) if key is not None else random.random() or 0.5
+            ranked.append((-endpoint.health(platform).weight() / math.log(u), endpoint))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+
+        for _, endpoint in ranked:
+            if endpoint not in excluded and endpoint.health(platform).available():
+                return endpoint
+        for _, endpoint in ranked:
+            if endpoint in excluded and endpoint.health(platform).available():
+                return endpoint
+        retry_after = min(
+            endpoint.health(platform).breaker.stats()["retry_after"] for endpoint in self.endpoints
+        )
+        raise CircuitOpenError("All proxies are ejected", retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {endpoint.name: endpoint.stats() for endpoint in self.endpoints}
+
+    async def aclose(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.client.aclose()
@@ -0,0 +1,103 @@
+import importlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from api.config import Settings, settings
+from api.models import SNSPlatform
+
+# 組み込みのプラットフォームクライアント（"モジュール:クラス"）
+BUILTIN_CLIENTS: Dict[SNSPlatform, str] = {
+    SNSPlatform.YOUTUBE: "api.services.youtube_client:YouTubeClient",
+    SNSPlatform.TIKTOK: "api.services.tiktok_client:TikTokClient",
+    SNSPlatform.INSTAGRAM: "api.services.instagram_client:InstagramClient",
+    SNSPlatform.FACEBOOK: "api.services.facebook_client:FacebookClient",
+}
+
+# (プラットフォーム, クライアントクラス) -> クライアント
+ClientFactory = Callable[[SNSPlatform, type], Any]
+
+
+def load_client_class(spec: str) -> type:
+    """"モジュール:クラス" 形式の指定からクラスを読み込む"""
+    module_name, sep, attr = spec.partition(":")
+    if not sep or not module_name or not attr:
+        raise ValueError(f"Invalid client spec (expected 'module:Class'): {spec}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class ClientRegistry(Mapping[SNSPlatform, Any]):
+    """
+    プラットフォームクライアントの遅延生成レジストリ
+
+    各プラットフォームのモジュール（bs4などの依存を含む）は最初に使われたときに読み込み、
+    クライアントを1つ生成して以降はそれを使い回す。無効にしたプラットフォームは
+    読み込まず、含まれないものとして扱う（AccountService からは未対応のプラットフォームに見える）。
+
+    {プラットフォーム: クライアント} の読み取り専用の辞書として振る舞い、
+    `in` と反復は読み込みを伴わない
+    """
+
+    def __init__(
+        self,
+        factory: ClientFactory,
+        enabled: Optional[Iterable[SNSPlatform]] = None,
+        specs: Optional[Mapping[SNSPlatform, str]] = None,
+    ):
+        self._factory = factory
+        self._specs = {**BUILTIN_CLIENTS, **(specs or {})}
+        allowed = None if enabled is None else set(enabled)
+        self.enabled = tuple(
+            sns for sns in SNSPlatform if sns in self._specs and (allowed is None or sns in allowed)
+        )
+        self._clients: Dict[SNSPlatform, Any] = {}
+
+    @classmethod
+    def from_settings(
+        cls,
+        pool: Any,
+        scheduler: Any = None,
+        executor: Any = None,
+        resilience: Any = None,
+        proxies: Any = None,
+        config: Settings = settings,
+    ) -> "ClientRegistry":
+        """共有の接続プール・スケジューラ・エグゼキュータ・プロキシを使うクライアントのレジストリを設定から作成"""
+        registry = cls(
+            lambda sns, client_class: client_class(pool.get(sns), scheduler, executor, resilience, proxies),
+            enabled=config.enabled_platforms,
+            specs=config.platform_clients,
+        )
+        if config.platform_preload:
+            registry.preload()
+        return registry
+
+    def __getitem__(self, sns: SNSPlatform) -> Any:
+        client = self._clients.get(sns)
+        if client is None:
+            if sns not in self.enabled:
+                raise KeyError(sns)
+            client = self._clients[sns] = self._factory(sns, load_client_class(self._specs[sns]))
+        return client
+
+    def __contains__(self, sns: object) -> bool:
+        return sns in self.enabled
+
+    def __iter__(self) -> Iterator[SNSPlatform]:
+        return iter(self.enabled)
+
+    def __len__(self) -> int:
+        return len(self.enabled)
+
+    def preload(self) -> None:
+        """有効なプラットフォームのクライアントをすべて生成（最初のリクエストで読み込まないようにする）"""
+        for sns in self.enabled:
+            self[sns]
+
+    def loaded(self) -> List[SNSPlatform]:
+        """生成済みのプラットフォーム"""
+        return list(self._clients)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": [sns.value for sns in self.enabled],
+            "loaded": [sns.value for sns in self._clients],
+        }
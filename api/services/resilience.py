@@ -0,0 +1,270 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from api.config import Settings, settings
+from api.models import SNSPlatform
+from api.services import metrics
+from api.services.errors import CircuitOpenError
+
+T = TypeVar("T")
+
+# サーキットブレーカーの状態（メトリクスのゲージ値）
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+_STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half_open", OPEN: "open"}
+
+# 上流の障害・ブロックとみなすステータスコード（200以外でもこれ以外は正常応答として扱う）
+FAILURE_STATUS_CODES = (403, 429)
+
+
+class CircuitBreaker:
+    """
+    プラットフォーム単位のサーキットブレーカー
+
+    - closed: 連続失敗が failure_threshold に達したら open
+    - open: reset_timeout の間は即座に CircuitOpenError（上流に送らない）
+    - half_open: 期限後に half_open_probes 件だけ試行を通し、成功すれば closed、
+      失敗すれば待ち時間を倍にして（max_reset_timeout まで）再び open
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        max_reset_timeout: float = 120.0,
+        half_open_probes: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._timeout = reset_timeout
+        self._open_until = 0.0
+        self._probes = 0
+        self._probe_deadline = 0.0
+
+    def check(self) -> None:
+        """送信してよいか判定（不可なら CircuitOpenError）"""
+        if self.state == CLOSED:
+            return
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now < self._open_until:
+                raise CircuitOpenError("Circuit open: upstream is failing", self._open_until - now)
+            self.state = HALF_OPEN
+            self._probes = 0
+            self._probe_deadline = now + self._timeout
+
+        # half_open: 試行の結果が返らないまま期限を過ぎたら次の試行を通す
+        if now >= self._probe_deadline:
+            self._probes = 0
+            self._probe_deadline = now + self._timeout
+        if self._probes >= self.half_open_probes:
+            raise CircuitOpenError("Circuit half-open: waiting for probe", self._probe_deadline - now)
+        self._probes += 1
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+            self._timeout = self.reset_timeout
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self._timeout = min(self.max_reset_timeout, self._timeout * 2)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened += 1
+        self._open_until = time.monotonic() + self._timeout
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": _STATE_NAMES[self.state],
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "retry_after": round(max(0.0, self._open_until - time.monotonic()), 3) if self.state == OPEN else 0.0,
+        }
+
+
+class LatencyTracker:
+    """直近の応答時間の分位点（p95）を求める"""
+
+    def __init__(self, window: int = 200, quantile: float = 0.95, recompute_every: int = 16):
+        self.quantile = quantile
+        self.recompute_every = recompute_every
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._since_recompute = 0
+        self._value: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_recompute += 1
+
+    def value(self) -> Optional[float]:
+        """分位点（サンプルがなければ None）。毎回ソートしないよう一定件数ごとに再計算する"""
+        if self._samples and (self._value is None or self._since_recompute >= self.recompute_every):
+            ordered = sorted(self._samples)
+            self._value = ordered[min(len(ordered) - 1, int(len(ordered) * self.quantile))]
+            self._since_recompute = 0
+        return self._value
+
+
+class PlatformGuard:
+    """
+    1プラットフォーム分のヘッジリクエストとサーキットブレーカー
+
+    ヘッジ: 最初の試行が送信枠を得てから観測済みのp95を超えても終わらない場合に同じリクエストを
+    もう1つ送り、先に応答した方を使う。送信量が増えすぎないよう、ヘッジはリクエストの max_ratio 割合までに制限する
+    """
+
+    def __init__(self, platform: SNSPlatform, config: Settings = settings):
+        self.platform = platform
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.breaker_failure_threshold,
+            reset_timeout=config.breaker_reset_timeout,
+            max_reset_timeout=config.breaker_max_reset_timeout,
+            half_open_probes=config.breaker_half_open_probes,
+        )
+        self.breaker_enabled = config.breaker_enabled
+        self.latency = LatencyTracker(window=config.hedge_window)
+        self.hedge_enabled = config.hedge_enabled
+        self.hedge_min_delay = config.hedge_min_delay
+        self.hedge_min_samples = config.hedge_min_samples
+        self.hedge_max_ratio = config.hedge_max_ratio
+        self._hedge_tokens = 1.0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+        label = platform.value
+        self._state_gauge = metrics.CIRCUIT_STATE.labels(label)
+        self._hedges_total = metrics.HEDGED_REQUESTS.labels(label)
+        self._hedge_wins_total = metrics.HEDGE_WINS.labels(label)
+
+    def check(self) -> None:
+        if not self.breaker_enabled:
+            return
+        try:
+            self.breaker.check()
+        finally:
+            self._state_gauge.set(self.breaker.state)
+
+    def record_success(self) -> None:
+        if not self.breaker_enabled:
+            return
+        self.breaker.record_success()
+        self._state_gauge.set(self.breaker.state)
+
+    def record_failure(self) -> None:
+        if not self.breaker_enabled:
+            return
+        self.breaker.record_failure()
+        self._state_gauge.set(self.breaker.state)
+
+    def record_status(self, status_code: int) -> None:
+        """
+        応答ステータスを反映
+
+        200は解析結果（ソフトブロックかどうか）で判定するため、ここでは記録しない
+        """
+        if status_code >= 500 or status_code in FAILURE_STATUS_CODES:
+            self.record_failure()
+        elif status_code != 200:
+            self.record_success()
+
+    def hedge_delay(self) -> Optional[float]:
+        """ヘッジを送るまでの待ち時間（送らない場合は None）"""
+        if not self.hedge_enabled or self.breaker.state != CLOSED or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.value() or 0.0)
+
+    async def hedged(self, attempt: Callable[[asyncio.Event], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        attempt(started) を実行し、遅い場合はヘッジを送って先に完了した方を返す
+
+        attempt は送信枠を得た時点で started をセットする。p95 はキュー待ちを含まないため、
+        ヘッジまでの待ち時間も最初の試行の started から数える（ホストの送信待ちが長いだけではヘッジしない）
+
+        Returns:
+            (結果, ヘッジを送ったか)
+        """
+        # リクエストごとに max_ratio ずつヘッジの枠を貯める（上限は数件分）
+        self._hedge_tokens = min(self._hedge_tokens + self.hedge_max_ratio, 5.0)
+        delay = self.hedge_delay()
+        started = asyncio.Event()
+        first = asyncio.ensure_future(attempt(started))
+        tasks = [first]
+        try:
+            if delay is None:
+                return await first, False
+            sent = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait([first, sent], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                sent.cancel()
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or self._hedge_tokens < 1.0:
+                return await first, False
+
+            self._hedge_tokens -= 1.0
+            self.hedges += 1
+            self._hedges_total.inc()
+            tasks.append(asyncio.ensure_future(attempt(asyncio.Event())))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                            self._hedge_wins_total.inc()
+                        return task.result(), True
+                    error = task.exception()
+            raise error
+        finally:
+            # 負けた方の試行は取り消す（接続・送信枠は各試行の後始末で解放される）
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.value()
+        return {
+            "circuit": self.breaker.stats(),
+            "p95": round(p95, 4) if p95 is not None else None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class Resilience:
+    """全クライアントで共有するプラットフォームごとのヘッジ・サーキットブレーカー"""
+
+    def __init__(self, config: Settings = settings):
+        self._config = config
+        self._guards: Dict[SNSPlatform, PlatformGuard] = {}
+
+    def guard(self, platform: SNSPlatform) -> PlatformGuard:
+        guard = self._guards.get(platform)
+        if guard is None:
+            guard = self._guards[platform] = PlatformGuard(platform, self._config)
+        return guard
+
+    def stats(self) -> Dict[str, Any]:
+        return {platform.value: guard.stats() for platform, guard in self._guards.items()}
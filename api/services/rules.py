@@ -0,0 +1,115 @@
+import re
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+# 単位の接尾辞 -> 倍率（大文字・小文字、日本語・中国語（繁体・簡体）・韓国語）
+COUNT_SUFFIXES: Dict[str, int] = {
+    "K": 10 ** 3, "k": 10 ** 3, "千": 10 ** 3, "천": 10 ** 3,
+    "万": 10 ** 4, "萬": 10 ** 4, "만": 10 ** 4,
+    "M": 10 ** 6, "m": 10 ** 6,
+    "億": 10 ** 8, "亿": 10 ** 8, "억": 10 ** 8,
+    "B": 10 ** 9, "b": 10 ** 9,
+}
+
+_SUFFIX_CLASS = "".join(sorted(COUNT_SUFFIXES))
+_CJK_SUFFIX_CLASS = "".join(sorted(suffix for suffix in COUNT_SUFFIXES if not suffix.isascii()))
+
+# 数値（桁区切りのカンマ・小数点付き）と任意の単位
+# 数値と単位の間の空白は漢字・ハングルの単位の前だけ許す（"12 m views" の m は単位ではない）
+_COUNT_RE = re.compile(
+    r"(\d[\d,]*)(\.\d+)?(?:(?:\s(?=[" + _CJK_SUFFIX_CLASS + r"]))?([" + _SUFFIX_CLASS + r"])(?![A-Za-z]))?"
+)
+
+
+def find_count(text: str) -> Optional[int]:
+    """
+    テキスト中で最初に現れるカウントを数値に変換（1回の走査で読む）
+
+    例: "1,234" -> 1234, "831K" -> 831000, "1.5M" -> 1500000, "83.1万人" -> 831000,
+        "24萬" -> 240000, "1.2億" -> 120000000, "3B" -> 3000000000,
+        "チャンネル登録者数 11万人" -> 110000, "110K subscribers" -> 110000
+
+    数値が見つからない場合は None
+    """
+    match = _COUNT_RE.search(text)
+    return None if match is None else _to_int(match)
+
+
+def _to_int(match: "re.Match[str]") -> int:
+    integer, fraction, suffix = match.groups()
+    integer = integer.replace(",", "")
+    if suffix is None:
+        return int(integer)
+    # 小数の誤差（1.15 * 10000 = 11499.999...）で切り捨てられないよう丸める
+    return round(float(integer + (fraction or "")) * COUNT_SUFFIXES[suffix])
+
+
+def parse_count(text: str) -> int:
+    """find_count と同じ（数値が見つからない場合は 0）"""
+    count = find_count(text)
+    return 0 if count is None else count
+
+
+class CountRules:
+    """
+    ラベル付きのカウント（"831K Followers" / "フォロワー83.1万人" など）の抽出ルール
+
+    フィールドごとにロケール別のパターンを "前のラベル{n}後ろのラベル" の形で宣言する
+    （前のラベルは固定文字列、後ろのラベルは正規表現）。生成時に後ろのラベルを
+    名前付きグループの1つの正規表現にまとめ、抽出時はテキスト中の数値を1回走査して、
+    各数値の直後を後ろのラベル、直前を前のラベルと照合する。
+    同じフィールドに複数のパターンが一致した場合は宣言順で先のパターンを優先する。
+
+    例:
+        CountRules({
+            "followers": [r"{n}\\s+Followers?", r"フォロワー{n}人"],
+            "posts": [r"{n}\\s+Posts?", r"投稿{n}件"],
+        })
+    """
+
+    def __init__(self, fields: Mapping[str, Sequence[str]]):
+        # 後ろのラベル -> [(フィールド, 優先順位, 前のラベル), ...]
+        by_suffix: Dict[str, List[Tuple[str, int, str]]] = {}
+        for field, patterns in fields.items():
+            for priority, pattern in enumerate(patterns):
+                prefix, sep, suffix = pattern.partition("{n}")
+                if not sep:
+                    raise ValueError(f"Count pattern must contain {{n}}: {pattern}")
+                by_suffix.setdefault(suffix, []).append((field, priority, prefix))
+        # 空の後ろのラベルは他のどれにも一致しなかった場合だけ使う
+        suffixes = sorted(by_suffix, key=lambda suffix: suffix == "")
+        self._candidates = {f"s{i}": by_suffix[suffix] for i, suffix in enumerate(suffixes)}
+        self._suffix_re = re.compile("|".join(f"(?P<s{i}>{suffix})" for i, suffix in enumerate(suffixes)))
+
+    def extract(self, text: str) -> Dict[str, int]:
+        """一致したフィールドの {フィールド: 数値}（一致しなかったフィールドは含まない）"""
+        best: Dict[str, Tuple[int, "re.Match[str]"]] = {}
+        for number in _COUNT_RE.finditer(text):
+            label = self._suffix_re.match(text, number.end())
+            if label is None:
+                continue
+            start = number.start()
+            for field, priority, prefix in self._candidates[label.lastgroup]:
+                if prefix and not text.endswith(prefix, 0, start):
+                    continue
+                current = best.get(field)
+                if current is None or priority < current[0]:
+                    best[field] = (priority, number)
+                break
+        return {field: _to_int(number) for field, (_, number) in best.items()}
+
+
+class PhraseMatcher:
+    """
+    複数の固定文字列のいずれかを含むかを1回の走査で判定
+
+    エスケープした文字列を長い順に並べた1つの正規表現にまとめる
+    """
+
+    def __init__(self, phrases: Sequence[str]):
+        self.phrases = tuple(phrases)
+        self._regex = re.compile("|".join(re.escape(p) for p in sorted(self.phrases, key=len, reverse=True)))
+
+    def search(self, text: str) -> Optional[str]:
+        """最初に見つかった文字列（なければ None）"""
+        match = self._regex.search(text)
+        return match.group(0) if match else None
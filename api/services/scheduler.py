@@ -0,0 +1,300 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from api.config import Settings, settings
+from api.models import SNSPlatform
+
+# レート制限・ブロックとみなすステータスコード
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class SchedulerTimeoutError(TimeoutError):
+    """送信待ちキューで期限を超過した"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-Afterヘッダーを秒数に変換
+    例: "120" -> 120.0, "Wed, 21 Oct 2015 07:28:00 GMT" -> 残り秒数
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass(order=True)
+class _Waiter:
+    deadline: float
+    seq: int
+    future: asyncio.Future = field(compare=False)
+
+
+class HostLimiter:
+    """
+    ホスト単位のトークンバケット + 同時実行数制限
+
+    - 待機中のリクエストは期限 (deadline) の早い順に送信枠を得る
+    - Retry-After / 連続スロットリング時はホスト全体の送信を一時停止する
+    - AIMD: 成功時は加算的にレートを上げ、スロットリングやエラー率上昇時は乗算的に下げる
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        max_rate: float,
+        min_rate: float,
+        burst: int,
+        max_inflight: int,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        error_threshold: float = 0.2,
+        error_alpha: float = 0.1,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.max_inflight = max_inflight
+        self.increase = increase
+        self.decrease = decrease
+        self.error_threshold = error_threshold
+        self.error_alpha = error_alpha
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.tokens = float(burst)
+        self.inflight = 0
+        self.blocked_until = 0.0
+        self.error_rate = 0.0
+        self.consecutive_throttles = 0
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._waiters if not w.future.done())
+
+    @asynccontextmanager
+    async def slot(self, deadline: float, expires: Optional[float] = None) -> AsyncIterator[None]:
+        """送信枠を取得し、終了時に解放する"""
+        await self.acquire(deadline, expires)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, deadline: float, expires: Optional[float] = None) -> None:
+        """
+        送信枠を待つ
+
+        Args:
+            deadline: 順番の基準（早いものから送信枠を得る）
+            expires: 待つのをやめる時刻（未指定なら deadline）
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, _Waiter(deadline, next(self._seq), future))
+        self._dispatch()
+        if expires is None:
+            expires = deadline
+        try:
+            await asyncio.wait_for(future, max(0.0, expires - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise SchedulerTimeoutError("Outbound request queue deadline exceeded") from None
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._dispatch()
+
+    def record(self, ok: bool, throttled: bool = False, retry_after: Optional[float] = None) -> None:
+        """リクエスト結果を反映してレート・停止時間を調整"""
+        now = time.monotonic()
+        self.error_rate += self.error_alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+        if throttled:
+            self.consecutive_throttles += 1
+            if retry_after is None:
+                retry_after = min(
+                    self.backoff_max,
+                    self.backoff_base * 2 ** (self.consecutive_throttles - 1),
+                )
+        elif ok:
+            self.consecutive_throttles = 0
+
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + min(retry_after, self.backoff_max))
+
+        if throttled or self.error_rate > self.error_threshold:
+            # 同時に失敗した複数リクエストで一気に下がりすぎないよう、1周期に1回だけ減速
+            if now - self._last_decrease >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+        elif ok:
+            # 1秒あたりおよそ increase req/s ずつ上げる
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+        self._dispatch()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(float(self.burst), self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.inflight >= self.max_inflight:
+                return  # release() で再開
+            if now < self.blocked_until:
+                self._schedule(self.blocked_until)
+                return
+            if self.tokens < 1.0:
+                self._schedule(now + (1.0 - self.tokens) / self.rate)
+                return
+            heapq.heappop(self._waiters)
+            self.tokens -= 1.0
+            self.inflight += 1
+            waiter.future.set_result(None)
+
+    def _schedule(self, when: float) -> None:
+        if self._timer is not None and self._timer_at <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer_at = when
+        self._timer = loop.call_later(max(0.0, when - time.monotonic()), self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "tokens": round(self.tokens, 3),
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "error_rate": round(self.error_rate, 3),
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+        }
+
+
+class OutboundScheduler:
+    """
+    全クライアントで共有する外向きリクエストのスケジューラ
+
+    送信枠は (プラットフォーム, ホスト) ごとに持つ。レート・同時実行数の設定はプラットフォームごとのため、
+    同じホストを複数のプラットフォームが使う場合も、それぞれの設定の送信枠を別々に持つ
+    """
+
+    def __init__(self, config: Settings = settings):
+        self._config = config
+        self._limiters: Dict[Tuple[SNSPlatform, str], HostLimiter] = {}
+
+    def limiter(self, platform: SNSPlatform, host: str) -> HostLimiter:
+        key = (platform, host)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            config = self._config
+            limiter = HostLimiter(
+                rate=config.scheduler_rate.get(platform, 1.0),
+                max_rate=config.scheduler_max_rate.get(platform, 10.0),
+                min_rate=config.scheduler_min_rate,
+                burst=config.scheduler_burst,
+                max_inflight=config.scheduler_max_inflight.get(platform, 4),
+                error_threshold=config.scheduler_error_threshold,
+                backoff_max=config.scheduler_backoff_max,
+            )
+            self._limiters[key] = limiter
+        return limiter
+
+    async def send(
+        self,
+        platform: SNSPlatform,
+        host: str,
+        request: Callable[[], Awaitable[httpx.Response]],
+        deadline: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        送信枠を取得してからリクエストを実行する
+
+        429/503でRetry-Afterが期限内に収まる場合は、待機後に再送する
+
+        Args:
+            deadline: 呼び出し元の期限（monotonic時刻）。期限の早いリクエストから送信枠を得る。
+                未指定なら scheduler_max_queue_wait 秒後。期限を過ぎても取得はバックグラウンドで
+                続くため、待つのをやめるのは scheduler_max_queue_wait 秒後（期限の方が遅ければ期限）
+        """
+        limiter = self.limiter(platform, host)
+        expires = time.monotonic() + self._config.scheduler_max_queue_wait
+        if deadline is None:
+            deadline = expires
+        expires = max(expires, deadline)
+
+        retries = 0
+        while True:
+            async with limiter.slot(deadline, expires):
+                try:
+                    response = await request()
+                except httpx.HTTPError:
+                    limiter.record(ok=False)
+                    raise
+
+            throttled = response.status_code in THROTTLE_STATUS_CODES
+            retry_after = parse_retry_after(response.headers.get("Retry-After")) if throttled else None
+            limiter.record(
+                ok=not throttled and response.status_code < 500,
+                throttled=throttled,
+                retry_after=retry_after,
+            )
+
+            if (
+                throttled
+                and retries < self._config.scheduler_max_retries
+                and retry_after is not None
+                and time.monotonic() + retry_after < expires
+            ):
+                retries += 1
+                await response.aclose()
+                continue
+            return response
+
+    def report_blocked(self, platform: SNSPlatform, host: str) -> None:
+        """ステータス200でもログインページ等のソフトブロックを検出した場合に呼ぶ"""
+        self.limiter(platform, host).record(ok=False, throttled=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f"{platform.value} {host}": limiter.stats()
+            for (platform, host), limiter in self._limiters.items()
+        }
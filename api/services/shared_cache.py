@@ -0,0 +1,542 @@
+import asyncio
+import logging
+import sqlite3
+import struct
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from api.models import AccountInfo, SNSPlatform
+from api.services.cache import CacheKey
+
+logger = logging.getLogger(__name__)
+
+# ---- AccountInfo のバイナリ表現 ----
+#
+# ヘッダー: バージョン, SNSコード, フラグ, followers, following, post  (<BBBqqq, 27バイト)
+# 続けて account_id, account_name を (長さ<H + UTF-8) で格納する
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BBBqqq")
+_LENGTH = struct.Struct("<H")
+_FLAG_POST_COUNT = 0x01
+
+# SNSコード（値を変えないこと。プラットフォームを追加する場合は末尾に追加する）
+_SNS_CODES: Dict[SNSPlatform, int] = {
+    SNSPlatform.YOUTUBE: 1,
+    SNSPlatform.TIKTOK: 2,
+    SNSPlatform.INSTAGRAM: 3,
+    SNSPlatform.FACEBOOK: 4,
+}
+_SNS_BY_CODE = {code: sns for sns, code in _SNS_CODES.items()}
+
+# 共有キャッシュのレコード: 保存時刻, 有効期限, stale期限（UNIX時刻）+ AccountInfo
+_RECORD = struct.Struct("<ddd")
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode("utf-8")[:0xFFFF]
+    return _LENGTH.pack(len(data)) + data
+
+
+def _unpack_str(data: bytes, pos: int) -> Tuple[str, int]:
+    (length,) = _LENGTH.unpack_from(data, pos)
+    pos += _LENGTH.size
+    return data[pos:pos + length].decode("utf-8", errors="replace"), pos + length
+
+
+def encode_account(info: AccountInfo) -> bytes:
+    """AccountInfoをコンパクトなバイナリに変換（JSONの1/3程度）"""
+    flags = _FLAG_POST_COUNT if info.post_count is not None else 0
+    header = _HEADER.pack(
+        _FORMAT_VERSION,
+        _SNS_CODES[info.sns],
+        flags,
+        info.followers_count,
+        info.following_count,
+        info.post_count or 0,
+    )
+    return header + _pack_str(info.account_id) + _pack_str(info.account_name)
+
+
+def decode_account(data: bytes) -> AccountInfo:
+    version, sns_code, flags, followers, following, posts = _HEADER.unpack_from(data, 0)
+    if version != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache record version: {version}")
+    account_id, pos = _unpack_str(data, _HEADER.size)
+    account_name, _ = _unpack_str(data, pos)
+    # 保存時に検証済みのため、再検証せずに組み立てる
+    return AccountInfo.model_construct(
+        account_id=account_id,
+        account_name=account_name,
+        followers_count=followers,
+        following_count=following,
+        post_count=posts if flags & _FLAG_POST_COUNT else None,
+        sns=_SNS_BY_CODE[sns_code],
+    )
+
+
+@dataclass
+class SharedEntry:
+    """共有キャッシュから読み出した値"""
+    value: AccountInfo
+    stored_at: float
+    expires_at: float
+    stale_until: float
+
+
+def encode_entry(info: AccountInfo, stored_at: float, ttl: float, stale_ttl: float) -> bytes:
+    return _RECORD.pack(stored_at, stored_at + ttl, stored_at + ttl + stale_ttl) + encode_account(info)
+
+
+def decode_entry(data: bytes) -> SharedEntry:
+    stored_at, expires_at, stale_until = _RECORD.unpack_from(data, 0)
+    return SharedEntry(decode_account(data[_RECORD.size:]), stored_at, expires_at, stale_until)
+
+
+# ---- バックエンド ----
+
+class SharedCacheBackend:
+    """
+    共有キャッシュのバックエンド（値はバイト列、期限は秒数で指定）
+
+    ロックは (キー, トークン) で取得し、同じトークンでのみ解放できる。
+    期限付きなので、保持したワーカーが落ちても lock_ttl 後に解放される。
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    async def release_lock(self, key: str, token: str) -> None:
+        raise NotImplementedError
+
+    async def is_locked(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class MemoryBackend(SharedCacheBackend):
+    """プロセス内の辞書によるバックエンド（テスト・単一ワーカー用のスタンドイン）"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[bytes, float]] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._values.get(key)
+        if item is None:
+            return None
+        if item[1] <= time.time():
+            del self._values[key]
+            return None
+        return item[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values[key] = (value, time.time() + ttl)
+
+    async def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        held = self._locks.get(key)
+        if held is not None and held[1] > now:
+            return False
+        self._locks[key] = (token, now + ttl)
+        return True
+
+    async def release_lock(self, key: str, token: str) -> None:
+        held = self._locks.get(key)
+        if held is not None and held[0] == token:
+            del self._locks[key]
+
+    async def is_locked(self, key: str) -> bool:
+        held = self._locks.get(key)
+        return held is not None and held[1] > time.time()
+
+
+class SQLiteBackend(SharedCacheBackend):
+    """
+    同一ホストのワーカー間で共有するSQLiteバックエンド（WALモード + mmap）
+
+    接続は専用スレッド1つで使い、イベントループをブロックしない。
+    ロックは1文のUPSERTで取得するため、複数プロセスから同時に取得しても1つだけが成功する。
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires REAL NOT NULL)",
+    )
+    # 期限切れのエントリを削除する間隔（書き込み回数）
+    _PURGE_EVERY = 1000
+
+    def __init__(self, path: str, mmap_size: int = 64 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)", (key, value, now + ttl))
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+            conn.execute("DELETE FROM locks WHERE expires <= ?", (now,))
+
+    def _acquire(self, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self._connection().execute(
+            """
+            INSERT INTO locks (key, token, expires) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET token = excluded.token, expires = excluded.expires
+            WHERE locks.expires <= ?
+            """,
+            (key, token, now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def _release(self, key: str, token: str) -> None:
+        self._connection().execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+    def _is_locked(self, key: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM locks WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._call(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._call(self._set, key, value, ttl)
+
+    async def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        return await self._call(self._acquire, key, token, ttl)
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self._call(self._release, key, token)
+
+    async def is_locked(self, key: str) -> bool:
+        return await self._call(self._is_locked, key)
+
+    async def aclose(self) -> None:
+        await self._call(self._close)
+        self._executor.shutdown(wait=True)
+
+
+class RedisError(Exception):
+    """Redisがエラー応答を返した"""
+
+
+class RedisBackend(SharedCacheBackend):
+    """
+    Redisプロトコル (RESP2) のバックエンド（複数ホスト間で共有）
+
+    依存パッケージを増やさないよう、必要なコマンド（GET, SET, EXISTS, EVAL）だけを
+    asyncioのストリームで直接話す。接続は小さなプールで使い回す。
+    """
+
+    # トークンが一致する場合だけロックを削除する
+    _RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        pool_size: int = 8,
+        timeout: float = 1.0,
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            elif isinstance(arg, (int, float)):
+                arg = str(arg).encode("ascii")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    @classmethod
+    async def _read_reply(cls, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by Redis server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(payload.decode("utf-8", errors="replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [await cls._read_reply(reader) for _ in range(count)]
+        raise ConnectionError(f"Unexpected Redis reply: {line[:20]!r}")
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                await self._roundtrip(reader, writer, ("AUTH", self.password))
+            if self.db:
+                await self._roundtrip(reader, writer, ("SELECT", self.db))
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _roundtrip(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, args: Tuple[Any, ...]) -> Any:
+        writer.write(self._encode(args))
+        await writer.drain()
+        return await self._read_reply(reader)
+
+    async def execute(self, *args: Any) -> Any:
+        """コマンドを1つ実行して応答を返す"""
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            try:
+                if conn is None:
+                    conn = await asyncio.wait_for(self._connect(), self.timeout)
+                reply = await asyncio.wait_for(self._roundtrip(*conn, args), self.timeout)
+            except RedisError:
+                self._idle.append(conn)
+                raise
+            except BaseException:
+                # タイムアウトなどで応答が途中の接続は再利用しない
+                if conn is not None:
+                    conn[1].close()
+                raise
+            self._idle.append(conn)
+            return reply
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.execute("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    async def acquire_lock(self, key: str, token: str, ttl: float) -> bool:
+        return await self.execute("SET", key, token, "NX", "PX", max(1, int(ttl * 1000))) == "OK"
+
+    async def release_lock(self, key: str, token: str) -> None:
+        await self.execute("EVAL", self._RELEASE_SCRIPT, 1, key, token)
+
+    async def is_locked(self, key: str) -> bool:
+        return bool(await self.execute("EXISTS", key))
+
+    async def aclose(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def backend_from_url(url: str, timeout: float = 1.0) -> SharedCacheBackend:
+    """
+    URLからバックエンドを作成
+
+    例:
+      - memory://
+      - sqlite:///data/cache.db （相対パス）, sqlite:////var/lib/sns/cache.db （絶対パス）
+      - redis://:password@localhost:6379/0
+    """
+    parts = urlsplit(url)
+    if parts.scheme == "memory":
+        return MemoryBackend()
+    if parts.scheme == "sqlite":
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else parts.path
+        if not path:
+            raise ValueError(f"Missing SQLite path in shared cache URL: {url}")
+        return SQLiteBackend(path)
+    if parts.scheme == "redis":
+        db = parts.path.lstrip("/")
+        return RedisBackend(
+            host=parts.hostname or "localhost",
+            port=parts.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parts.password) if parts.password else None,
+            timeout=timeout,
+        )
+    raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+# ---- 2層目のキャッシュ ----
+
+class SharedCache:
+    """
+    ワーカー（プロセス・ホスト）間で共有する2層目のキャッシュ
+
+    - 値は encode_entry のバイナリ表現で保存し、期限はUNIX時刻で持つ（ワーカー間で比較できる）
+    - lock() でキーごとの取得権を取り、1つのワーカーだけが上流から取得する
+    - バックエンドの障害時はキャッシュなし・ロックなしとして動作を続ける
+    """
+
+    def __init__(
+        self,
+        backend: SharedCacheBackend,
+        ttl: Dict[SNSPlatform, float],
+        stale_ttl: float,
+        default_ttl: float = 300.0,
+        prefix: str = "sns:",
+        lock_ttl: float = 30.0,
+        lock_wait: float = 10.0,
+    ):
+        self.backend = backend
+        self._ttl = ttl
+        self._default_ttl = default_ttl
+        self._stale_ttl = stale_ttl
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.errors = 0
+
+    def _key(self, key: CacheKey) -> str:
+        return f"{self.prefix}{key[0].value}:{key[1]}"
+
+    def _lock_key(self, key: CacheKey) -> str:
+        return f"{self.prefix}lock:{key[0].value}:{key[1]}"
+
+    def _failed(self, action: str, e: Exception) -> None:
+        self.errors += 1
+        logger.warning("Shared cache %s failed: %s", action, e)
+
+    async def get(self, key: CacheKey) -> Optional[SharedEntry]:
+        """値を取得（期限切れ・未保存・障害時は None）"""
+        try:
+            data = await self.backend.get(self._key(key))
+            if data is None:
+                return None
+            entry = decode_entry(data)
+        except Exception as e:
+            self._failed("get", e)
+            return None
+        if entry.stale_until <= time.time():
+            return None
+        return entry
+
+    def ttl_for(self, sns: SNSPlatform) -> float:
+        return self._ttl.get(sns, self._default_ttl)
+
+    async def set(self, key: CacheKey, value: AccountInfo, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            ttl = self.ttl_for(key[0])
+        if ttl <= 0:
+            return
+        data = encode_entry(value, time.time(), ttl, self._stale_ttl)
+        try:
+            await self.backend.set(self._key(key), data, ttl + self._stale_ttl)
+        except Exception as e:
+            self._failed("set", e)
+
+    async def lock(self, key: CacheKey) -> Tuple[bool, Optional[str]]:
+        """
+        キーの取得権を取る
+
+        Returns:
+            (取得できたか, 解放用トークン)。障害時はロックなしで取得を許可する (True, None)
+        """
+        token = uuid.uuid4().hex
+        try:
+            if await self.backend.acquire_lock(self._lock_key(key), token, self.lock_ttl):
+                return True, token
+            return False, None
+        except Exception as e:
+            self._failed("lock", e)
+            return True, None
+
+    async def unlock(self, key: CacheKey, token: Optional[str]) -> None:
+        if token is None:
+            return
+        try:
+            await self.backend.release_lock(self._lock_key(key), token)
+        except Exception as e:
+            self._failed("unlock", e)
+
+    async def wait_for_value(self, key: CacheKey, since: float) -> Optional[SharedEntry]:
+        """
+        他のワーカーが取得中の値を待つ
+
+        since 以降に保存された値が現れたら返す。ロックが解放された（取得に失敗した）
+        場合や lock_wait を超えた場合は None を返し、呼び出し元が自分で取得する
+        """
+        deadline = time.monotonic() + self.lock_wait
+        delay = 0.02
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.25)
+            entry = await self.get(key)
+            if entry is not None and entry.stored_at >= since:
+                return entry
+            try:
+                if not await self.backend.is_locked(self._lock_key(key)):
+                    # 解放直後に書き込まれた値をもう一度確認
+                    entry = await self.get(key)
+                    return entry if entry is not None and entry.stored_at >= since else None
+            except Exception as e:
+                self._failed("is_locked", e)
+                return None
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self.backend).__name__, "errors": self.errors}
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
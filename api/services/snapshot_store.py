@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.models import AccountInfo, SNSPlatform
+from api.services.cache import CacheKey, normalize_account_id
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    sns TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    followers_count INTEGER NOT NULL,
+    following_count INTEGER NOT NULL,
+    post_count INTEGER,
+    PRIMARY KEY (sns, account_id, ts)
+) WITHOUT ROWID
+"""
+
+_INSERT = """
+INSERT OR REPLACE INTO snapshots (sns, account_id, ts, followers_count, following_count, post_count)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# バケットごとに最新の1行を返す（SQLiteでは MAX() と同じ行の値が素の列に入る）
+_HISTORY = """
+SELECT MAX(ts) AS ts, followers_count, following_count, post_count
+FROM snapshots
+WHERE sns = ? AND account_id = ? AND ts >= ? AND ts < ?
+GROUP BY ts / ?
+ORDER BY ts
+"""
+
+SnapshotRow = Tuple[str, str, int, int, int, Optional[int]]
+
+
+class SnapshotStore:
+    """
+    フォロワー数のスナップショットを保存する追記専用ストア（SQLite WALモード）
+
+    書き込みはキューに積むだけでリクエスト処理をブロックせず、
+    バックグラウンドタスクがまとめて1トランザクションで書き込む。
+    主キー (sns, account_id, ts) のクラスタ化インデックスで範囲検索する。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        queue_size: int = 10000,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # 接続ごとに専用スレッドを1つ割り当てて、同じ接続を複数スレッドから同時に使わない
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer")
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-reader")
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _open(self) -> None:
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._write_conn = self._connect()
+        self._write_conn.execute(_SCHEMA)
+        self._write_conn.commit()
+        self._read_conn = self._connect() if self.path != ":memory:" else self._write_conn
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self._open)
+        self._task = asyncio.create_task(self._run())
+
+    def record(self, key: CacheKey, info: AccountInfo, ts: Optional[float] = None) -> None:
+        """
+        取得結果を記録（キューが満杯の場合は破棄して数える）
+
+        リクエストされたIDのキャッシュキーで保存する。ページが返すIDは異なる場合がある
+        （YouTubeのチャンネルID指定に対する @ハンドル など）ため、history() と同じキーで引けるようにする
+        """
+        row = (
+            key[0].value,
+            key[1],
+            int(ts if ts is not None else time.time()),
+            info.followers_count,
+            info.following_count,
+            info.post_count,
+        )
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            # 最初の1件が来てから flush_interval の間、またはバッチが埋まるまで溜める
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._write(batch)
+
+    async def _write(self, batch: List[SnapshotRow]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._writer, self._write_batch, batch)
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            self.dropped += len(batch)
+            logger.warning("Failed to write %d snapshots: %s", len(batch), e)
+
+    def _write_batch(self, batch: List[SnapshotRow]) -> None:
+        with self._write_conn:
+            self._write_conn.executemany(_INSERT, batch)
+
+    async def history(
+        self,
+        sns: SNSPlatform,
+        account_id: str,
+        start: float,
+        end: float,
+        step: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        [start, end) の履歴を step 秒ごとに間引いて返す（各区間の最新値）
+        """
+        args = (sns.value, normalize_account_id(sns, account_id), int(start), int(end), max(1, int(step)))
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self._reader, self._query, args)
+        return [
+            {"ts": ts, "followers_count": followers, "following_count": following, "post_count": posts}
+            for ts, followers, following, posts in rows
+        ]
+
+    def _query(self, args: Tuple[Any, ...]) -> List[Tuple[int, int, int, Optional[int]]]:
+        return self._read_conn.execute(_HISTORY, args).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+    async def aclose(self) -> None:
+        """未書き込み分を書き出してから閉じる"""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self._close)
+        self._writer.shutdown(wait=True)
+        self._reader.shutdown(wait=True)
+
+    def _close(self) -> None:
+        if self._read_conn is not None and self._read_conn is not self._write_conn:
+            self._read_conn.close()
+        if self._write_conn is not None:
+            self._write_conn.close()
+        self._read_conn = self._write_conn = None
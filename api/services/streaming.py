@@ -0,0 +1,38 @@
+from typing import Sequence
+
+
+class MarkerScanner:
+    """
+    受信中のバッファを逐次走査し、指定したマーカーが順番にすべて現れたかを判定する
+
+    チャンクを受け取るたびに前回の走査位置から再開するため、
+    バッファ全体を繰り返し検索することはない。
+    例: MarkerScanner([b'var ytInitialData = ', b';</script>'])
+    """
+
+    def __init__(self, markers: Sequence[bytes]):
+        self.markers = list(markers)
+        self._index = 0
+        self._pos = 0
+
+    @property
+    def done(self) -> bool:
+        return self._index >= len(self.markers)
+
+    def feed(self, buffer: bytes) -> bool:
+        """
+        バッファ（これまでに受信した全バイト）を走査
+
+        Returns:
+            すべてのマーカーが見つかった場合 True
+        """
+        while not self.done:
+            marker = self.markers[self._index]
+            found = buffer.find(marker, self._pos)
+            if found < 0:
+                # マーカーがチャンク境界をまたぐ場合に備えて末尾を残す
+                self._pos = max(self._pos, len(buffer) - len(marker) + 1)
+                return False
+            self._pos = found + len(marker)
+            self._index += 1
+        return True
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from api.models import SNSPlatform
+from api.services import metrics
+from api.services.cache import CacheKey, make_cache_key
+from api.services.errors import http_status_for
+
+logger = logging.getLogger(__name__)
+
+# 差分として配信するフィールド
+DELTA_FIELDS = ("followers_count", "following_count", "post_count")
+
+# 未指定プラットフォームのポーリング間隔（秒）
+_DEFAULT_INTERVAL = 30.0
+
+# (イベント名, データ)
+Event = Tuple[str, Dict[str, Any]]
+
+
+def parse_keys(value: str) -> List[CacheKey]:
+    """
+    "youtube:@foo,tiktok:bar" 形式の購読キーを解析
+
+    アカウントIDは正規化し、重複は取り除く（順序は保つ）
+    """
+    keys: Dict[CacheKey, None] = {}
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        sns, sep, account_id = part.partition(":")
+        if not sep or not account_id.strip():
+            raise ValueError(f"Invalid subscription key (expected 'sns:account_id'): {part}")
+        try:
+            platform = SNSPlatform(sns.strip().lower())
+        except ValueError:
+            raise ValueError(f"Unknown platform: {sns}")
+        keys[make_cache_key(platform, account_id.strip())] = None
+    return list(keys)
+
+
+class Subscription:
+    """
+    1接続分の購読
+
+    未送信のイベントはキーごとに値（snapshot/delta）とエラーを1件ずつ保持し、送信前に同じキーの
+    差分が届いたら間にエラーがあっても値の側にまとめる（snapshot への差分は snapshot のまま送るため、
+    購読者が基準の値を受け取らずに差分だけを受け取ることはない）。
+    遅い購読者でも保持する量は購読キー数の2倍までで、ポーラーを待たせない
+    """
+
+    def __init__(self, hub: "SubscriptionHub"):
+        self._hub = hub
+        self.keys: Set[CacheKey] = set()
+        # キー -> {"state" | "error": イベント}（届いた順）
+        self._pending: "OrderedDict[CacheKey, OrderedDict[str, Event]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+
+    def add(self, keys: Iterable[CacheKey]) -> None:
+        self._hub._subscribe(self, keys)
+
+    def remove(self, keys: Iterable[CacheKey]) -> None:
+        self._hub._unsubscribe(self, keys)
+
+    def push(self, key: CacheKey, event: str, data: Dict[str, Any]) -> None:
+        """イベントを追加（未送信の同じキー・同じ種類のイベントがあればまとめる）"""
+        slots = self._pending.get(key)
+        if slots is None:
+            slots = self._pending[key] = OrderedDict()
+        slot = "error" if event == "error" else "state"
+        pending = slots.pop(slot, None)
+        if pending is not None:
+            self.coalesced += 1
+            self._hub._coalesced_total.inc()
+            kind, previous = pending
+            # 差分は未送信の snapshot/delta に重ねる（エラーと snapshot は最新のもので置き換える）
+            if event == "delta":
+                event, data = kind, {**previous, **data}
+        slots[slot] = (event, data)
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        次のイベントを待つ
+
+        Returns:
+            (イベント名, データ)。timeout 秒以内に届かなければ None
+
+        Raises:
+            StopAsyncIteration: 購読が閉じられた
+        """
+        while not self._pending:
+            if self.closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        key, slots = next(iter(self._pending.items()))
+        _, event = slots.popitem(last=False)
+        if not slots:
+            del self._pending[key]
+        self.sent += 1
+        return event
+
+    def close(self) -> None:
+        """購読を解除（何度呼んでもよい）"""
+        if not self.closed:
+            self._hub._close(self)
+        self.closed = True
+        self._ready.set()
+
+
+class _Topic:
+    """1キー分の共有ポーラーと最新の値"""
+
+    __slots__ = ("key", "subscribers", "state", "error", "task", "polls")
+
+    def __init__(self, key: CacheKey):
+        self.key = key
+        self.subscribers: Set[Subscription] = set()
+        self.state: Optional[Dict[str, Any]] = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+        self.polls = 0
+
+
+class SubscriptionHub:
+    """
+    アカウントの購読フィード
+
+    - キーごとに1つのポーラーが最初の購読者の参加で起動し、最後の購読者が抜けると止まる
+      （上流への取得はキーの数に比例し、購読者の数には比例しない）
+    - ポーリングは get_account(max_age=間隔の半分) で行い、/account/ やウォッチリストで
+      取得済みの新しい値があれば上流には取りに行かない
+    - 値が変わったフィールドだけを差分として全購読者に配信する
+      （参加時には取得済みの値をスナップショットとして送る）
+    - 失敗時は指数バックオフ（上限は間隔の8倍）し、エラーの内容が変わったときだけ通知する
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        interval: Dict[SNSPlatform, float],
+        max_keys: int = 100,
+        max_topics: int = 5000,
+        max_subscribers: int = 10000,
+    ):
+        self.service = service
+        self.interval = interval
+        self.max_keys = max_keys
+        self.max_topics = max_topics
+        self.max_subscribers = max_subscribers
+
+        self._topics: Dict[CacheKey, _Topic] = {}
+        self._subscriptions: Set[Subscription] = set()
+        self.changes = 0
+        self.failed = 0
+
+        self._subscribers_gauge = metrics.SUBSCRIBERS.labels()
+        self._topics_gauge = metrics.SUBSCRIPTION_KEYS.labels()
+        self._coalesced_total = metrics.SUBSCRIPTION_COALESCED.labels()
+
+    def interval_for(self, sns: SNSPlatform) -> float:
+        return self.interval.get(sns, _DEFAULT_INTERVAL)
+
+    def open(self, keys: Iterable[CacheKey] = ()) -> Subscription:
+        """
+        購読を開始
+
+        Raises:
+            ValueError: 購読者数・キー数の上限を超える
+        """
+        if len(self._subscriptions) >= self.max_subscribers:
+            raise ValueError(f"Too many subscribers (max {self.max_subscribers})")
+        subscription = Subscription(self)
+        self._subscriptions.add(subscription)
+        self._subscribers_gauge.set(len(self._subscriptions))
+        try:
+            subscription.add(keys)
+        except ValueError:
+            subscription.close()
+            raise
+        return subscription
+
+    def _subscribe(self, subscription: Subscription, keys: Iterable[CacheKey]) -> None:
+        if subscription.closed:
+            raise ValueError("Subscription is closed")
+        new = [key for key in dict.fromkeys(keys) if key not in subscription.keys]
+        if len(subscription.keys) + len(new) > self.max_keys:
+            raise ValueError(f"Too many keys: {len(subscription.keys) + len(new)} (max {self.max_keys})")
+        added_topics = sum(key not in self._topics for key in new)
+        if len(self._topics) + added_topics > self.max_topics:
+            raise ValueError(f"Too many subscribed accounts (max {self.max_topics})")
+
+        for key in new:
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = _Topic(key)
+                topic.task = asyncio.create_task(self._poll(topic))
+            topic.subscribers.add(subscription)
+            subscription.keys.add(key)
+            # 取得済みの値があればすぐに送る（なければ最初のポーリングの結果を待つ）
+            if topic.state is not None:
+                subscription.push(key, "snapshot", dict(topic.state))
+            elif topic.error is not None:
+                subscription.push(key, "error", dict(topic.error))
+        self._topics_gauge.set(len(self._topics))
+
+    def _unsubscribe(self, subscription: Subscription, keys: Iterable[CacheKey]) -> None:
+        for key in keys:
+            if key not in subscription.keys:
+                continue
+            subscription.keys.discard(key)
+            subscription._pending.pop(key, None)
+            topic = self._topics.get(key)
+            if topic is None:
+                continue
+            topic.subscribers.discard(subscription)
+            if not topic.subscribers:
+                del self._topics[key]
+                if topic.task is not None:
+                    topic.task.cancel()
+        self._topics_gauge.set(len(self._topics))
+
+    def _close(self, subscription: Subscription) -> None:
+        self._unsubscribe(subscription, list(subscription.keys))
+        self._subscriptions.discard(subscription)
+        self._subscribers_gauge.set(len(self._subscriptions))
+
+    def _publish(self, topic: _Topic, event: str, data: Dict[str, Any]) -> None:
+        for subscription in topic.subscribers:
+            subscription.push(topic.key, event, dict(data))
+
+    async def _poll(self, topic: _Topic) -> None:
+        sns, account_id = topic.key
+        interval = self.interval_for(sns)
+        failures = 0
+        # 同時に購読されたキーのポーリングが揃わないよう、最初の取得の後の待ち時間をずらす
+        first = True
+        while True:
+            try:
+                result = await self.service.get_account(sns, account_id, max_age=interval / 2)
+            except Exception as e:
+                failures += 1
+                self.failed += 1
+                error = {
+                    "sns": sns.value,
+                    "account_id": account_id,
+                    "status_code": http_status_for(e) if isinstance(e, ValueError) else 500,
+                    "error": str(e),
+                }
+                if topic.error is None or topic.error["error"] != error["error"]:
+                    topic.error = error
+                    self._publish(topic, "error", error)
+                logger.debug("Subscription poll failed for %s/%s: %s", sns.value, account_id, e)
+                delay = min(interval * 8, interval * 2 ** failures)
+            else:
+                failures = 0
+                topic.error = None
+                topic.polls += 1
+                info = result.value
+                values = {field: getattr(info, field) for field in DELTA_FIELDS}
+                header = {"sns": sns.value, "account_id": account_id, "fetched_at": round(result.fetched_at, 3)}
+                if topic.state is None:
+                    topic.state = {**header, "account_name": info.account_name, **values}
+                    self._publish(topic, "snapshot", topic.state)
+                else:
+                    changed = {field: value for field, value in values.items() if topic.state[field] != value}
+                    topic.state.update(header)
+                    if changed:
+                        topic.state.update(changed)
+                        self.changes += 1
+                        self._publish(topic, "delta", {**header, **changed})
+                delay = interval
+            if first:
+                delay *= random.uniform(0.5, 1.0)
+                first = False
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscriptions),
+            "keys": len(self._topics),
+            "changes": self.changes,
+            "failed": self.failed,
+            "pending": sum(len(slots) for s in self._subscriptions for slots in s._pending.values()),
+        }
+
+    async def aclose(self) -> None:
+        """全ポーラーを停止し、購読を閉じる"""
+        tasks = [topic.task for topic in self._topics.values() if topic.task is not None]
+        for subscription in list(self._subscriptions):
+            subscription.close()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
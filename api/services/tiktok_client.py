@@ -1,22 +1,74 @@
 import httpx
 import json
 import re
-from bs4 import BeautifulSoup
+from typing import Any, Dict, Optional
 from api.models import AccountInfo, SNSPlatform
+from api.services import tracing
+from api.services.base_client import BaseScraperClient
+from api.services.errors import AccountNotFoundError, PageParseError, UpstreamStatusError
+from api.services.extract import extract_script
+from api.services.json_path import extract_path
+from api.services.streaming import MarkerScanner
 
 
-class TikTokClient:
+def parse_tiktok_page(body: bytes, encoding: str, username: str) -> Dict[str, Any]:
+    """
+    TikTokユーザーページからAccountInfoのフィールドを抽出（純粋関数）
+
+    プロセスプールで実行できるよう、引数と戻り値はpickle可能な値のみ
+
+    Args:
+        body: ページのボディ（バイト列）
+        encoding: ボディの文字コード
+        username: @を除いたユーザー名
+
+    Returns:
+        AccountInfoのフィールドの辞書
+    """
+    # HTMLから__UNIVERSAL_DATA_FOR_REHYDRATION__のJSONデータを抽出
+    script_content = extract_script(body, '__UNIVERSAL_DATA_FOR_REHYDRATION__', encoding=encoding)
+
+    if not script_content:
+        raise PageParseError("Could not find user data in page")
+
+    # ユーザー情報を抽出
+    # パスは: __DEFAULT_SCOPE__ -> webapp.user-detail -> userInfo
+    # userInfo の部分木だけをデコードし、他のスコープは読み飛ばす
+    user_info = extract_path(script_content, ['__DEFAULT_SCOPE__', 'webapp.user-detail', 'userInfo'], {})
+
+    if not user_info:
+        raise AccountNotFoundError(f"User not found: {username}")
+
+    user = user_info.get('user', {})
+    stats = user_info.get('stats', {})
+
+    return dict(
+        account_id=user.get('uniqueId', username),
+        account_name=user.get('nickname', ''),
+        followers_count=stats.get('followerCount', 0),
+        following_count=stats.get('followingCount', 0),
+        post_count=stats.get('videoCount'),
+        sns=SNSPlatform.TIKTOK
+    )
+
+
+class TikTokClient(BaseScraperClient):
     """TikTok Webスクレイピングクライアント"""
 
-    def __init__(self):
-        pass
+    platform = SNSPlatform.TIKTOK
+    default_base_url = "https://www.tiktok.com"
+
+    def _scanner(self) -> MarkerScanner:
+        # __UNIVERSAL_DATA_FOR_REHYDRATION__ のscriptタグの終わりまで読めば十分
+        return MarkerScanner([b'id="__UNIVERSAL_DATA_FOR_REHYDRATION__"', b'</script>'])
 
-    async def get_account_info(self, account_id: str) -> AccountInfo:
+    async def get_account_info(self, account_id: str, deadline: Optional[float] = None) -> AccountInfo:
         """
         TikTokユーザー情報を取得（Webスクレイピング）
 
         Args:
             account_id: ユーザー名 (例: @username の場合 "username")
+            deadline: 呼び出し元の期限（monotonic時刻。送信待ちの順番に使う）
 
         Returns:
             AccountInfo: アカウント情報
@@ -24,49 +76,23 @@ class TikTokClient:
         try:
             # @ を削除
             username = account_id.lstrip('@')
-            url = f"https://www.tiktok.com/@{username}"
-
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                }
-
-                response = await client.get(url, headers=headers, timeout=30.0)
-
-                if response.status_code == 404:
-                    raise ValueError(f"User not found: {username}")
-                elif response.status_code != 200:
-                    raise ValueError(f"TikTok error: {response.status_code}")
-
-                html_content = response.text
-
-                # HTMLから__UNIVERSAL_DATA_FOR_REHYDRATION__のJSONデータを抽出
-                soup = BeautifulSoup(html_content, 'lxml')
-                script_tag = soup.find('script', id='__UNIVERSAL_DATA_FOR_REHYDRATION__')
-
-                if not script_tag:
-                    raise ValueError("Could not find user data in page")
-
-                json_data = json.loads(script_tag.string)
+            url = f"{self.base_url}/@{username}"
 
-                # ユーザー情報を抽出
-                # パスは: __DEFAULT_SCOPE__ -> webapp.user-detail -> userInfo
-                user_info = json_data.get('__DEFAULT_SCOPE__', {}).get('webapp.user-detail', {}).get('userInfo', {})
+            headers = {
+                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            }
 
-                if not user_info:
-                    raise ValueError(f"User not found: {username}")
+            response, body = await self._fetch(url, headers, deadline)
 
-                user = user_info.get('user', {})
-                stats = user_info.get('stats', {})
+            if response.status_code == 404:
+                raise AccountNotFoundError(f"User not found: {username}")
+            elif response.status_code != 200:
+                raise UpstreamStatusError(f"TikTok error: {response.status_code}", response.status_code)
 
-                return AccountInfo(
-                    account_id=user.get('uniqueId', username),
-                    account_name=user.get('nickname', ''),
-                    followers_count=stats.get('followerCount', 0),
-                    following_count=stats.get('followingCount', 0),
-                    post_count=stats.get('videoCount'),
-                    sns=SNSPlatform.TIKTOK
-                )
+            # CPUバウンドな解析はイベントループ外で実行
+            fields = await self._parse(parse_tiktok_page, body, response.encoding or 'utf-8', username)
+            with tracing.phase("validate"):
+                return AccountInfo(**fields)
 
         except httpx.HTTPError as e:
             raise ValueError(f"HTTP error occurred: {e}")
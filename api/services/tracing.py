@@ -0,0 +1,157 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 区間名 -> [合計秒数, 回数]
+Phases = Dict[str, List[float]]
+
+# httpcoreのtraceイベント名 -> 区間名（DNS解決はhttpcoreでは connect_tcp に含まれる）
+_HTTPCORE_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "send_connection_init": "h2_init",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "ttfb",
+}
+
+
+class Trace:
+    """
+    1リクエスト分の区間ごとの所要時間
+
+    - 通常モード: cache / queue / upstream / download / parse / validate などの粗い区間のみ
+    - 詳細モード (detailed): 接続・TLS・TTFBや、解析の内訳（scan, bs4, locate, json）も記録し、
+      バイト数やリダイレクトなどの属性も保持する
+    同じ名前の区間は合計時間と回数にまとめる（再送時など）
+    """
+
+    __slots__ = ("detailed", "phases", "attrs")
+
+    def __init__(self, detailed: bool = False):
+        self.detailed = detailed
+        self.phases: Phases = {}
+        self.attrs: Dict[str, Any] = {}
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        phase = self.phases.get(name)
+        if phase is None:
+            self.phases[name] = [seconds, count]
+        else:
+            phase[0] += seconds
+            phase[1] += count
+
+    def merge(self, phases: Phases) -> None:
+        for name, (seconds, count) in phases.items():
+            self.add(name, seconds, int(count))
+
+    def server_timing(self) -> str:
+        """Server-Timingヘッダーの値 (例: cache;dur=0.01, upstream;dur=120.5)"""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, (seconds, _) in self.phases.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "phases": [
+                {"name": name, "ms": round(seconds * 1000, 3), "count": int(count)}
+                for name, (seconds, count) in self.phases.items()
+            ],
+            **self.attrs,
+        }
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def activate(trace: Optional[Trace]) -> Token:
+    """現在のコンテキスト（とそこから作られるタスク）でトレースを有効化"""
+    return _current.set(trace)
+
+
+def deactivate(token: Token) -> None:
+    _current.reset(token)
+
+
+class _NullPhase:
+    """トレース無効時の何もしないコンテキストマネージャ"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.trace.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def phase(name: str, detailed: bool = False):
+    """
+    区間を計測するコンテキストマネージャ
+
+    トレースがない場合（または detailed=True で詳細モードでない場合）は
+    共有の何もしないオブジェクトを返すため、ほぼコストがかからない
+    """
+    trace = _current.get()
+    if trace is None or (detailed and not trace.detailed):
+        return _NULL_PHASE
+    return _Phase(trace, name)
+
+
+def traced_call(fn: Callable[..., T], *args: Any) -> Tuple[T, Phases]:
+    """
+    fn(*args) を詳細モードのトレース付きで実行し、(結果, 区間) を返す
+
+    エグゼキュータ（スレッド・プロセス）内で呼ばれ、解析の内訳を呼び出し元に持ち帰る。
+    モジュールレベルの関数なのでプロセスプールにも渡せる。
+    """
+    trace = Trace(detailed=True)
+    token = _current.set(trace)
+    try:
+        return fn(*args), trace.phases
+    finally:
+        _current.reset(token)
+
+
+def httpcore_hook(trace: Trace) -> Callable[[str, Dict[str, Any]], Any]:
+    """
+    httpxの extensions={"trace": ...} に渡すコールバック
+
+    httpcoreの *.started / *.complete イベントの間隔を接続・TLS・TTFBなどの区間として記録する
+    """
+    started: Dict[str, float] = {}
+
+    async def hook(event_name: str, info: Dict[str, Any]) -> None:
+        prefix, _, suffix = event_name.rpartition(".")
+        step = prefix.rpartition(".")[2]
+        name = _HTTPCORE_PHASES.get(step)
+        if name is None:
+            return
+        if suffix == "started":
+            started[step] = time.perf_counter()
+        elif suffix in ("complete", "failed") and step in started:
+            trace.add(name, time.perf_counter() - started.pop(step))
+
+    return hook
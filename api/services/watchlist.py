@@ -0,0 +1,295 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.models import SNSPlatform
+from api.services.cache import CacheKey, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# 未指定プラットフォームの基準更新間隔（秒）
+_DEFAULT_INTERVAL = 1800.0
+
+# ボラティリティのEWMA係数
+_VOLATILITY_ALPHA = 0.3
+
+
+@dataclass
+class WatchEntry:
+    """ウォッチリストの1アカウント分の状態"""
+    sns: SNSPlatform
+    account_id: str  # 正規化済み
+    interval: float  # 現在の更新間隔（秒）
+    due: float  # 次回更新の予定時刻（monotonic）
+    reads: float = 0.0  # 減衰付きの参照回数
+    read_at: float = 0.0
+    volatility: float = 0.0  # フォロワー数の1時間あたり相対変化率（EWMA）
+    last_followers: Optional[int] = None
+    refreshed_at: Optional[float] = None  # 最終更新時刻（monotonic）
+    refreshed_wall: Optional[float] = None  # 最終更新時刻（UNIX時刻）
+    failures: int = 0
+
+    @property
+    def key(self) -> CacheKey:
+        return (self.sns, self.account_id)
+
+
+class Watchlist:
+    """
+    登録アカウントをバックグラウンドで定期更新してキャッシュを温めておく
+
+    - 次回更新時刻の早い順に取り出す優先度キュー（プラットフォームごと）
+    - 更新間隔は基準間隔を「参照頻度」と「フォロワー数の変化の大きさ」で短縮する
+      （参照回数と変化率は更新のたびに間隔へ反映する）
+    - プラットフォームごとの予算 (fetch/s) の間隔で1件ずつ取り出し、
+      更新がまとめて発生しないよう時間方向に均等にならす
+    - 失敗時は指数バックオフ（上限は基準間隔）
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        interval: Dict[SNSPlatform, float],
+        budget: Dict[SNSPlatform, float],
+        min_interval: float = 120.0,
+        max_inflight: int = 4,
+        read_half_life: float = 3600.0,
+        volatility_ref: float = 0.001,
+        max_entries: int = 20000,
+    ):
+        self.service = service
+        self.interval = interval
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_inflight = max_inflight
+        self.read_half_life = read_half_life
+        self.volatility_ref = volatility_ref
+        self.max_entries = max_entries
+
+        self._entries: Dict[CacheKey, WatchEntry] = {}
+        self._heaps: Dict[SNSPlatform, List[Tuple[float, int, CacheKey]]] = {sns: [] for sns in SNSPlatform}
+        self._wakeups: Dict[SNSPlatform, asyncio.Event] = {sns: asyncio.Event() for sns in SNSPlatform}
+        self._seq = itertools.count()
+        self._loops: List[asyncio.Task] = []
+        self._tasks: set = set()
+        self.refreshed = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CacheKey) -> bool:
+        return key in self._entries
+
+    def base_interval(self, sns: SNSPlatform) -> float:
+        return self.interval.get(sns, _DEFAULT_INTERVAL)
+
+    def add(self, sns: SNSPlatform, account_id: str) -> bool:
+        """
+        アカウントを登録（登録済みなら何もしない）
+
+        新規登録分はすぐに更新対象になるが、取り出しは予算の間隔で行われる
+
+        Returns:
+            新規に登録した場合は True
+        """
+        key = make_cache_key(sns, account_id)
+        if key in self._entries:
+            return False
+        if len(self._entries) >= self.max_entries:
+            raise ValueError(f"Watchlist is full (max {self.max_entries})")
+        entry = WatchEntry(sns=sns, account_id=key[1], interval=self.base_interval(sns), due=0.0)
+        self._entries[key] = entry
+        self._schedule(entry, time.monotonic())
+        return True
+
+    def remove(self, sns: SNSPlatform, account_id: str) -> bool:
+        """登録を解除（キューに残った分は取り出し時に捨てる）"""
+        return self._entries.pop(make_cache_key(sns, account_id), None) is not None
+
+    def load_file(self, path: str) -> int:
+        """
+        ファイルからアカウントを登録
+
+        1行に1アカウント、"sns account_id" または "sns,account_id" の形式。
+        空行と # で始まる行は無視する。
+
+        Returns:
+            新規に登録した件数
+        """
+        added = 0
+        for lineno, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.replace(",", " ").split()
+            try:
+                if len(parts) != 2:
+                    raise ValueError("expected 'sns account_id'")
+                added += self.add(SNSPlatform(parts[0].lower()), parts[1])
+            except ValueError as e:
+                logger.warning("Skipping watchlist line %s:%d: %s", path, lineno, e)
+        return added
+
+    def note_read(self, key: CacheKey) -> None:
+        """/account/ での参照を記録（登録済みアカウントのみ）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        now = time.monotonic()
+        entry.reads = self._decayed_reads(entry, now) + 1.0
+        entry.read_at = now
+
+    def cache_ttl(self, key: CacheKey) -> Optional[float]:
+        """
+        登録済みアカウントのキャッシュTTL
+
+        次の更新まで（1回失敗しても）HITのまま返せるよう、更新間隔の2倍にする
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry.interval * 2
+
+    def _decayed_reads(self, entry: WatchEntry, now: float) -> float:
+        if entry.reads == 0.0:
+            return 0.0
+        return entry.reads * 0.5 ** ((now - entry.read_at) / self.read_half_life)
+
+    def _schedule(self, entry: WatchEntry, due: float) -> None:
+        entry.due = due
+        heap = self._heaps[entry.sns]
+        heapq.heappush(heap, (due, next(self._seq), entry.key))
+        if heap[0][0] == due:
+            self._wakeups[entry.sns].set()
+
+    def _observe(self, entry: WatchEntry, followers: int, now: float) -> None:
+        """取得結果から変化率を更新し、次の更新間隔を決める"""
+        if entry.last_followers is not None and entry.refreshed_at is not None:
+            hours = max(now - entry.refreshed_at, 1.0) / 3600.0
+            change = abs(followers - entry.last_followers) / max(entry.last_followers, 1) / hours
+            entry.volatility += _VOLATILITY_ALPHA * (change - entry.volatility)
+        entry.last_followers = followers
+        entry.refreshed_at = now
+        entry.refreshed_wall = time.time()
+
+        divisor = 1.0 + math.log1p(self._decayed_reads(entry, now)) + entry.volatility / self.volatility_ref
+        entry.interval = max(self.min_interval, self.base_interval(entry.sns) / divisor)
+
+    def start(self) -> None:
+        """プラットフォームごとの更新ループを起動"""
+        for sns in SNSPlatform:
+            if self.budget.get(sns, 0.0) > 0 and sns in self.service.clients:
+                self._loops.append(asyncio.create_task(self._run(sns)))
+
+    async def _run(self, sns: SNSPlatform) -> None:
+        spacing = 1.0 / self.budget[sns]
+        semaphore = asyncio.Semaphore(self.max_inflight)
+        next_slot = time.monotonic()
+        while True:
+            delay = next_slot - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await semaphore.acquire()
+            entry = await self._next_due(sns)
+            # 待機が長かった場合も遅れを取り戻そうと連続で取り出さない
+            next_slot = max(next_slot, time.monotonic()) + spacing
+            task = asyncio.create_task(self._refresh(entry))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+
+    async def _next_due(self, sns: SNSPlatform) -> WatchEntry:
+        """更新時刻を過ぎたエントリのうち、予定時刻の最も早いものを待って取り出す"""
+        heap = self._heaps[sns]
+        wakeup = self._wakeups[sns]
+        while True:
+            while heap:
+                due, _, key = heap[0]
+                entry = self._entries.get(key)
+                if entry is not None and entry.due == due:
+                    break
+                heapq.heappop(heap)  # 登録解除・再スケジュール済み
+
+            timeout = None
+            if heap:
+                timeout = heap[0][0] - time.monotonic()
+                if timeout <= 0:
+                    return self._entries[heapq.heappop(heap)[2]]
+
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh(self, entry: WatchEntry) -> None:
+        cluster = self.service.cluster
+        if cluster is not None and not cluster.is_owner(entry.key):
+            # クラスタモードでは所有ノードのウォッチリストだけが更新する
+            if self._entries.get(entry.key) is entry:
+                self._schedule(entry, time.monotonic() + entry.interval)
+            return
+        try:
+            # 他のワーカーが間隔の半分以内に更新していれば上流には取りに行かない
+            info = await self.service.fetch(entry.sns, entry.account_id, max_age=entry.interval / 2)
+        except Exception as e:
+            entry.failures += 1
+            self.failed += 1
+            delay = min(self.base_interval(entry.sns), entry.interval * 2 ** entry.failures)
+            logger.warning("Watchlist refresh failed for %s/%s: %s", entry.sns.value, entry.account_id, e)
+        else:
+            entry.failures = 0
+            self.refreshed += 1
+            self._observe(entry, info.followers_count, time.monotonic())
+            delay = entry.interval
+
+        if self._entries.get(entry.key) is entry:
+            self._schedule(entry, time.monotonic() + delay)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """登録アカウントの一覧と更新状態"""
+        now = time.monotonic()
+        return [
+            {
+                "sns": entry.sns.value,
+                "account_id": entry.account_id,
+                "interval": round(entry.interval, 1),
+                "next_refresh_in": round(max(0.0, entry.due - now), 1),
+                "last_refreshed": entry.refreshed_wall,
+                "reads": round(self._decayed_reads(entry, now), 2),
+                "volatility": round(entry.volatility, 6),
+                "failures": entry.failures,
+            }
+            for entry in self._entries.values()
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        overdue: Dict[str, int] = {}
+        for entry in self._entries.values():
+            if entry.due <= now:
+                overdue[entry.sns.value] = overdue.get(entry.sns.value, 0) + 1
+        return {
+            "entries": len(self._entries),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "inflight": len(self._tasks),
+            "overdue": overdue,
+        }
+
+    async def aclose(self) -> None:
+        """更新ループと実行中の更新を停止"""
+        tasks = self._loops + list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops.clear()
+        self._tasks.clear()
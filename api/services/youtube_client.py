@@ -1,45 +1,115 @@
 import httpx
 import json
-import re
+from typing import Any, Dict, Optional
 from api.models import AccountInfo, SNSPlatform
-
-
-class YouTubeClient:
+from api.services import tracing
+from api.services.base_client import BaseScraperClient
+from api.services.errors import AccountNotFoundError, PageParseError, UpstreamStatusError
+from api.services.json_path import extract_path, find_assignment
+from api.services.rules import find_count, parse_count
+from api.services.streaming import MarkerScanner
+
+
+def parse_youtube_page(body: bytes, encoding: str, account_id: str) -> Dict[str, Any]:
+    """
+    YouTubeチャンネルページからAccountInfoのフィールドを抽出（純粋関数）
+
+    プロセスプールで実行できるよう、引数と戻り値はpickle可能な値のみ
+
+    Args:
+        body: ページのボディ（バイト列）
+        encoding: ボディの文字コード
+        account_id: 正規化済みのチャンネルハンドルまたはチャンネルID
+
+    Returns:
+        AccountInfoのフィールドの辞書
+    """
+    html_content = body.decode(encoding, errors='replace')
+
+    # ytInitialDataの開始位置を検索（終端は探さず構造的に読む）
+    start = find_assignment(html_content, 'var ytInitialData = ')
+
+    if start is None:
+        raise PageParseError("Could not find channel data in page")
+
+    # 代入文の終わり（scriptタグの中なので、値の文字列に "</script>" はエスケープされずには現れない）
+    end = html_content.find(';</script>', start)
+
+    # チャンネル情報を抽出
+    # header.pageHeaderRenderer.content.pageHeaderViewModel の部分木だけをデコードする
+    # （contents 以下にも pageHeaderRenderer があり得るため、キー単体ではなくパスで指定する）
+    content = extract_path(
+        html_content,
+        ['header', 'pageHeaderRenderer', 'content', 'pageHeaderViewModel'],
+        {},
+        pos=start,
+        end=end if end >= 0 else None,
+    )
+
+    # チャンネル名
+    title_obj = content.get('title', {}).get('dynamicTextViewModel', {}).get('text', {})
+    channel_name = title_obj.get('content', '')
+
+    if not channel_name:
+        raise AccountNotFoundError(f"Channel not found: {account_id}")
+
+    # メタデータから登録者数とハンドル名を取得
+    metadata = content.get('metadata', {}).get('contentMetadataViewModel', {})
+    metadata_rows = metadata.get('metadataRows', [])
+
+    channel_handle = account_id
+    subscriber_count = 0
+    video_count = None
+
+    # metadata_rows[0]: ハンドル名
+    if len(metadata_rows) > 0:
+        parts = metadata_rows[0].get('metadataParts', [])
+        if parts:
+            handle_text = parts[0].get('text', {}).get('content', '')
+            if handle_text.startswith('@'):
+                channel_handle = handle_text
+
+    # metadata_rows[1]: 登録者数と動画数
+    if len(metadata_rows) > 1:
+        parts = metadata_rows[1].get('metadataParts', [])
+        if parts:
+            # parts[0]: 登録者数
+            subscriber_text = parts[0].get('text', {}).get('content', '')
+            subscriber_count = parse_count(subscriber_text)
+
+            # parts[1]: 動画数
+            if len(parts) > 1:
+                video_text = parts[1].get('text', {}).get('content', '')
+                # "1500 本の動画" や "1,500 videos" などから数値を抽出
+                video_count = find_count(video_text)
+
+    return dict(
+        account_id=channel_handle,
+        account_name=channel_name,
+        followers_count=subscriber_count,
+        following_count=0,  # YouTubeにはフォロー数の概念がない
+        post_count=video_count,
+        sns=SNSPlatform.YOUTUBE
+    )
+
+
+class YouTubeClient(BaseScraperClient):
     """YouTube Webスクレイピングクライアント"""
 
-    def __init__(self):
-        pass
+    platform = SNSPlatform.YOUTUBE
+    default_base_url = "https://www.youtube.com"
 
-    def _parse_subscriber_count(self, text: str) -> int:
-        """
-        登録者数のテキストを数値に変換
-        例: "11万人" -> 110000, "1.5万人" -> 15000, "1200人" -> 1200
-        """
-        # "チャンネル登録者数 " などのプレフィックスを削除
-        text = re.sub(r'チャンネル登録者数\s*', '', text)
-        text = re.sub(r'人.*', '', text)  # "人" 以降を削除
-        text = text.strip()
-
-        # "万" がある場合
-        if '万' in text:
-            num_str = text.replace('万', '')
-            try:
-                return int(float(num_str) * 10000)
-            except ValueError:
-                return 0
-
-        # 通常の数値
-        try:
-            return int(text.replace(',', ''))
-        except ValueError:
-            return 0
+    def _scanner(self) -> MarkerScanner:
+        # ytInitialData の代入文の終わりまで読めば十分
+        return MarkerScanner([b'var ytInitialData = ', b';</script>'])
 
-    async def get_account_info(self, account_id: str) -> AccountInfo:
+    async def get_account_info(self, account_id: str, deadline: Optional[float] = None) -> AccountInfo:
         """
         YouTubeチャンネル情報を取得（Webスクレイピング）
 
         Args:
             account_id: チャンネルハンドル (例: @username) またはチャンネルID
+            deadline: 呼び出し元の期限（monotonic時刻。送信待ちの順番に使う）
 
         Returns:
             AccountInfo: アカウント情報
@@ -49,83 +119,24 @@ class YouTubeClient:
             if not account_id.startswith('@') and not account_id.startswith('UC'):
                 account_id = f'@{account_id}'
 
-            url = f"https://www.youtube.com/{account_id}"
-
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept-Language": "ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7"
-                }
-
-                response = await client.get(url, headers=headers, timeout=30.0)
-
-                if response.status_code == 404:
-                    raise ValueError(f"Channel not found: {account_id}")
-                elif response.status_code != 200:
-                    raise ValueError(f"YouTube error: {response.status_code}")
-
-                html_content = response.text
-
-                # ytInitialDataを抽出
-                pattern = r'var ytInitialData = ({.*?});'
-                match = re.search(pattern, html_content, re.DOTALL)
-
-                if not match:
-                    raise ValueError("Could not find channel data in page")
-
-                json_data = json.loads(match.group(1))
-
-                # チャンネル情報を抽出
-                header = json_data.get('header', {}).get('pageHeaderRenderer', {})
-                content = header.get('content', {}).get('pageHeaderViewModel', {})
-
-                # チャンネル名
-                title_obj = content.get('title', {}).get('dynamicTextViewModel', {}).get('text', {})
-                channel_name = title_obj.get('content', '')
-
-                if not channel_name:
-                    raise ValueError(f"Channel not found: {account_id}")
-
-                # メタデータから登録者数とハンドル名を取得
-                metadata = content.get('metadata', {}).get('contentMetadataViewModel', {})
-                metadata_rows = metadata.get('metadataRows', [])
-
-                channel_handle = account_id
-                subscriber_count = 0
-                video_count = None
-
-                # metadata_rows[0]: ハンドル名
-                if len(metadata_rows) > 0:
-                    parts = metadata_rows[0].get('metadataParts', [])
-                    if parts:
-                        handle_text = parts[0].get('text', {}).get('content', '')
-                        if handle_text.startswith('@'):
-                            channel_handle = handle_text
-
-                # metadata_rows[1]: 登録者数と動画数
-                if len(metadata_rows) > 1:
-                    parts = metadata_rows[1].get('metadataParts', [])
-                    if parts:
-                        # parts[0]: 登録者数
-                        subscriber_text = parts[0].get('text', {}).get('content', '')
-                        subscriber_count = self._parse_subscriber_count(subscriber_text)
-
-                        # parts[1]: 動画数
-                        if len(parts) > 1:
-                            video_text = parts[1].get('text', {}).get('content', '')
-                            # "1500 本の動画" や "1,500 videos" などから数値を抽出
-                            video_match = re.search(r'([\d,]+)', video_text)
-                            if video_match:
-                                video_count = int(video_match.group(1).replace(',', ''))
-
-                return AccountInfo(
-                    account_id=channel_handle,
-                    account_name=channel_name,
-                    followers_count=subscriber_count,
-                    following_count=0,  # YouTubeにはフォロー数の概念がない
-                    post_count=video_count,
-                    sns=SNSPlatform.YOUTUBE
-                )
+            url = f"{self.base_url}/{account_id}"
+
+            headers = {
+                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                "Accept-Language": "ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7"
+            }
+
+            response, body = await self._fetch(url, headers, deadline)
+
+            if response.status_code == 404:
+                raise AccountNotFoundError(f"Channel not found: {account_id}")
+            elif response.status_code != 200:
+                raise UpstreamStatusError(f"YouTube error: {response.status_code}", response.status_code)
+
+            # CPUバウンドな解析はイベントループ外で実行
+            fields = await self._parse(parse_youtube_page, body, response.encoding or 'utf-8', account_id)
+            with tracing.phase("validate"):
+                return AccountInfo(**fields)
 
         except httpx.HTTPError as e:
             raise ValueError(f"HTTP error occurred: {e}")
@@ -0,0 +1,177 @@
+"""
+パーサーのマイクロベンチマーク（ネットワーク不要）
+
+記録済みページ（benchmarks/fixtures/recorded）に対して各クライアントの抽出ステップ
+（parse_*_page）だけを計測し、ops/sec・p50/p99・ピークメモリを出力する。
+同じフィクスチャで抽出結果（フォロワー数など）の正しさも検証する。
+記録済みのページがないプラットフォームは合成ページ（benchmarks/fixtures/synthetic）で計測し、
+結果の corpus 列と出力の注意書きで区別する。
+
+使い方:
+    python -m benchmarks.bench_parsers
+    python -m benchmarks.bench_parsers --platform youtube --min-time 2
+    python -m benchmarks.bench_parsers --compare benchmarks/results/parsers-<commit>.json
+    python -m benchmarks.bench_parsers --check-only
+    python -m benchmarks.bench_parsers --corpus synthetic
+"""
+import argparse
+import json
+import platform as platform_module
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.corpus import CORPORA, SYNTHETIC, Fixture, load_fixtures
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(fixture: Fixture, min_time: float, min_iterations: int, max_iterations: int) -> Dict[str, Any]:
+    """1件のフィクスチャの抽出ステップを繰り返し実行して計測"""
+    fixture.parse()  # ウォームアップ（正規表現のコンパイル等）
+
+    durations: List[float] = []
+    started = time.perf_counter()
+    while len(durations) < max_iterations and (
+        len(durations) < min_iterations or time.perf_counter() - started < min_time
+    ):
+        t0 = time.perf_counter_ns()
+        fixture.parse()
+        durations.append((time.perf_counter_ns() - t0) / 1000)
+    total = sum(durations) / 1e6
+    durations.sort()
+
+    tracemalloc.start()
+    fixture.parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "fixture": fixture.name,
+        "corpus": fixture.corpus,
+        "platform": fixture.platform.value,
+        "bytes": len(fixture.body),
+        "iterations": len(durations),
+        "ops_per_sec": round(len(durations) / total, 2),
+        "p50_us": round(_percentile(durations, 50), 1),
+        "p99_us": round(_percentile(durations, 99), 1),
+        "alloc_peak_bytes": peak,
+    }
+
+
+def check(fixtures: List[Fixture]) -> List[Dict[str, Any]]:
+    """抽出結果を期待値と照合（xfailの既知の不具合は失敗として扱わない）"""
+    results = []
+    for fixture in fixtures:
+        error = fixture.check()
+        if error is None:
+            status = "XPASS" if fixture.xfail else "ok"
+        else:
+            status = "xfail" if fixture.xfail else "FAIL"
+        results.append({
+            "fixture": fixture.name, "corpus": fixture.corpus, "status": status, "error": error, "xfail": fixture.xfail,
+        })
+    return results
+
+
+def _print_table(results: List[Dict[str, Any]], baseline: Optional[Dict[Tuple[str, str], Dict[str, Any]]]) -> None:
+    header = f"{'fixture':<28} {'corpus':<9} {'KiB':>7} {'ops/s':>10} {'p50 us':>10} {'p99 us':>10} {'peak KiB':>9}"
+    if baseline is not None:
+        header += f" {'vs base':>9}"
+    print(header)
+    for r in results:
+        line = (
+            f"{r['fixture']:<28} {r['corpus']:<9} {r['bytes'] / 1024:>7.0f} {r['ops_per_sec']:>10.1f} "
+            f"{r['p50_us']:>10.1f} {r['p99_us']:>10.1f} {r['alloc_peak_bytes'] / 1024:>9.1f}"
+        )
+        if baseline is not None:
+            base = baseline.get((r["corpus"], r["fixture"]))
+            if base:
+                line += f" {(r['ops_per_sec'] / base['ops_per_sec'] - 1) * 100:>+8.1f}%"
+            else:
+                line += f" {'-':>9}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="パーサーのマイクロベンチマーク")
+    parser.add_argument("--platform", help="対象プラットフォーム (youtube, tiktok, instagram, facebook)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="フィクスチャごとの最小計測時間（秒）")
+    parser.add_argument("--min-iterations", type=int, default=20)
+    parser.add_argument("--max-iterations", type=int, default=100000)
+    parser.add_argument("--output", type=Path, help="結果JSONの出力先（既定: benchmarks/results/parsers-<commit>.json）")
+    parser.add_argument("--compare", type=Path, help="比較対象の結果JSON")
+    parser.add_argument("--check-only", action="store_true", help="正しさの検証のみ実行")
+    parser.add_argument("--corpus", choices=CORPORA, help="使うコーパス（既定: 記録済み、ないプラットフォームは合成）")
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(args.platform, args.corpus)
+    synthetic = sorted({f.platform.value for f in fixtures if f.corpus == SYNTHETIC})
+    if synthetic and args.corpus is None:
+        print(
+            f"注意: 記録済みページがないため合成ページで計測: {', '.join(synthetic)}"
+            "（実ページは python -m benchmarks.record で記録できます）\n"
+        )
+
+    checks = check(fixtures)
+    failed = [c for c in checks if c["status"] == "FAIL"]
+    for c in checks:
+        if c["status"] != "ok":
+            print(f"[{c['status']}] {c['fixture']}: {c['error'] or c['xfail']}")
+    print(f"correctness: {len(checks) - len(failed)}/{len(checks)} passed (xfail含む)\n")
+    if args.check_only:
+        return 1 if failed else 0
+
+    results = [
+        measure(fixture, args.min_time, args.min_iterations, args.max_iterations)
+        for fixture in fixtures
+    ]
+
+    baseline = None
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        # corpus のない古い結果は合成ページのもの
+        baseline = {(r.get("corpus", SYNTHETIC), r["fixture"]): r for r in previous["results"]}
+    _print_table(results, baseline)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "benchmark": "parsers",
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "machine": platform_module.platform(),
+            "corpora": sorted({fixture.corpus for fixture in fixtures}),
+        },
+        "results": results,
+        "checks": checks,
+    }
+    output = args.output or RESULTS_DIR / f"parsers-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"\nwrote {output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
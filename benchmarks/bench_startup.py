@@ -0,0 +1,163 @@
+"""
+起動時間とメモリのベンチマーク（ネットワーク不要）
+
+シナリオごとに新しいプロセスで api.main を読み込み、アプリの起動（lifespan）と
+プラットフォームクライアントの初回生成までの所要時間と RSS を計測する。
+各シナリオを --repeat 回実行し、中央値を出力する。
+
+使い方:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10
+    python -m benchmarks.bench_startup --compare benchmarks/results/startup-<commit>.json
+"""
+import argparse
+import json
+import os
+import platform as platform_module
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_parsers import RESULTS_DIR, _git_commit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (名前, 環境変数, 起動後に使うプラットフォーム)
+SCENARIOS = [
+    ("preload-all", {"PLATFORM_PRELOAD": "true"}, ["youtube", "tiktok", "instagram", "facebook"]),
+    ("lazy-youtube", {}, ["youtube"]),
+    ("lazy-instagram", {}, ["instagram"]),
+    ("youtube-only", {"ENABLED_PLATFORMS": '["youtube"]'}, ["youtube"]),
+]
+
+# 子プロセスで実行する計測スクリプト（結果を1行のJSONで出力）
+_CHILD = r"""
+import asyncio, json, sys, time
+
+def rss_kib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+
+use = sys.argv[1].split(",") if sys.argv[1] else []
+result = {"rss_base_kib": rss_kib()}
+t0 = time.perf_counter()
+import api.main
+from api.models import SNSPlatform
+result["import_ms"] = (time.perf_counter() - t0) * 1000
+result["rss_import_kib"] = rss_kib()
+
+async def run():
+    t1 = time.perf_counter()
+    async with api.main.lifespan(api.main.app):
+        result["startup_ms"] = (time.perf_counter() - t1) * 1000
+        result["rss_startup_kib"] = rss_kib()
+        clients = api.main.app.state.account_service.clients
+        t2 = time.perf_counter()
+        for name in use:
+            clients[SNSPlatform(name)]
+        result["first_use_ms"] = (time.perf_counter() - t2) * 1000
+        result["rss_ready_kib"] = rss_kib()
+
+asyncio.run(run())
+result["modules"] = len(sys.modules)
+print(json.dumps(result))
+"""
+
+_METRICS = ("import_ms", "startup_ms", "first_use_ms", "rss_base_kib", "rss_import_kib", "rss_startup_kib",
+            "rss_ready_kib", "modules")
+
+
+def run_once(env: Dict[str, str], use: List[str]) -> Dict[str, Any]:
+    child_env = {
+        **os.environ,
+        # ファイルやバックグラウンド処理を伴う機能は計測対象から外す
+        "SNAPSHOT_ENABLED": "false",
+        "WATCHLIST_ENABLED": "false",
+        "PYTHONPATH": str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        **env,
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD, ",".join(use)],
+        capture_output=True, text=True, check=True, cwd=ROOT, env=child_env,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(name: str, env: Dict[str, str], use: List[str], repeat: int) -> Dict[str, Any]:
+    """1つのシナリオを repeat 回実行して各項目の中央値を求める"""
+    runs = [run_once(env, use) for _ in range(repeat)]
+    result: Dict[str, Any] = {"scenario": name, "env": env, "use": use, "runs": repeat}
+    for metric in _METRICS:
+        result[metric] = round(statistics.median(run[metric] for run in runs), 1)
+    return result
+
+
+def _print_table(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    header = (
+        f"{'scenario':<16} {'import ms':>10} {'startup ms':>11} {'first use ms':>13} "
+        f"{'RSS MiB':>8} {'ready MiB':>10} {'modules':>8}"
+    )
+    if baseline is not None:
+        header += f" {'vs base':>9}"
+    print(header)
+    for r in results:
+        line = (
+            f"{r['scenario']:<16} {r['import_ms']:>10.1f} {r['startup_ms']:>11.1f} {r['first_use_ms']:>13.1f} "
+            f"{r['rss_startup_kib'] / 1024:>8.1f} {r['rss_ready_kib'] / 1024:>10.1f} {r['modules']:>8.0f}"
+        )
+        if baseline is not None:
+            base = baseline.get(r["scenario"])
+            if base:
+                line += f" {(r['rss_ready_kib'] / base['rss_ready_kib'] - 1) * 100:>+8.1f}%"
+            else:
+                line += f" {'-':>9}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="起動時間とメモリのベンチマーク")
+    parser.add_argument("--repeat", type=int, default=5, help="シナリオごとの実行回数")
+    parser.add_argument("--scenario", action="append", help="実行するシナリオ（複数指定可、既定: すべて）")
+    parser.add_argument("--output", type=Path, help="結果JSONの出力先（既定: benchmarks/results/startup-<commit>.json）")
+    parser.add_argument("--compare", type=Path, help="比較対象の結果JSON（RSSの差を表示）")
+    args = parser.parse_args(argv)
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s[0] in args.scenario]
+    results = [measure(name, env, use, args.repeat) for name, env, use in scenarios]
+
+    baseline = None
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        baseline = {r["scenario"]: r for r in previous["results"]}
+    _print_table(results, baseline)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "benchmark": "startup",
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "machine": platform_module.platform(),
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"startup-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"\nwrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+ベンチマーク用ページコーパス（benchmarks/fixtures）の読み込み
+
+コーパスは2つ:
+  - recorded: 実ページを benchmarks.record で記録し、匿名化したもの（既定）
+  - synthetic: 実ページの構造とサイズを模して benchmarks.make_fixtures で生成したもの
+    （記録済みのページがないプラットフォームのフォールバック）
+"""
+import gzip
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from api.models import SNSPlatform
+from api.services.facebook_client import parse_facebook_page
+from api.services.instagram_client import parse_instagram_page
+from api.services.tiktok_client import parse_tiktok_page
+from api.services.youtube_client import parse_youtube_page
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+RECORDED = "recorded"
+SYNTHETIC = "synthetic"
+CORPORA = (RECORDED, SYNTHETIC)
+
+# プラットフォームごとの解析関数（クライアントの抽出ステップ）
+PARSERS: Dict[SNSPlatform, Callable[[bytes, str, str], Dict[str, Any]]] = {
+    SNSPlatform.YOUTUBE: parse_youtube_page,
+    SNSPlatform.TIKTOK: parse_tiktok_page,
+    SNSPlatform.INSTAGRAM: parse_instagram_page,
+    SNSPlatform.FACEBOOK: parse_facebook_page,
+}
+
+
+@dataclass
+class Fixture:
+    """記録済みページ1件"""
+    file: str
+    platform: SNSPlatform
+    account_id: str
+    expected: Dict[str, Any]
+    xfail: Optional[str] = None
+    corpus: str = RECORDED
+    body: bytes = field(default=b"", repr=False)
+
+    @property
+    def name(self) -> str:
+        return self.file.replace(".html.gz", "")
+
+    def parse(self) -> Dict[str, Any]:
+        return PARSERS[self.platform](self.body, "utf-8", self.account_id)
+
+    def check(self) -> Optional[str]:
+        """
+        抽出結果を期待値と比較
+
+        Returns:
+            不一致の説明（一致した場合は None）
+        """
+        try:
+            result = self.parse()
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+        diffs = [
+            f"{key}: expected {value!r}, got {result.get(key)!r}"
+            for key, value in self.expected.items()
+            if result.get(key) != value
+        ]
+        return "; ".join(diffs) or None
+
+
+def manifest_path(corpus: str) -> Path:
+    return FIXTURES_DIR / corpus / "manifest.json"
+
+
+def _load_corpus(corpus: str, platform: Optional[str], exclude: Optional[Set[SNSPlatform]] = None) -> List[Fixture]:
+    manifest = json.loads(manifest_path(corpus).read_text(encoding="utf-8"))
+    fixtures = []
+    for entry in manifest:
+        if platform and entry["platform"] != platform:
+            continue
+        if exclude and SNSPlatform(entry["platform"]) in exclude:
+            continue
+        fixture = Fixture(
+            file=entry["file"],
+            platform=SNSPlatform(entry["platform"]),
+            account_id=entry["account_id"],
+            expected=entry["expected"],
+            xfail=entry.get("xfail"),
+            corpus=corpus,
+        )
+        fixture.body = gzip.decompress((FIXTURES_DIR / corpus / fixture.file).read_bytes())
+        fixtures.append(fixture)
+    return fixtures
+
+
+def load_fixtures(platform: Optional[str] = None, corpus: Optional[str] = None) -> List[Fixture]:
+    """
+    マニフェストに記載されたフィクスチャを読み込む
+
+    corpus を指定しない場合は記録済みコーパスを使い、記録済みのページがない
+    プラットフォームだけ合成コーパスで補う（どちらのページかは Fixture.corpus で区別する）
+    """
+    if corpus is not None:
+        return _load_corpus(corpus, platform)
+    fixtures = _load_corpus(RECORDED, platform)
+    recorded = {fixture.platform for fixture in fixtures}
+    fixtures.extend(_load_corpus(SYNTHETIC, platform, exclude=recorded))
+    return fixtures
@@ -0,0 +1,133 @@
+"""
+プロキシプールの試験用のローカル転送プロキシ（HTTPのみ、CONNECT非対応）
+
+受け取ったリクエストを上流（fake_upstream など）へそのまま転送する。
+送信元IPごとのレート制限・ブロックを模擬するため、遅延・429の発生率・502の発生率、
+特定プラットフォームだけのブロックを設定できる。応答には X-Proxy ヘッダーでポート番号を付ける。
+
+使い方:
+    python -m benchmarks.fake_upstream --port 9000 &
+    python -m benchmarks.fake_proxy --port 9101 &
+    python -m benchmarks.fake_proxy --port 9102 --latency-ms 200 &
+    python -m benchmarks.fake_proxy --port 9103 --block instagram &
+    PROXY_URLS='["http://127.0.0.1:9101", "http://127.0.0.1:9102", "http://127.0.0.1:9103"]' \\
+        UPSTREAM_BASE_URLS=... uvicorn api.main:app
+"""
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import List
+from urllib.parse import urlsplit
+
+import httpx
+import uvicorn
+
+# 転送しないホップバイホップのヘッダー
+_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization", b"proxy-connection",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade", b"content-length", b"date", b"server",
+}
+
+
+@dataclass
+class ProxyConfig:
+    port: int = 9100
+    latency_ms: float = 0.0
+    rate_429: float = 0.0
+    rate_502: float = 0.0
+    block: List[str] = field(default_factory=list)  # 常に429を返すプラットフォーム（パスの先頭）
+
+
+class FakeProxy:
+    """絶対URI形式のリクエストを上流に転送する最小構成のASGIアプリ"""
+
+    def __init__(self, config: ProxyConfig):
+        self.config = config
+        self.client = httpx.AsyncClient(timeout=30.0)
+        self.name = str(config.port).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await self.client.aclose()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        headers = [(k, v) for k, v in scope["headers"] if k.lower() not in _HOP_HEADERS]
+        # サーバー実装によって path が絶対URIのままの場合と、パス部分だけの場合がある
+        target = scope["path"]
+        if target.startswith(("http://", "https://")):
+            url = target
+        else:
+            host = next((v.decode() for k, v in scope["headers"] if k == b"host"), "")
+            url = f"http://{host}{target}"
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode()
+        platform = urlsplit(url).path.strip("/").partition("/")[0]
+
+        config = self.config
+        if config.latency_ms:
+            await asyncio.sleep(config.latency_ms / 1000)
+        if platform in config.block or (config.rate_429 and random.random() < config.rate_429):
+            await self._respond(send, 429, b"rate limited by proxy", [(b"retry-after", b"1")])
+            return
+        if config.rate_502 and random.random() < config.rate_502:
+            await self._respond(send, 502, b"bad gateway")
+            return
+
+        try:
+            request = self.client.build_request(scope["method"], url, headers=headers)
+            response = await self.client.send(request, stream=True)
+        except httpx.HTTPError:
+            await self._respond(send, 502, b"upstream unreachable")
+            return
+        try:
+            response_headers = [
+                (k.lower(), v) for k, v in response.headers.raw if k.lower() not in _HOP_HEADERS
+            ]
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": response_headers + [(b"x-proxy", self.name)],
+            })
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+
+    async def _respond(self, send, status: int, body: bytes, headers=None):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": (headers or []) + [(b"x-proxy", self.name)],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="プロキシプール試験用の転送プロキシ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="転送前に加える遅延（ミリ秒）")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429を返す割合 (0-1)")
+    parser.add_argument("--rate-502", type=float, default=0.0, help="502を返す割合 (0-1)")
+    parser.add_argument("--block", action="append", default=[], help="常に429を返すプラットフォーム（複数指定可）")
+    args = parser.parse_args()
+    config = ProxyConfig(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        rate_429=args.rate_429,
+        rate_502=args.rate_502,
+        block=args.block,
+    )
+    uvicorn.run(FakeProxy(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+負荷試験用のローカル上流スタブサーバー
+
+記録済みページ（benchmarks/fixtures、記録済みページがないプラットフォームは合成ページ）をプラットフォームごとのパスで返す。
+遅延・ジッター・429の発生率・ボディサイズを設定できる。
+
+    /youtube/{account_id}      -> YouTubeのフィクスチャ
+    /tiktok/@{username}        -> TikTokのフィクスチャ
+    /instagram/{username}/     -> Instagramのフィクスチャ
+    /facebook/{page_id}        -> Facebookのフィクスチャ
+
+クライアントの向け先は UPSTREAM_BASE_URLS で変更する:
+    UPSTREAM_BASE_URLS='{"youtube": "http://127.0.0.1:9000/youtube", ...}'
+
+使い方:
+    python -m benchmarks.fake_upstream --port 9000 --latency-ms 80 --jitter-ms 40 --rate-429 0.01
+"""
+import argparse
+import asyncio
+import random
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List
+
+import uvicorn
+
+from benchmarks.corpus import load_fixtures
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class UpstreamConfig:
+    latency_ms: float = 50.0
+    jitter_ms: float = 0.0
+    rate_429: float = 0.0
+    retry_after: int = 1
+    body_bytes: int = 0  # 0: フィクスチャのサイズのまま。指定時は末尾を埋めて/切り詰めてこのサイズにする
+    chunk_delay_ms: float = 0.0  # チャンクごとの送信遅延（低速回線の模擬）
+
+
+def base_urls(host: str, port: int) -> Dict[str, str]:
+    """UPSTREAM_BASE_URLS に設定する値"""
+    return {name: f"http://{host}:{port}/{name}" for name in ("youtube", "tiktok", "instagram", "facebook")}
+
+
+def _resize(body: bytes, size: int) -> bytes:
+    if size <= 0 or size == len(body):
+        return body
+    if size < len(body):
+        return body[:size]
+    filler = b"<!-- " + b"x" * 1018 + b" -->"
+    missing = size - len(body)
+    return body + (filler * (missing // len(filler) + 1))[:missing]
+
+
+class FakeUpstream:
+    """最小構成のASGIアプリ（上流側のオーバーヘッドを計測結果に混ぜないため）"""
+
+    def __init__(self, config: UpstreamConfig):
+        self.config = config
+        self.pages: Dict[str, List[bytes]] = {}
+        for fixture in load_fixtures():
+            self.pages.setdefault(fixture.platform.value, []).append(
+                _resize(fixture.body, config.body_bytes)
+            )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        path = scope["path"].strip("/")
+        platform, _, account = path.partition("/")
+        pages = self.pages.get(platform)
+
+        config = self.config
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+
+        if not pages:
+            await self._respond(send, 404, b"not found")
+            return
+        if config.rate_429 and random.random() < config.rate_429:
+            await self._respond(send, 429, b"rate limited", [(b"retry-after", str(config.retry_after).encode())])
+            return
+
+        # アカウントIDごとに同じフィクスチャを返す
+        body = pages[zlib.crc32(account.encode()) % len(pages)]
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/html; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        for offset in range(0, len(body), CHUNK_SIZE):
+            if config.chunk_delay_ms:
+                await asyncio.sleep(config.chunk_delay_ms / 1000)
+            await send({
+                "type": "http.response.body",
+                "body": body[offset:offset + CHUNK_SIZE],
+                "more_body": offset + CHUNK_SIZE < len(body),
+            })
+
+    @staticmethod
+    async def _respond(send, status: int, body: bytes, headers=None):
+        await send({"type": "http.response.start", "status": status, "headers": headers or []})
+        await send({"type": "http.response.body", "body": body})
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="上流の応答遅延（ミリ秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="遅延のばらつき（±ミリ秒）")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429を返す割合 (0-1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="429のRetry-After（秒）")
+    parser.add_argument("--body-bytes", type=int, default=0, help="ボディサイズ（0: フィクスチャのまま）")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0, help="64KiBチャンクごとの送信遅延")
+
+
+def config_from_args(args: argparse.Namespace) -> UpstreamConfig:
+    return UpstreamConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        body_bytes=args.body_bytes,
+        chunk_delay_ms=args.chunk_delay_ms,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="負荷試験用の上流スタブサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(FakeUpstream(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
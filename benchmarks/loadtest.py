@@ -0,0 +1,253 @@
+"""
+/account/ のエンドツーエンド負荷試験（ネットワーク不要）
+
+ローカルの上流スタブサーバー（benchmarks.fake_upstream）と uvicorn ワーカー1つで
+api.main:app を起動し、同時実行数を段階的に上げながら /account/ に負荷をかける。
+同時実行数ごとのスループット・レイテンシ（p50/p90/p99）・エラー率・
+サーバープロセスのCPU使用率とRSSを出力する。
+
+使い方:
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --levels 1,4,16,64,128 --duration 10 --latency-ms 80 --jitter-ms 40
+    python -m benchmarks.loadtest --cache --scheduler --rate-429 0.02
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks import fake_upstream
+from benchmarks.bench_parsers import RESULTS_DIR, _git_commit, _percentile
+
+PLATFORMS = ("youtube", "tiktok", "instagram", "facebook")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class ProcessSampler:
+    """/proc からプロセスのCPU時間とRSSを読む（Linuxのみ）"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            fields = Path(f"/proc/{self.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime, stime は stat の14, 15番目（コマンド名の後ろから数えて12, 13番目）
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+    def rss_bytes(self) -> Optional[int]:
+        try:
+            for line in Path(f"/proc/{self.pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+
+def _start(args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        env={**os.environ, **(env or {})},
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not become ready: {url}")
+
+
+async def run_level(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    accounts: int,
+    mix: List[Tuple[str, float]],
+    sampler: ProcessSampler,
+) -> Dict[str, Any]:
+    """指定した同時実行数で duration 秒間リクエストを送り続ける"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    platforms = [p for p, _ in mix]
+    weights = [w for _, w in mix]
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        stop_at = time.monotonic() + duration
+
+        async def worker() -> None:
+            while time.monotonic() < stop_at:
+                sns = random.choices(platforms, weights)[0]
+                params = {"sns": sns, "account_id": f"user{random.randrange(accounts)}"}
+                started = time.perf_counter()
+                try:
+                    response = await client.get("/account/", params=params)
+                    key = str(response.status_code)
+                except httpx.HTTPError as e:
+                    key = type(e).__name__
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[key] = statuses.get(key, 0) + 1
+
+        cpu_before = sampler.cpu_seconds()
+        wall_before = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.monotonic() - wall_before
+        cpu_after = sampler.cpu_seconds()
+
+    latencies.sort()
+    total = len(latencies)
+    errors = total - statuses.get("200", 0)
+    cpu = None
+    if cpu_before is not None and cpu_after is not None:
+        cpu = round((cpu_after - cpu_before) / wall * 100, 1)
+    rss = sampler.rss_bytes()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "rps": round(total / wall, 1),
+        "p50_ms": round(_percentile(latencies, 50), 1) if total else None,
+        "p90_ms": round(_percentile(latencies, 90), 1) if total else None,
+        "p99_ms": round(_percentile(latencies, 99), 1) if total else None,
+        "max_ms": round(latencies[-1], 1) if total else None,
+        "error_rate": round(errors / total, 4) if total else None,
+        "statuses": statuses,
+        "server_cpu_pct": cpu,
+        "server_rss_mb": round(rss / 1024 / 1024, 1) if rss else None,
+    }
+
+
+def _print_row(r: Dict[str, Any]) -> None:
+    print(
+        f"{r['concurrency']:>6} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+        f"{r['error_rate'] * 100:>7.2f}% {r['server_cpu_pct'] if r['server_cpu_pct'] is not None else '-':>7} "
+        f"{r['server_rss_mb'] if r['server_rss_mb'] is not None else '-':>8}",
+        flush=True,
+    )
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    upstream_urls = fake_upstream.base_urls("127.0.0.1", args.upstream_port)
+    upstream = _start([
+        "-m", "benchmarks.fake_upstream",
+        "--port", str(args.upstream_port),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--rate-429", str(args.rate_429),
+        "--retry-after", str(args.retry_after),
+        "--body-bytes", str(args.body_bytes),
+        "--chunk-delay-ms", str(args.chunk_delay_ms),
+    ])
+    api_env = {
+        "UPSTREAM_BASE_URLS": json.dumps(upstream_urls),
+        "CACHE_ENABLED": str(args.cache).lower(),
+        "SCHEDULER_ENABLED": str(args.scheduler).lower(),
+        "PARSER_EXECUTOR": args.parser_executor,
+    }
+    api = _start(
+        ["-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--log-level", "warning", "--no-access-log"],
+        env=api_env,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    results: List[Dict[str, Any]] = []
+    try:
+        await _wait_ready(f"http://127.0.0.1:{args.upstream_port}/")
+        await _wait_ready(f"{base_url}/health")
+        sampler = ProcessSampler(api.pid)
+        mix = [(p, w) for p, w in zip(PLATFORMS, args.mix) if w > 0]
+
+        # ウォームアップ（接続プール・パーサーの初期化）
+        await run_level(base_url, min(4, args.levels[0]), args.warmup, args.accounts, mix, sampler)
+
+        print(f"{'conc':>6} {'rps':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'errors':>8} {'cpu %':>7} {'rss MB':>8}")
+        for concurrency in args.levels:
+            result = await run_level(base_url, concurrency, args.duration, args.accounts, mix, sampler)
+            results.append(result)
+            _print_row(result)
+            # レイテンシが崩れた段階で打ち切る
+            if result["p99_ms"] is not None and result["p99_ms"] > args.max_p99_ms:
+                print(f"p99 exceeded {args.max_p99_ms} ms; stopping")
+                break
+            if result["error_rate"] is not None and result["error_rate"] > args.max_error_rate:
+                print(f"error rate exceeded {args.max_error_rate:.0%}; stopping")
+                break
+    finally:
+        for process in (api, upstream):
+            process.terminate()
+        for process in (api, upstream):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    best = max(results, key=lambda r: r["rps"]) if results else None
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "benchmark": "loadtest",
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "csv")},
+        },
+        "peak_rps": best["rps"] if best else None,
+        "peak_concurrency": best["concurrency"] if best else None,
+        "levels": results,
+    }
+    output = args.output or RESULTS_DIR / f"loadtest-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"\nwrote {output}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[k for k in results[0] if k != "statuses"], extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"wrote {args.csv}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="/account/ のエンドツーエンド負荷試験")
+    parser.add_argument("--port", type=int, default=8800, help="APIサーバーのポート")
+    parser.add_argument("--upstream-port", type=int, default=9000, help="上流スタブサーバーのポート")
+    parser.add_argument("--levels", type=lambda s: [int(x) for x in s.split(",")], default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--duration", type=float, default=5.0, help="各段階の計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=2.0, help="ウォームアップ時間（秒）")
+    parser.add_argument("--accounts", type=int, default=100000, help="リクエストするアカウントIDの種類数")
+    parser.add_argument("--mix", type=lambda s: [float(x) for x in s.split(",")], default=[1, 1, 1, 1],
+                        help="youtube,tiktok,instagram,facebook の比率")
+    parser.add_argument("--max-p99-ms", type=float, default=5000.0, help="p99がこれを超えたら打ち切る")
+    parser.add_argument("--max-error-rate", type=float, default=0.2, help="エラー率がこれを超えたら打ち切る")
+    parser.add_argument("--cache", action="store_true", help="AccountInfoキャッシュを有効にする")
+    parser.add_argument("--scheduler", action="store_true", help="外向きスケジューラを有効にする")
+    parser.add_argument("--parser-executor", default="thread", choices=["process", "thread", "inline"])
+    parser.add_argument("--output", type=Path, help="結果JSONの出力先")
+    parser.add_argument("--csv", type=Path, help="結果CSVの出力先")
+    fake_upstream.add_arguments(parser)
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
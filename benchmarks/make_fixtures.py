@@ -0,0 +1,199 @@
+"""
+パーサーベンチマーク用の合成ページ（benchmarks/fixtures/synthetic）を生成
+
+実ページの構造（scriptタグの位置、ytInitialData / __UNIVERSAL_DATA_FOR_REHYDRATION__ の
+ネスト、<head>内のog:*メタタグ）とサイズを模した決定的なHTMLを生成する。
+合成ページは記録済みページ（`python -m benchmarks.record` で記録、benchmarks/fixtures/recorded）が
+ないプラットフォームのフォールバックで、実ページの計測結果の代わりにはならない。
+
+使い方:
+    python -m benchmarks.make_fixtures
+"""
+import base64
+import gzip
+import json
+import random
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "synthetic"
+MANIFEST_PATH = FIXTURES_DIR / "manifest.json"
+
+
+def _tracking(rng: random.Random, size: int = 48) -> str:
+    return base64.b64encode(rng.randbytes(size)).decode()
+
+
+def _head(rng: random.Random, title: str, extra_meta: str = "", links: int = 80) -> str:
+    parts = ['<head><meta charset="utf-8"><title>', title, '</title>']
+    for i in range(links):
+        parts.append(f'<link rel="preload" href="https://static.example.com/rsrc/{_tracking(rng, 12)}.js" as="script" nonce="n{i}">')
+    parts.append('<script nonce="n">window.__bootstrap=' + json.dumps({"k": _tracking(rng, 2048)}) + ';</script>')
+    parts.append(extra_meta)
+    parts.append('</head>')
+    return "".join(parts)
+
+
+def _video_renderer(rng: random.Random, i: int) -> dict:
+    return {
+        "richItemRenderer": {
+            "content": {
+                "videoRenderer": {
+                    "videoId": _tracking(rng, 8),
+                    "thumbnail": {"thumbnails": [
+                        {"url": f"https://i.ytimg.com/vi/{i}/hqdefault.jpg?sqp={_tracking(rng, 24)}", "width": w, "height": w * 9 // 16}
+                        for w in (168, 196, 246, 336)
+                    ]},
+                    "title": {"runs": [{"text": f"動画タイトル {i} }}; [テスト]"}], "accessibility": {"accessibilityData": {"label": f"動画 {i} 作成者: チャンネル 1 日前 10 分"}}},
+                    "publishedTimeText": {"simpleText": "1 日前"},
+                    "viewCountText": {"simpleText": f"{rng.randint(100, 999999):,} 回視聴"},
+                    "navigationEndpoint": {
+                        "clickTrackingParams": _tracking(rng),
+                        "commandMetadata": {"webCommandMetadata": {"url": f"/watch?v={i}", "webPageType": "WEB_PAGE_TYPE_WATCH"}},
+                    },
+                    "trackingParams": _tracking(rng),
+                    "menu": {"menuRenderer": {"items": [
+                        {"menuServiceItemRenderer": {"text": {"runs": [{"text": label}]}, "trackingParams": _tracking(rng)}}
+                        for label in ("キューに追加", "後で見る", "共有")
+                    ]}},
+                }
+            }
+        }
+    }
+
+
+def youtube_page(seed: int, name: str, handle: str, subscribers: str, videos: str, items: int = 600) -> str:
+    rng = random.Random(seed)
+    data = {
+        "responseContext": {
+            "serviceTrackingParams": [{"service": s, "params": [{"key": "e", "value": _tracking(rng, 256)}]} for s in ("GFEEDBACK", "CSI", "GUIDED_HELP", "ECATCHER")],
+            "webResponseContextExtensionData": {"hasDecorated": True},
+        },
+        "contents": {"twoColumnBrowseResultsRenderer": {"tabs": [{"tabRenderer": {"content": {"richGridRenderer": {
+            "contents": [_video_renderer(rng, i) for i in range(items)],
+            "trackingParams": _tracking(rng),
+        }}}}]}},
+        "header": {"pageHeaderRenderer": {
+            "pageTitle": name,
+            "content": {"pageHeaderViewModel": {
+                "title": {"dynamicTextViewModel": {"text": {"content": name}}},
+                "metadata": {"contentMetadataViewModel": {"metadataRows": [
+                    {"metadataParts": [{"text": {"content": handle}}]},
+                    {"metadataParts": [{"text": {"content": subscribers}}, {"text": {"content": videos}}]},
+                ], "delimiter": "•"}},
+            }},
+        }},
+        "metadata": {"channelMetadataRenderer": {"title": name, "description": "説明文 " * 200, "vanityChannelUrl": f"http://www.youtube.com/{handle}"}},
+        "trackingParams": _tracking(rng),
+    }
+    body = (
+        '<body><script nonce="n">var ytInitialData = '
+        + json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        + ';</script><script nonce="n">if (window.ytcsi) {window.ytcsi.tick("pdr", null, "");}</script>'
+        + '<div id="content">' + "".join(f'<ytd-item i="{i}"></ytd-item>' for i in range(3000)) + '</div></body>'
+    )
+    return "<!DOCTYPE html><html lang=\"ja-JP\">" + _head(rng, f"{name} - YouTube") + body + "</html>"
+
+
+def tiktok_page(seed: int, unique_id: str, nickname: str, followers: int, following: int, videos: int) -> str:
+    rng = random.Random(seed)
+    data = {"__DEFAULT_SCOPE__": {
+        "webapp.app-context": {"language": "ja-JP", "region": "JP", "abTestVersion": {"parameters": {f"p{i}": {"vid": _tracking(rng, 6)} for i in range(800)}}},
+        "webapp.biz-context": {"features": {f"f{i}": rng.random() > 0.5 for i in range(300)}},
+        "webapp.i18n-translation": {"translations": {f"key_{i}": "翻訳テキスト }</ [x]" for i in range(1500)}},
+        "webapp.user-detail": {"userInfo": {
+            "user": {"id": str(rng.randint(10**17, 10**18)), "uniqueId": unique_id, "nickname": nickname, "signature": "自己紹介\n", "avatarLarger": f"https://p16.tiktokcdn.com/{_tracking(rng, 30)}"},
+            "stats": {"followerCount": followers, "followingCount": following, "heart": followers * 12, "videoCount": videos, "diggCount": 0},
+        }, "statusCode": 0},
+        "seo.abtest": {"canonical": f"https://www.tiktok.com/@{unique_id}"},
+    }}
+    body = (
+        '<body><div id="app"></div>'
+        '<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+        + json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        + '</script>' + "".join(f'<script src="https://sf16.tiktokcdn.com/obj/{_tracking(rng, 16)}.js"></script>' for _ in range(40))
+        + '<div class="padding">' + ("<span>x</span>" * 20000) + '</div></body>'
+    )
+    return "<!DOCTYPE html><html lang=\"ja-JP\">" + _head(rng, f"{nickname} (@{unique_id}) | TikTok") + body + "</html>"
+
+
+def _og_page(seed: int, title: str, description: str) -> str:
+    rng = random.Random(seed)
+    meta = (
+        f'<meta property="og:type" content="profile" />'
+        f'<meta property="og:title" content="{title}" />'
+        f'<meta property="og:description" content="{description}" />'
+        f'<meta property="og:image" content="https://scontent.example.com/{_tracking(rng, 30)}" />'
+    )
+    body = '<body>' + "".join(f'<script type="application/json" data-sjs>{json.dumps({"require": [[_tracking(rng, 64)]]})}</script>' for _ in range(800)) + '</body>'
+    return "<!DOCTYPE html><html lang=\"ja\">" + _head(rng, title, meta, links=120) + body + "</html>"
+
+
+# (ファイル名, プラットフォーム, 解析に渡すID, ページ生成関数, 期待値, xfail理由)
+FIXTURES = [
+    ("youtube/ja_man.html.gz", "youtube", "@tenuguisyatyou",
+     lambda: youtube_page(1, "手ぬぐい社長", "@tenuguisyatyou", "チャンネル登録者数 11万人", "1,500 本の動画"),
+     {"account_id": "@tenuguisyatyou", "account_name": "手ぬぐい社長", "followers_count": 110000, "following_count": 0, "post_count": 1500}, None),
+    ("youtube/ja_man_decimal.html.gz", "youtube", "@example_ja",
+     lambda: youtube_page(2, "サンプルチャンネル", "@example_ja", "チャンネル登録者数 1.5万人", "320 本の動画"),
+     {"account_id": "@example_ja", "account_name": "サンプルチャンネル", "followers_count": 15000, "following_count": 0, "post_count": 320}, None),
+    ("youtube/ja_plain.html.gz", "youtube", "@small_ja",
+     lambda: youtube_page(3, "小さなチャンネル", "@small_ja", "チャンネル登録者数 1200人", "12 本の動画", items=120),
+     {"account_id": "@small_ja", "account_name": "小さなチャンネル", "followers_count": 1200, "following_count": 0, "post_count": 12}, None),
+    ("youtube/en_k.html.gz", "youtube", "@example_en",
+     lambda: youtube_page(4, "Example Channel", "@example_en", "110K subscribers", "1,500 videos"),
+     {"account_id": "@example_en", "account_name": "Example Channel", "followers_count": 110000, "following_count": 0, "post_count": 1500}, None),
+    ("youtube/en_m.html.gz", "youtube", "@big_en",
+     lambda: youtube_page(5, "Big Channel", "@big_en", "1.2M subscribers", "4,321 videos", items=900),
+     {"account_id": "@big_en", "account_name": "Big Channel", "followers_count": 1200000, "following_count": 0, "post_count": 4321}, None),
+    ("tiktok/ja.html.gz", "tiktok", "ay_an21",
+     lambda: tiktok_page(6, "ay_an21", "あやん", 123456, 210, 345),
+     {"account_id": "ay_an21", "account_name": "あやん", "followers_count": 123456, "following_count": 210, "post_count": 345}, None),
+    ("tiktok/en.html.gz", "tiktok", "example",
+     lambda: tiktok_page(7, "example", "Example \"Creator\"", 2500000, 12, 1024),
+     {"account_id": "example", "account_name": "Example \"Creator\"", "followers_count": 2500000, "following_count": 12, "post_count": 1024}, None),
+    ("instagram/en_k.html.gz", "instagram", "harumi_gram",
+     lambda: _og_page(8, "栗原はるみ / Harumi Kurihara (@harumi_gram) &#x2022; Instagram photos and videos",
+                      "831K Followers, 1 Following, 1,234 Posts - See Instagram photos and videos from 栗原はるみ / Harumi Kurihara (@harumi_gram)"),
+     {"account_id": "harumi_gram", "account_name": "栗原はるみ / Harumi Kurihara", "followers_count": 831000, "following_count": 1, "post_count": 1234}, None),
+    ("instagram/en_m.html.gz", "instagram", "example",
+     lambda: _og_page(9, "Example &amp; Co (@example) &#x2022; Instagram photos and videos",
+                      "1.5M Followers, 120 Following, 3,456 Posts - See Instagram photos and videos from Example &amp; Co (@example)"),
+     {"account_id": "example", "account_name": "Example & Co", "followers_count": 1500000, "following_count": 120, "post_count": 3456}, None),
+    ("instagram/ja_plain.html.gz", "instagram", "sample_ja",
+     lambda: _og_page(10, "サンプル(@sample_ja) &#x2022; Instagram写真と動画",
+                      "フォロワー1,234人、フォロー中56人、投稿789件 - サンプル(@sample_ja)のInstagramの写真と動画をチェックしよう"),
+     {"account_id": "sample_ja", "account_name": "サンプル", "followers_count": 1234, "following_count": 56, "post_count": 789}, None),
+    ("instagram/ja_man.html.gz", "instagram", "harumi_ja",
+     lambda: _og_page(11, "栗原はるみ(@harumi_ja) &#x2022; Instagram写真と動画",
+                      "フォロワー83.1万人、フォロー中1人、投稿1,234件 - 栗原はるみ(@harumi_ja)のInstagramの写真と動画をチェックしよう"),
+     {"account_id": "harumi_ja", "account_name": "栗原はるみ", "followers_count": 831000, "following_count": 1, "post_count": 1234}, None),
+    ("facebook/ja.html.gz", "facebook", "HokkaidoJerry",
+     lambda: _og_page(12, "北海道ジェリー", "北海道ジェリー。 「いいね！」111,402件 · 1,234人が話題にしています"),
+     {"account_id": "HokkaidoJerry", "account_name": "北海道ジェリー", "followers_count": 111402, "following_count": 0, "post_count": None}, None),
+    ("facebook/en.html.gz", "facebook", "ExamplePage",
+     lambda: _og_page(13, "Example Page", "Example Page. 24,500 likes · 312 talking about this."),
+     {"account_id": "ExamplePage", "account_name": "Example Page", "followers_count": 24500, "following_count": 0, "post_count": None}, None),
+    ("facebook/zh.html.gz", "facebook", "ExampleTW",
+     lambda: _og_page(14, "範例粉專", "範例粉專。 3,210 次贊 · 12 人正在談論這個。"),
+     {"account_id": "ExampleTW", "account_name": "範例粉專", "followers_count": 3210, "following_count": 0, "post_count": None}, None),
+]
+
+
+def main() -> None:
+    manifest = []
+    for filename, platform, account_id, build, expected, xfail in FIXTURES:
+        path = FIXTURES_DIR / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # mtime=0 で出力を決定的にする
+        path.write_bytes(gzip.compress(build().encode("utf-8"), compresslevel=9, mtime=0))
+        entry = {"file": filename, "platform": platform, "account_id": account_id, "expected": expected}
+        if xfail:
+            entry["xfail"] = xfail
+        manifest.append(entry)
+        print(f"wrote {path} ({path.stat().st_size:,} bytes)")
+    MANIFEST_PATH.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"wrote {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+実ページを取得して記録済みコーパス（benchmarks/fixtures/recorded）に追加（ネットワークが必要）
+
+取得したページは匿名化（訪問者・セッションごとの値、追跡用の値、メールアドレス、IPアドレスを
+同じ長さの値に置き換え）してから gzip で保存し、現在のパーサーの抽出結果を期待値として
+manifest.json に追記する。匿名化の前後で抽出結果が変わる場合は保存しない。
+追記後、期待値が実際の表示と一致しているか、保存したページに個人の情報が残っていないかを手で確認すること。
+
+使い方:
+    python -m benchmarks.record youtube @tenuguisyatyou --name ja_tenugui
+    python -m benchmarks.record instagram harumi_gram --name en_harumi --lang en-US
+"""
+import argparse
+import gzip
+import json
+import re
+import sys
+from datetime import date
+from typing import List, Optional
+
+import httpx
+
+from api.models import SNSPlatform
+from benchmarks.corpus import FIXTURES_DIR, PARSERS, RECORDED, manifest_path
+
+URLS = {
+    SNSPlatform.YOUTUBE: "https://www.youtube.com/{account_id}",
+    SNSPlatform.TIKTOK: "https://www.tiktok.com/@{account_id}",
+    SNSPlatform.INSTAGRAM: "https://www.instagram.com/{account_id}/",
+    SNSPlatform.FACEBOOK: "https://www.facebook.com/{account_id}",
+}
+
+# 訪問者・セッションごとに変わる値や追跡用の値を持つJSONのキー
+_SECRET_KEYS = (
+    "visitorData", "VISITOR_DATA", "trackingParams", "clickTrackingParams", "serializedShareEntity",
+    "SESSION_INDEX", "DELEGATED_SESSION_ID", "ID_TOKEN", "XSRF_TOKEN", "csrf_token", "csrfToken",
+    "fb_dtsg", "lsd", "jazoest", "token", "deviceId", "device_id", "odinId", "wid", "nonce",
+)
+_SECRET_VALUE_RE = re.compile(
+    r'("(?:' + "|".join(_SECRET_KEYS) + r')"\s*:\s*")((?:[^"\\]|\\.)*)"'
+)
+_NONCE_ATTR_RE = re.compile(r'(\snonce=")([^"]*)"')
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+_IPV4_RE = re.compile(r"(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?![\d.])")
+
+
+def _mask(text: str) -> str:
+    return "x" * len(text)
+
+
+def anonymize(text: str) -> str:
+    """
+    ページから訪問者・セッションに結び付く値を取り除く
+
+    値は同じ長さの文字に置き換え、ページのサイズと構造（=解析の所要時間）を変えない
+    """
+    text = _SECRET_VALUE_RE.sub(lambda m: m.group(1) + _mask(m.group(2)) + '"', text)
+    text = _NONCE_ATTR_RE.sub(lambda m: m.group(1) + _mask(m.group(2)) + '"', text)
+    text = _EMAIL_RE.sub(lambda m: _mask(m.group()), text)
+    return _IPV4_RE.sub(lambda m: re.sub(r"\d", "0", m.group()), text)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="実ページをコーパスに記録")
+    parser.add_argument("platform", choices=[p.value for p in SNSPlatform])
+    parser.add_argument("account_id")
+    parser.add_argument("--name", required=True, help="保存名 (例: ja_man)")
+    parser.add_argument("--lang", default="ja-JP", help="Accept-Language の先頭の言語")
+    args = parser.parse_args(argv)
+
+    platform = SNSPlatform(args.platform)
+    account_id = args.account_id
+    if platform == SNSPlatform.YOUTUBE:
+        if not account_id.startswith('@') and not account_id.startswith('UC'):
+            account_id = f'@{account_id}'
+    else:
+        account_id = account_id.lstrip('@')
+
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": f"{args.lang},ja;q=0.9,en-US;q=0.8,en;q=0.7",
+    }
+    response = httpx.get(URLS[platform].format(account_id=account_id), headers=headers, follow_redirects=True, timeout=30.0)
+    response.raise_for_status()
+
+    fields = PARSERS[platform](response.content, response.encoding or "utf-8", account_id)
+    fields.pop("sns", None)
+
+    body = anonymize(response.text).encode("utf-8")
+    anonymized = PARSERS[platform](body, "utf-8", account_id)
+    anonymized.pop("sns", None)
+    if anonymized != fields:
+        print("anonymization changed the parse result; not saved", file=sys.stderr)
+        print(json.dumps({"original": fields, "anonymized": anonymized}, ensure_ascii=False, indent=2), file=sys.stderr)
+        return 1
+
+    filename = f"{platform.value}/{args.name}.html.gz"
+    path = FIXTURES_DIR / RECORDED / filename
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+
+    manifest_file = manifest_path(RECORDED)
+    manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+    manifest = [entry for entry in manifest if entry["file"] != filename]
+    manifest.append({
+        "file": filename,
+        "platform": platform.value,
+        "account_id": account_id,
+        "expected": fields,
+        "lang": args.lang,
+        "recorded_at": date.today().isoformat(),
+    })
+    manifest_file.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    print(f"wrote {path} ({len(body):,} bytes)")
+    print(json.dumps(fields, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())